@@ -0,0 +1,131 @@
+"""Compare XBRL -> XLSX conversion throughput of the local engine against the remote round trip.
+
+Modes, each over the same XBRL files:
+
+    local       local_converter.convert_file in this process (converter.py --local)
+    http-get    a local_converter service, fetching the form page before every upload (the old client)
+    http        the same service with form tokens cached across uploads (ConverterClient)
+    http-xN     ConverterClient with N uploads in flight (converter.py --concurrency N)
+    remote      the cached-token client against the EC2 converter (opt-in with --remote; the
+                pipeline also sleeps 2 s per session after every remote upload, not counted here)
+
+--latency adds a fixed delay to every request the local service answers, to stand in for
+the round trip to a remote host. Every workbook produced is checked cell by cell against
+the one already in DATA/{symbol}/XLSX/.
+
+    python benchmarks/bench_converter.py --files 200 --latency 50 --concurrency 4
+    python benchmarks/bench_converter.py --files 20 --remote
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import converter
+import local_converter
+from extractor import choose_data_sheet
+from xlsx_reader import iter_sheet_columns
+
+def read_rows(workbook):
+    """All six columns of a workbook's data sheet"""
+    return list(iter_sheet_columns(workbook, [1, 2, 3, 4, 5, 6], choose_data_sheet))
+
+class DelayedHandler(local_converter.ConverterRequestHandler):
+    """Local service with an artificial per-request delay"""
+    latency = 0.0
+
+    def do_GET(self):
+        """The form page, after the configured delay"""
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def do_POST(self):
+        """A conversion, after the configured delay"""
+        time.sleep(self.latency)
+        super().do_POST()
+
+def convert_each(convert):
+    """Batch runner for a one-file-at-a-time convert function"""
+    return lambda files: ((path, convert(path)) for path in files)
+
+def upload_with_fresh_tokens(client):
+    """The pre-ConverterClient behaviour: GET the page for every upload"""
+    def convert(path):
+        """Convert one file after dropping every cached token"""
+        client.clear_form_tokens()
+        return client.convert(path)
+    return convert
+
+def run_mode(convert_batch, files):
+    """Convert every file; returns (wall seconds, failures, workbooks differing from the existing XLSX)"""
+    failures = 0
+    differing = 0
+    started = time.perf_counter()
+    results = list(convert_batch(files))
+    elapsed = time.perf_counter() - started
+
+    for xbrl_path, workbook in results:
+        xlsx_path = xbrl_path.replace(f'{os.sep}XBRL{os.sep}', f'{os.sep}XLSX{os.sep}')[:-4] + '.xlsx'
+        if not workbook:
+            failures += 1
+        elif os.path.exists(xlsx_path) and read_rows(io.BytesIO(workbook)) != read_rows(xlsx_path):
+            differing += 1
+    return elapsed, failures, differing
+
+def main():
+    """Time local conversion against the remote service and compare the workbooks"""
+    parser = argparse.ArgumentParser(description="Local vs remote XBRL conversion benchmark")
+    parser.add_argument('--files', type=int, default=100, help="Number of XBRL files (0 = all)")
+    parser.add_argument('--latency', type=float, default=0, help="Added delay per local service request, in ms")
+    parser.add_argument('--concurrency', type=int, default=4, help="Uploads in flight for the http-xN mode")
+    parser.add_argument('--remote', action='store_true', help="Also time the EC2 converter")
+    args = parser.parse_args()
+
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    files = sorted(glob.glob(os.path.join(base_dir, 'DATA', '*', 'XBRL', '*.xml')))
+    if args.files:
+        # Spread the sample over every symbol rather than the first few
+        files = files[::max(1, len(files) // args.files)][:args.files]
+
+    DelayedHandler.latency = args.latency / 1000
+    server = local_converter.ThreadingHTTPServer(('127.0.0.1', 0), DelayedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    service_url = f"http://{host}:{port}/"
+
+    pooled = converter.ConverterClient(service_url, sessions=args.concurrency)
+    modes = {
+        'local': convert_each(local_converter.convert_file),
+        'http-get': convert_each(upload_with_fresh_tokens(converter.ConverterClient(service_url))),
+        'http': convert_each(converter.ConverterClient(service_url).convert),
+        f'http-x{args.concurrency}': lambda files: pooled.convert_many(files, args.concurrency)
+    }
+    if args.remote:
+        modes['remote'] = convert_each(converter.ConverterClient(converter.EC2_URL).convert)
+
+    # The converter prints a line per upload; keep the report readable
+    stdout = sys.stdout
+    results = {}
+    for mode, convert in modes.items():
+        sys.stdout = io.StringIO()
+        try:
+            results[mode] = run_mode(convert, files)
+        finally:
+            sys.stdout = stdout
+
+    server.shutdown()
+    server.server_close()
+
+    print(f"{len(files)} XBRL files, {args.latency:g} ms added per service request")
+    for mode, (elapsed, failures, differing) in results.items():
+        converted = len(files) - failures
+        print(f"{mode:>9}: {elapsed / len(files) * 1000:8.2f} ms/file  {converted / elapsed if elapsed else 0:8.1f} files/s  "
+              f"{failures} failed, {differing} differ from DATA/*/XLSX")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare per-file latency and peak RSS of the workbook scans used by extractor.py.
+
+Each mode runs over the same XLSX files in its own child process, so peak RSS is not
+shared between modes:
+
+    full       load_workbook() in full mode plus cell(row, col) lookups (the old path)
+    read-only  openpyxl read_only iter_rows over columns B..F (fallback path)
+    stream     xlsx_reader straight from the sheet XML with early stop (default path)
+
+    python benchmarks/bench_excel_scan.py --files 500
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extractor
+
+def scan_full(excel_filepath):
+    """The original full-mode load"""
+    workbook = extractor.load_workbook(excel_filepath, data_only=True)
+    data_sheet = workbook[extractor.choose_data_sheet(workbook.sheetnames)]
+    rows = (
+        (data_sheet.cell(row=row, column=2).value, data_sheet.cell(row=row, column=6).value)
+        for row in range(1, data_sheet.max_row + 1)
+    )
+    fields = extractor.match_fields_in_rows(rows, excel_filepath)
+    workbook.close()
+    return fields
+
+MODES = {
+    'full': scan_full,
+    'read-only': extractor.extract_fields_with_openpyxl,
+    'stream': extractor.extract_fields_from_excel
+}
+
+def run_mode(mode, files):
+    """Child process: scan every file and report timing, peak RSS and the extracted fields"""
+    scan = MODES[mode]
+    started = time.perf_counter()
+    fields = [scan(path) for path in files]
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'seconds': elapsed,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'fields': fields
+    }))
+
+def main():
+    """Time the workbook scan over the corpus and report latency and peak RSS"""
+    parser = argparse.ArgumentParser(description="Workbook scan latency/RSS benchmark")
+    parser.add_argument('--files', type=int, default=0, help="Limit to the first N workbooks (0 = all)")
+    parser.add_argument('--mode', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    files = sorted(glob.glob(os.path.join(base_dir, 'DATA', '*', 'XLSX', '*.xlsx')))
+    if args.files:
+        files = files[:args.files]
+
+    if args.mode:
+        run_mode(args.mode, files)
+        return
+
+    print(f"{len(files)} workbooks")
+    baseline = None
+    for mode in MODES:
+        output = subprocess.run([sys.executable, __file__, '--mode', mode, '--files', str(args.files)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result['fields']
+        status = "same fields" if result['fields'] == baseline else "FIELDS DIFFER"
+        print(f"{mode:>10}: {result['seconds'] / len(files) * 1000:6.2f} ms/file  "
+              f"peak RSS {result['max_rss_kb'] / 1024:6.1f} MB  ({status})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure how extraction over the whole DATA/ corpus scales with worker processes.
+
+Runs the serial per-symbol loop once as the baseline, then the process-pool engine
+(extractor.py --workers N) for each worker count, without writing any CSV. Every run
+must produce the same rows as the baseline.
+
+    python benchmarks/bench_extractor_workers.py --workers 1,2,4,8
+    python benchmarks/bench_extractor_workers.py --source xbrl
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extractor
+
+def run_quietly(function, *args, **kwargs):
+    """Run a function with its per-file progress output discarded; returns (result, seconds)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        return result, time.perf_counter() - started
+
+def run_serial(symbols, source):
+    """The default single-process loop over symbols"""
+    return {symbol: extractor.extract_all_files(symbol, source) for symbol in symbols}
+
+def main():
+    """Time serial extraction against each worker count and check the results match"""
+    parser = argparse.ArgumentParser(description="Extractor worker scaling benchmark")
+    parser.add_argument('--source', choices=sorted(extractor.EXTRACTION_SOURCES), default='xlsx')
+    parser.add_argument('--workers', default=f"1,2,4,{os.cpu_count()}",
+                        help="Comma-separated worker counts to try")
+    parser.add_argument('--symbols', type=int, default=0, help="Limit to the first N symbols (0 = all)")
+    args = parser.parse_args()
+
+    symbols = extractor.get_available_symbols_with_source(args.source)
+    if args.symbols:
+        symbols = symbols[:args.symbols]
+    file_count = sum(len(extractor.list_symbol_files(symbol, args.source)[1]) for symbol in symbols)
+    worker_counts = sorted({int(count) for count in args.workers.split(',')})
+
+    print(f"{len(symbols)} symbols, {file_count} {args.source} files, {os.cpu_count()} CPUs")
+    baseline, baseline_seconds = run_quietly(run_serial, symbols, args.source)
+    print(f"{'serial':>10}: {baseline_seconds:7.2f}s  {file_count / baseline_seconds:7.1f} files/s")
+
+    for workers in worker_counts:
+        result, seconds = run_quietly(extractor.extract_all_symbols_parallel, symbols, args.source,
+                                      workers=workers, write_csv=False)
+        status = "same rows" if result == baseline else "ROWS DIFFER"
+        print(f"{workers:>3} workers: {seconds:7.2f}s  {file_count / seconds:7.1f} files/s  "
+              f"x{baseline_seconds / seconds:.2f}  ({status})")
+
+if __name__ == "__main__":
+    main()
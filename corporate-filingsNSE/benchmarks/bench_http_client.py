@@ -0,0 +1,125 @@
+"""Compare TLS handshakes and per-request latency with and without the shared session layer.
+
+Runs a local HTTPS stub with a throwaway self-signed certificate (needs the openssl CLI)
+and issues the same requests twice: once with bare requests.get per call, as the stages
+used to, and once through http_client's pooled keep-alive session.
+
+    python benchmarks/bench_http_client.py --requests 200
+"""
+import argparse
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import http_client
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every GET with a small JSON body on a keep-alive connection"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """A fixed JSON body, keeping the connection open"""
+        body = b'[{"symbol": "STUB", "seqNumber": "1"}]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep access logs out of the benchmark output"""
+        pass
+
+class CountingTLSServer(ThreadingHTTPServer):
+    """HTTPS server that counts completed TLS handshakes"""
+    daemon_threads = True
+
+    def __init__(self, address, handler, ssl_context):
+        super().__init__(address, handler)
+        self.ssl_context = ssl_context
+        self.handshakes = 0
+        self.count_lock = threading.Lock()
+
+    def get_request(self):
+        """Accept a connection and complete its TLS handshake, counting it"""
+        sock, address = self.socket.accept()
+        # Small header/body writes would otherwise stall on Nagle + delayed ACK
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        tls_sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        with self.count_lock:
+            self.handshakes += 1
+        return tls_sock, address
+
+def create_certificate(cert_dir):
+    """Generate a self-signed certificate for 127.0.0.1"""
+    cert_path = os.path.join(cert_dir, 'cert.pem')
+    key_path = os.path.join(cert_dir, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key_path, '-out', cert_path, '-subj', '/CN=127.0.0.1',
+        '-addext', 'subjectAltName=IP:127.0.0.1'
+    ], check=True, capture_output=True)
+    return cert_path, key_path
+
+def run_requests(get, url, count, cert_path):
+    """Issue count GETs and return per-request latencies in milliseconds"""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = get(url, verify=cert_path, timeout=30)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(label, server, latencies):
+    """Print handshake count and latency percentiles for one run"""
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<22} handshakes={server.handshakes:<5} "
+          f"mean={statistics.mean(latencies):.2f}ms p50={statistics.median(latencies):.2f}ms p95={p95:.2f}ms")
+
+def main():
+    """Run the before/after comparison"""
+    parser = argparse.ArgumentParser(description="Benchmark the shared HTTP session layer against a local HTTPS stub")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        cert_path, key_path = create_certificate(cert_dir)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(cert_path, key_path)
+
+        server = CountingTLSServer(('127.0.0.1', 0), StubHandler, ssl_context)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+
+        try:
+            print(f"NSE pipeline HTTP benchmark: {args.requests} requests per run")
+            print("=" * 60)
+
+            # Before: a fresh connection (TCP + TLS) per request
+            before = run_requests(requests.get, url, args.requests, cert_path)
+            summarize("before (requests.get)", server, before)
+
+            # After: the shared pooled session reuses one keep-alive connection
+            server.handshakes = 0
+            session = http_client.get_session(url)
+            after = run_requests(session.get, url, args.requests, cert_path)
+            summarize("after (http_client)", server, after)
+        finally:
+            http_client.close_sessions()
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""Replay the recorded corpus through local stub servers and time every stage at 1x, 10x and 100x.
+
+The NSE API is replayed from JSON/ and the XBRL archive from DATA/*/XBRL; a local_converter
+service stands in for the EC2 converter, so nothing leaves the machine. At scale N every
+symbol is served N times under distinct names (TCS, TCS__R2, ...) and each replica's XBRL
+carries a marker comment, so copies are real downloads, conversions and parses rather than
+blob-store hits.
+
+Each stage runs in its own child process over a scratch workspace, so peak RSS is per stage:
+
+    fetch      fetcher.fetch_symbol_data + save_json_data, one symbol at a time (no 2 s pause)
+    download   download_xbrl_file for every filing, --concurrency workers
+    convert    ConverterClient.convert_to_file, --concurrency uploads in flight
+    extract    extract_file over the converted workbooks (--source xbrl: over the XBRL files)
+    pipeline   pipeline.py end to end in a fresh workspace; latency is the time to each symbol's CSV
+
+Every (scale, stage) result is appended to benchmarks/results/bench_pipeline.jsonl with the
+git commit, and compared with the last earlier run of the same configuration.
+
+    python benchmarks/bench_pipeline.py                          # 4 symbols at 1x, 10x and 100x
+    python benchmarks/bench_pipeline.py --symbols 0 --scales 1   # the whole corpus once
+    python benchmarks/bench_pipeline.py --latency 50 --stages download,convert
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+import converter
+import downloader
+import extractor
+import fetcher
+import local_converter
+import pipeline
+import storage
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'bench_pipeline.jsonl')
+STAGES = ('fetch', 'download', 'convert', 'extract', 'pipeline')
+
+# Replica N of a symbol is served as {SYMBOL}__R{N}
+REPLICA_SEPARATOR = '__R'
+
+def get_replica_symbol(symbol, replica):
+    """Name replica N of a symbol is served under; replica 1 keeps the recorded name"""
+    return symbol if replica == 1 else f"{symbol}{REPLICA_SEPARATOR}{replica}"
+
+def split_replica_symbol(symbol):
+    """(recorded symbol, replica number) of a served symbol"""
+    base, _, replica = symbol.upper().partition(REPLICA_SEPARATOR)
+    return base, int(replica or 1)
+
+def get_xbrl_name(url):
+    """Last path segment of an XBRL URL, the key of the recorded archive"""
+    return os.path.basename(urlparse(url.strip()).path)
+
+def index_archive():
+    """XBRL URL name -> recorded DATA/{symbol}/XBRL file, for every filing that was downloaded"""
+    archive = {}
+    for json_path in glob.glob(os.path.join(BASE_DIR, 'JSON', '*.json')):
+        symbol = os.path.basename(json_path)[:-5]
+        with storage.open_text(json_path) as f:
+            records = json.load(f)
+        for record in records if isinstance(records, list) else []:
+            filename = downloader.build_xbrl_filename(record)
+            recorded = filename and os.path.join(BASE_DIR, 'DATA', symbol, 'XBRL', filename)
+            if recorded and os.path.exists(recorded):
+                archive[get_xbrl_name(record['xbrl'])] = recorded
+    return archive
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """The NSE API answered from JSON/ and the XBRL archive from DATA/*/XBRL, after an optional delay"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    archive = {}
+
+    def do_GET(self):
+        """Answer an API query or XBRL request from the recorded corpus, after the configured delay"""
+        time.sleep(self.latency)
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/api/'):
+            body = self.replay_api(parse_qs(parsed.query).get('symbol', [''])[0])
+            content_type = 'application/json'
+        else:
+            body = self.replay_xbrl(parsed.path)
+            content_type = 'application/xml'
+
+        self.send_response(200 if body is not None else 404)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body or b'')))
+        self.end_headers()
+        self.wfile.write(body or b'')
+
+    def replay_api(self, symbol):
+        """Recorded records of the base symbol, their XBRL links pointing at this server's replica path"""
+        base, replica = split_replica_symbol(symbol)
+        json_path = os.path.join(BASE_DIR, 'JSON', f'{base.lower()}.json')
+        if not os.path.exists(json_path):
+            return None
+        with storage.open_text(json_path) as f:
+            records = json.load(f)
+        for record in records:
+            if downloader.is_valid_xbrl_link((record.get('xbrl') or '').strip()):
+                record['xbrl'] = f"http://{self.headers['Host']}/corporate/xbrl/r{replica}/{get_xbrl_name(record['xbrl'])}"
+        return json.dumps(records).encode('utf-8')
+
+    def replay_xbrl(self, path):
+        """Recorded XBRL file; replicas get a trailing comment so their content hash differs"""
+        replica, name = path.split('/')[-2:]
+        recorded = self.archive.get(name)
+        if recorded is None:
+            return None
+        with storage.open_read(recorded) as f:
+            body = f.read()
+        if replica != 'r1':
+            body += f'\n<!-- replica {replica[1:]} -->\n'.encode('ascii')
+        return body
+
+    def log_message(self, format, *args):
+        """Keep access logs out of the benchmark output"""
+        pass
+
+class DelayedConverterHandler(local_converter.ConverterRequestHandler):
+    """Local converter service with the same optional delay"""
+    latency = 0.0
+
+    def do_GET(self):
+        """The form page, after the configured delay"""
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def do_POST(self):
+        """A conversion, after the configured delay"""
+        time.sleep(self.latency)
+        super().do_POST()
+
+    def log_message(self, format, *args):
+        """Keep access logs out of the benchmark output"""
+        pass
+
+def start_server(handler):
+    """Serve handler on a free local port in a daemon thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+def use_workspace(workspace):
+    """Point the blob store at the workspace so a run never touches BLOBS/ or DATA/"""
+    get_blob_dir = blobstore.get_blob_dir
+    blobstore.get_blob_dir = lambda blob_dir=None: get_blob_dir(blob_dir or os.path.join(workspace, 'BLOBS'))
+
+def timed(function, latencies):
+    """Wrap function so each call's duration is appended to latencies"""
+    def run(*args):
+        """Call function, recording how long it took even if it raises"""
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return run
+
+def get_size(pattern):
+    """Total size of the files matching a glob pattern"""
+    return sum(os.path.getsize(path) for path in glob.glob(pattern))
+
+def run_fetch(config, workspace):
+    """Fetch and save every symbol's JSON from the stub API, one at a time"""
+    json_dir = os.path.join(workspace, 'JSON')
+    os.makedirs(json_dir, exist_ok=True)
+    latencies = []
+
+    def fetch(symbol):
+        """Fetch one symbol and save its JSON"""
+        data, _ = fetcher.fetch_symbol_data(symbol, config['api_url'])
+        return bool(data) and fetcher.save_json_data(symbol, data, json_dir)
+
+    results = [timed(fetch, latencies)(symbol) for symbol in config['symbols']]
+    return latencies, results.count(False), get_size(os.path.join(json_dir, '*.json'))
+
+def run_download(config, workspace):
+    """Download every filing of the fetched JSON on --concurrency workers"""
+    jobs = []
+    for symbol in config['symbols']:
+        records = fetcher.load_stored_records(symbol, os.path.join(workspace, 'JSON'))
+        xbrl_dir = os.path.join(workspace, 'DATA', symbol.lower(), 'XBRL')
+        os.makedirs(xbrl_dir, exist_ok=True)
+        jobs += downloader.collect_download_jobs(symbol, records, xbrl_dir, verbose=False)[0]
+
+    latencies = []
+    download = timed(downloader.download_xbrl_file, latencies)
+    with ThreadPoolExecutor(max_workers=config['concurrency']) as executor:
+        results = list(executor.map(lambda job: download(*job), jobs))
+    return latencies, results.count(False), get_size(os.path.join(workspace, 'DATA', '*', 'XBRL', '*.xml'))
+
+def get_excel_filepath(xbrl_filepath):
+    """XLSX path next to an XBRL file's folder, created if needed"""
+    xlsx_dir = os.path.join(os.path.dirname(os.path.dirname(xbrl_filepath)), 'XLSX')
+    os.makedirs(xlsx_dir, exist_ok=True)
+    return os.path.join(xlsx_dir, os.path.basename(xbrl_filepath).replace('.xml', '.xlsx'))
+
+def run_convert(config, workspace):
+    """Convert every downloaded XBRL file through the stub converter"""
+    files = sorted(glob.glob(os.path.join(workspace, 'DATA', '*', 'XBRL', '*.xml')))
+    client = converter.ConverterClient(config['converter_url'], sessions=config['concurrency'])
+    latencies = []
+    convert = timed(lambda path: client.convert_to_file(path, get_excel_filepath(path)), latencies)
+    results = [result for _, result in client.convert_many(files, config['concurrency'], convert)]
+    return latencies, results.count(None), get_size(os.path.join(workspace, 'DATA', '*', 'XLSX', '*.xlsx'))
+
+def run_extract(config, workspace):
+    """Extract the fields of every source file in the workspace"""
+    folder, extension, _ = extractor.EXTRACTION_SOURCES[config['source']]
+    files = sorted(glob.glob(os.path.join(workspace, 'DATA', '*', folder, f'*{extension}')))
+    latencies = []
+    failures = 0
+    for path in files:
+        fields, elapsed = extractor.extract_file_timed(config['source'], path)
+        latencies.append(elapsed)
+        failures += None in fields
+    return latencies, failures, sum(os.path.getsize(path) for path in files)
+
+def run_pipeline(config, workspace):
+    """Run pipeline.py end to end in a workspace of its own"""
+    workspace = os.path.join(workspace, 'pipeline')
+    use_workspace(workspace)
+    run = pipeline.Pipeline(
+        config['symbols'], config['source'], json_dir=os.path.join(workspace, 'JSON'),
+        data_dir=os.path.join(workspace, 'DATA'), refresh=True, url=config['api_url'],
+        converter_url=config['converter_url'], rate=0, download_rate=0, download_workers=config['concurrency'],
+        per_host=config['concurrency'], convert_workers=config['concurrency']
+    )
+    run.run()
+    extract_stage = next(stage for stage in run.stages if stage.name == 'extract')
+    failures = sum(len(failed) for failed in run.failed.values())
+    return run.csv_latencies, failures, extract_stage.processed
+
+STAGE_RUNNERS = {
+    'fetch': run_fetch,
+    'download': run_download,
+    'convert': run_convert,
+    'extract': run_extract,
+    'pipeline': run_pipeline
+}
+
+def run_child(stage, config):
+    """Child process: run one stage over the workspace and print its measurements as JSON"""
+    workspace = config['workspace']
+    use_workspace(workspace)
+    os.makedirs(workspace, exist_ok=True)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        latencies, failures, size = STAGE_RUNNERS[stage](config, workspace)
+        elapsed = time.perf_counter() - started
+
+    # The pipeline's size is files extracted; its latencies are per symbol
+    items = size if stage == 'pipeline' else len(latencies)
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    print(json.dumps({
+        'items': items,
+        'failures': failures,
+        'seconds': round(elapsed, 4),
+        'items_per_second': round(items / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(p50 * 1000, 2),
+        'p95_ms': round(p95 * 1000, 2),
+        'p99_ms': round(p99 * 1000, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'bytes': 0 if stage == 'pipeline' else size
+    }))
+
+def get_commit():
+    """Current commit, marked dirty when the tree has uncommitted changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_previous_results(results_file):
+    """Every result recorded so far, oldest first"""
+    if not os.path.exists(results_file):
+        return []
+    with open(results_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def get_config_key(result):
+    """Fields that must match for two results to be comparable"""
+    return tuple(result.get(field) for field in ('stage', 'scale', 'symbols', 'source', 'concurrency', 'latency_ms'))
+
+def compare(result, previous, threshold):
+    """One-line change against the last comparable run, flagging throughput drops beyond threshold"""
+    earlier = [entry for entry in previous if get_config_key(entry) == get_config_key(result)]
+    if not earlier:
+        return "(first run of this configuration)"
+    last = earlier[-1]
+    throughput = (result['items_per_second'] / last['items_per_second'] - 1) * 100 if last['items_per_second'] else 0.0
+    p95 = (result['p95_ms'] / last['p95_ms'] - 1) * 100 if last['p95_ms'] else 0.0
+    flag = "  REGRESSION" if throughput < -threshold else ""
+    return f"vs {last['commit']}: throughput {throughput:+.1f}%, p95 {p95:+.1f}%{flag}"
+
+def get_stages_to_run(requested, source):
+    """Requested stages plus the ones they need as input, in pipeline order"""
+    file_stages = [stage for stage in STAGES[:-1] if not (stage == 'convert' and source == 'xbrl')]
+    last_needed = max((file_stages.index(stage) for stage in requested if stage in file_stages), default=-1)
+    stages = file_stages[:last_needed + 1]
+    if 'pipeline' in requested:
+        stages.append('pipeline')
+    return stages
+
+def main():
+    """Run the requested stages at each scale, record the results and flag regressions"""
+    parser = argparse.ArgumentParser(description="Offline per-stage and end-to-end benchmark over the recorded corpus")
+    parser.add_argument('--symbols', type=int, default=4, help="Recorded symbols to replay (0 = all)")
+    parser.add_argument('--scales', default='1,10,100', help="Comma-separated corpus multipliers")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma-separated stages to report")
+    parser.add_argument('--source', choices=sorted(extractor.EXTRACTION_SOURCES), default='xlsx',
+                        help="What extract and pipeline read (xbrl skips conversion)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Download workers and uploads in flight")
+    parser.add_argument('--latency', type=float, default=0, help="Added delay per stub server request, in ms")
+    parser.add_argument('--threshold', type=float, default=10, help="Throughput drop (%%) reported as a regression")
+    parser.add_argument('--results', default=RESULTS_FILE, help="JSON lines file results are appended to")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch workspaces")
+    parser.add_argument('--child', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.config))
+        return
+
+    base_symbols = sorted(os.path.basename(path)[:-5].upper() for path in glob.glob(os.path.join(BASE_DIR, 'JSON', '*.json')))
+    if args.symbols:
+        base_symbols = base_symbols[:args.symbols]
+    requested = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    stages = get_stages_to_run(requested, args.source)
+
+    ReplayHandler.archive = index_archive()
+    ReplayHandler.latency = DelayedConverterHandler.latency = args.latency / 1000
+    replay_server, replay_url = start_server(ReplayHandler)
+    converter_server, converter_url = start_server(DelayedConverterHandler)
+
+    run_id = datetime.now().isoformat(timespec='seconds')
+    commit = get_commit()
+    previous = load_previous_results(args.results)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    print(f"{len(base_symbols)} recorded symbols, {len(ReplayHandler.archive)} recorded XBRL files, "
+          f"{args.latency:g} ms added per request, commit {commit}")
+
+    try:
+        for scale in [int(value) for value in args.scales.split(',')]:
+            symbols = [get_replica_symbol(symbol, replica) for replica in range(1, scale + 1) for symbol in base_symbols]
+            workspace = tempfile.mkdtemp(prefix=f'bench_pipeline_x{scale}_')
+            config = {
+                'workspace': workspace, 'symbols': symbols, 'source': args.source, 'concurrency': args.concurrency,
+                'api_url': f"{replay_url}api/corporates-financial-results", 'converter_url': converter_url
+            }
+            print(f"\n{scale}x: {len(symbols)} symbols ({workspace})")
+            try:
+                for stage in stages:
+                    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', stage,
+                                             '--config', json.dumps(config)],
+                                            capture_output=True, text=True, check=True).stdout
+                    if stage not in requested:
+                        continue
+                    result = {
+                        'run_id': run_id, 'commit': commit, 'python': sys.version.split()[0], 'stage': stage,
+                        'scale': scale, 'symbols': len(base_symbols), 'source': args.source,
+                        'concurrency': args.concurrency, 'latency_ms': args.latency,
+                        **json.loads(output.strip().splitlines()[-1])
+                    }
+                    unit = 'files' if stage != 'fetch' else 'symbols'
+                    print(f"{stage:>9}: {result['items']:6d} {unit:<7} {result['items_per_second']:9.1f}/s  "
+                          f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                          f"peak RSS {result['peak_rss_mb']:6.1f} MB  {result['failures']} failed  "
+                          f"{compare(result, previous, args.threshold)}")
+                    with open(args.results, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(result) + '\n')
+            finally:
+                if not args.keep:
+                    shutil.rmtree(workspace, ignore_errors=True)
+    finally:
+        replay_server.shutdown()
+        converter_server.shutdown()
+
+    print(f"\nResults appended to {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from state import load_state, save_state
+import storage
+
+# Blobs are named by the SHA-256 of the downloaded XBRL. A converted workbook is stored
+# under the hash of the XBRL it came from ({hash}.xlsx), so identical filings convert once.
+
+def get_blob_dir(blob_dir=None):
+    """Return (and create) the content-addressed store that DATA/ files are linked to"""
+    if blob_dir is None:
+        blob_dir = os.path.join(os.path.dirname(__file__), 'BLOBS')
+    os.makedirs(blob_dir, exist_ok=True)
+    return blob_dir
+
+def hash_bytes(data):
+    """Content hash used as the blob name"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(filepath):
+    """Content hash of a file on disk, taken over the decompressed content of a compressed one"""
+    digest = hashlib.sha256()
+    with storage.open_read(filepath) as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_blob_path(digest, extension, blob_dir=None):
+    """Path of a blob: BLOBS/{first two hex digits}/{hash}{extension}"""
+    return os.path.join(get_blob_dir(blob_dir), digest[:2], f"{digest}{extension}")
+
+def get_temp_path(filepath):
+    """Per-thread temporary name so concurrent writers never share a partial file"""
+    return f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def store_blob(data, extension, blob_dir=None, digest=None):
+    """Write bytes into the store under their hash; an existing blob is left untouched"""
+    digest = digest or hash_bytes(data)
+    blob_path = get_blob_path(digest, extension, blob_dir)
+
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temp_path = get_temp_path(blob_path)
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, blob_path)
+
+    return digest, blob_path
+
+def store_stream(chunks, extension, blob_dir=None, digest=None, codec=None):
+    """Write byte chunks into the store, hashing as they arrive; returns (digest, blob_path, size).
+
+    Chunks go to a temporary file next to the blobs and are renamed into place only once
+    complete, so memory stays at one chunk and no partial blob is ever visible. With a codec
+    the blob is stored compressed; digest and size are still those of the content itself.
+    """
+    blob_dir = get_blob_dir(blob_dir)
+    os.makedirs(blob_dir, exist_ok=True)
+    temp_path = get_temp_path(os.path.join(blob_dir, 'incoming'))
+    hasher = None if digest else hashlib.sha256()
+    size = 0
+
+    def read_chunks():
+        """Pass the chunks on, hashing and counting them on the way"""
+        nonlocal size
+        for chunk in chunks:
+            if hasher:
+                hasher.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in storage.compress_chunks(read_chunks(), codec):
+                f.write(chunk)
+
+        digest = digest or hasher.hexdigest()
+        blob_path = get_blob_path(digest, extension, blob_dir)
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(temp_path, blob_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return digest, blob_path, size
+
+def link_blob(blob_path, filepath):
+    """Point filepath at a blob with a hard link, copying where links are not supported"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    temp_path = get_temp_path(filepath)
+    try:
+        os.link(blob_path, temp_path)
+    except OSError:
+        shutil.copyfile(blob_path, temp_path)
+    os.replace(temp_path, filepath)
+
+def save_and_link(data, filepath, extension, blob_dir=None, digest=None):
+    """Store bytes in the blob store and link them at filepath; returns the content hash"""
+    digest, blob_path = store_blob(data, extension, blob_dir, digest)
+    link_blob(blob_path, filepath)
+    return digest
+
+def save_stream_and_link(chunks, filepath, extension, blob_dir=None, digest=None, codec=None):
+    """Stream chunks into the blob store and link them at filepath; returns (content hash, size)"""
+    digest, blob_path, size = store_stream(chunks, extension, blob_dir, digest, codec)
+    link_blob(blob_path, filepath)
+    return digest, size
+
+def link_existing(digest, extension, filepath, blob_dir=None):
+    """Link filepath to a blob that is already stored; False if there is no such blob"""
+    blob_path = get_blob_path(digest, extension, blob_dir)
+    if not os.path.exists(blob_path):
+        return False
+    link_blob(blob_path, filepath)
+    return True
+
+def adopt_file(filepath, extension, blob_dir=None, digest=None):
+    """Move an existing DATA/ file into the store, replacing duplicates with links to one blob"""
+    digest = digest or hash_file(filepath)
+    blob_path = get_blob_path(digest, extension, blob_dir)
+
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(filepath, blob_path)
+        except OSError:
+            shutil.copyfile(filepath, blob_path)
+    elif not os.path.samefile(blob_path, filepath):
+        link_blob(blob_path, filepath)
+
+    return digest
+
+def load_url_index(blob_dir=None):
+    """XBRL URL -> content hash of every download already in the store"""
+    return load_state('urls', get_blob_dir(blob_dir))
+
+def save_url_index(url_index, blob_dir=None):
+    """Persist the URL index next to the blobs"""
+    save_state('urls', url_index, get_blob_dir(blob_dir))
+
+def migrate(blob_dir=None):
+    """Move the existing DATA/ tree into the store and index the XBRL URLs from JSON/"""
+    # Imported here: downloader imports this module to store its downloads
+    from downloader import build_xbrl_filename
+
+    base_dir = os.path.dirname(__file__)
+    data_dir = os.path.join(base_dir, 'DATA')
+    json_dir = os.path.join(base_dir, 'JSON')
+    url_index = load_url_index(blob_dir)
+    xbrl_hashes = {}
+    file_count = 0
+
+    if not os.path.exists(data_dir):
+        print(f"[ERROR] DATA directory not found: {data_dir}")
+        return url_index
+
+    for symbol in sorted(os.listdir(data_dir)):
+        xbrl_dir = os.path.join(data_dir, symbol, 'XBRL')
+        xlsx_dir = os.path.join(data_dir, symbol, 'XLSX')
+
+        if os.path.exists(xbrl_dir):
+            for filename in sorted(os.listdir(xbrl_dir)):
+                if filename.endswith('.xml'):
+                    xbrl_hashes[(symbol, filename)] = adopt_file(os.path.join(xbrl_dir, filename), '.xml', blob_dir)
+                    file_count += 1
+
+        # Workbooks are keyed by the hash of the XBRL they were converted from
+        if os.path.exists(xlsx_dir):
+            for filename in sorted(os.listdir(xlsx_dir)):
+                digest = xbrl_hashes.get((symbol, filename.replace('.xlsx', '.xml')))
+                if filename.endswith('.xlsx') and not filename.startswith('~$') and digest:
+                    adopt_file(os.path.join(xlsx_dir, filename), '.xlsx', blob_dir, digest)
+                    file_count += 1
+
+    # Map each XBRL URL in the NSE records to the blob its file was stored as
+    if os.path.exists(json_dir):
+        for json_file in sorted(os.listdir(json_dir)):
+            if not json_file.endswith('.json'):
+                continue
+            try:
+                with storage.open_text(os.path.join(json_dir, json_file)) as f:
+                    records = json.load(f)
+            except Exception as e:
+                print(f"[ERROR] Failed to read {json_file}: {e}")
+                continue
+            for record in records if isinstance(records, list) else []:
+                filename = build_xbrl_filename(record)
+                digest = xbrl_hashes.get((json_file[:-5], filename))
+                if digest:
+                    url_index[record['xbrl'].strip()] = digest
+
+    save_url_index(url_index, blob_dir)
+    unique_count = len(set(xbrl_hashes.values()))
+    print(f"[OK] Linked {file_count} files; {len(xbrl_hashes)} XBRL files share {unique_count} unique blobs")
+    print(f"[INFO] Indexed {len(url_index)} XBRL URLs")
+    return url_index
+
+def main():
+    """Move DATA/ into the content-addressed store"""
+    print("Migrating DATA/ into BLOBS/...")
+    migrate()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,31 @@
+import argparse
+import io
+import itertools
+import queue
+import re
 import requests
 import os
-import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from http_client import get_session, create_session
+from resilience import request_with_retry, call_with_retry, retry_failed, RETRY_STATUSES
+import manifest
+import metrics
+import blobstore
+import local_converter
+import selection
+import storage
+
+# Shared remote converter; run `python local_converter.py --serve` for a local drop-in
+EC2_URL = "http://ec2-3-221-41-38.compute-1.amazonaws.com/"
+
+# (connect, read) timeouts: large files take a while to convert on the remote side
+CONVERTER_TIMEOUT = (10, 120)
+
+# A 500 on upload usually means stale ViewState, which upload() handles by refreshing its tokens
+UPLOAD_RETRY_STATUSES = RETRY_STATUSES - {500}
 
 def create_xlsx_folder(symbol):
     """Create XLSX folder for the symbol"""
@@ -10,96 +34,281 @@ def create_xlsx_folder(symbol):
     os.makedirs(xlsx_dir, exist_ok=True)
     return xlsx_dir
 
+# The three hidden ASP.NET postback fields, matched in one pass over the page
+FORM_FIELD_NAMES = ('__VIEWSTATE', '__VIEWSTATEGENERATOR', '__EVENTVALIDATION')
+FORM_FIELD_PATTERN = re.compile(r'name="(__VIEWSTATE|__VIEWSTATEGENERATOR|__EVENTVALIDATION)"[^>]*?value="([^"]*)"')
+
+FORM_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5'
+}
+
 def extract_viewstate_and_validation(html_content):
     """Extract ViewState and validation fields from ASP.NET page"""
-    import re
+    form_data = dict.fromkeys(FORM_FIELD_NAMES, '')
+    for name, value in FORM_FIELD_PATTERN.findall(html_content):
+        form_data[name] = form_data[name] or value
+    return form_data
+
+# Workbook responses are written as they arrive, one chunk in memory at a time
+CHUNK_SIZE = 64 * 1024
+
+def is_excel_response(headers, first_chunk):
+    """Whether a converter response is a workbook, from its headers or the ZIP signature of its first chunk"""
+    content_type = headers.get('content-type', '').lower()
     
-    viewstate_match = re.search(r'name="__VIEWSTATE".*?value="([^"]*)"', html_content, re.DOTALL)
-    viewstate_generator_match = re.search(r'name="__VIEWSTATEGENERATOR".*?value="([^"]*)"', html_content, re.DOTALL)
-    event_validation_match = re.search(r'name="__EVENTVALIDATION".*?value="([^"]*)"', html_content, re.DOTALL)
+    # Check for Excel file indicators
+    if ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type or
+        'application/octet-stream' in content_type or
+        'excel' in content_type or
+        headers.get('content-disposition', '').startswith('attachment')):
+        return True
     
-    return {
-        '__VIEWSTATE': viewstate_match.group(1) if viewstate_match else '',
-        '__VIEWSTATEGENERATOR': viewstate_generator_match.group(1) if viewstate_generator_match else '',
-        '__EVENTVALIDATION': event_validation_match.group(1) if event_validation_match else ''
-    }
+    # Otherwise only a ZIP/Excel file signature counts
+    return first_chunk[:2] == b'PK'
 
-def upload_and_convert_xbrl(xbrl_filepath, ec2_url):
-    """Upload XBRL file to EC2 converter and get converted Excel file"""
-    try:
-        filename = os.path.basename(xbrl_filepath)
-        print(f"Converting: {filename}")
-        
-        session = requests.Session()
+def open_excel_stream(response):
+    """(chunk iterator, None) for a workbook response, else (None, page bytes) so the page can be inspected"""
+    chunks = (chunk for chunk in response.iter_content(CHUNK_SIZE) if chunk)
+    first_chunk = next(chunks, b'')
+    if is_excel_response(response.headers, first_chunk):
+        return itertools.chain([first_chunk], chunks), None
+    return None, first_chunk + b''.join(chunks)
+
+class MultipartBody:
+    """multipart/form-data body that reads its file part from disk as it is sent.
+
+    len() gives requests the Content-Length, so the upload is not chunk-encoded and the
+    file is never held in memory as a whole.
+    """
+    
+    def __init__(self, fields, file_field, filepath, file_content_type='application/xml'):
+        self.boundary = uuid.uuid4().hex
+        head = ''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{os.path.basename(filepath)}"\r\nContent-Type: {file_content_type}\r\n\r\n')
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        head = head.encode('utf-8')
         
-        # Step 1: Get the initial page to extract ViewState
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive'
+        # A compressed XBRL file is sent decompressed, as the converter expects plain XML
+        self.size = len(head) + storage.get_size(filepath) + len(tail)
+        self.parts = [io.BytesIO(head), storage.open_read(filepath), io.BytesIO(tail)]
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+    
+    def __len__(self):
+        return self.size
+    
+    def read(self, size=-1):
+        """Next bytes of the body, moving through head, file and tail"""
+        data = b''
+        while self.parts and (size < 0 or len(data) < size):
+            chunk = self.parts[0].read(-1 if size < 0 else size - len(data))
+            if chunk:
+                data += chunk
+            else:
+                self.parts.pop(0).close()
+        return data
+    
+    def close(self):
+        """Close whatever parts of the body are still open"""
+        for part in self.parts:
+            part.close()
+        self.parts = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ConverterClient:
+    """Uploads to the converter form through a pool of sessions, each reusing its form tokens across uploads"""
+    
+    def __init__(self, url, sessions=1, delay=0):
+        self.url = url
+        self.delay = delay
+        self.slots = queue.Queue()
+        self.size = 0
+        self.form_fetches = 0
+        self.lock = threading.Lock()
+        self.grow(sessions)
+    
+    def grow(self, sessions):
+        """Add sessions until the client has at least the given number; uploads in flight are unaffected"""
+        with self.lock:
+            first = self.size
+            self.size = max(self.size, sessions, 1)
+            added = range(first, self.size)
+        for index in added:
+            # The first slot uses the shared keep-alive session; ASP.NET may tie tokens to its cookies
+            session = get_session(self.url) if index == 0 else create_session(1)
+            self.slots.put({'session': session, 'form_data': None})
+    
+    def fetch_form(self, slot):
+        """GET the form page and cache its postback fields on the slot"""
+        response = request_with_retry(slot['session'], 'GET', self.url, timeout=CONVERTER_TIMEOUT, headers=FORM_HEADERS)
+        response.raise_for_status()
+        slot['form_data'] = extract_viewstate_and_validation(response.text)
+        with self.lock:
+            self.form_fetches += 1
+    
+    def clear_form_tokens(self):
+        """Forget every cached token, e.g. after the converter was redeployed"""
+        slots = [self.slots.get() for _ in range(self.slots.qsize())]
+        for slot in slots:
+            slot['form_data'] = None
+            self.slots.put(slot)
+    
+    def post_file(self, slot, xbrl_filepath):
+        """POST one file with the slot's cached postback fields; the response body is left unread"""
+        # Add ASP.NET form fields
+        fields = {
+            '__EVENTTARGET': 'Button1',
+            '__EVENTARGUMENT': '',
+            **slot['form_data'],
+            'Button1': 'Validate'
         }
         
-        initial_response = session.get(ec2_url, headers=headers)
-        initial_response.raise_for_status()
+        # Every attempt streams the file again from a fresh body
+        def send():
+            """POST the file on this slot's session"""
+            with MultipartBody(fields, 'FileUploadControl', xbrl_filepath) as body:
+                headers = {**FORM_HEADERS, 'Content-Type': body.content_type}
+                return slot['session'].post(self.url, data=body, headers=headers, timeout=CONVERTER_TIMEOUT, stream=True)
         
-        # Extract ViewState and other ASP.NET fields
-        form_data = extract_viewstate_and_validation(initial_response.text)
+        return call_with_retry(send, self.url, retry_statuses=UPLOAD_RETRY_STATUSES)
+    
+    def upload(self, slot, xbrl_filepath, sink):
+        """Convert one file on a slot and pass the workbook's chunks to sink; refreshes rejected tokens once"""
+        cached = slot['form_data'] is not None
+        if not cached:
+            self.fetch_form(slot)
         
-        # Step 2: Upload the file with proper form data
-        with open(xbrl_filepath, 'rb') as f:
-            files = {
-                'FileUploadControl': (filename, f, 'application/xml')
-            }
-            
-            # Add ASP.NET form fields
-            data = {
-                '__EVENTTARGET': 'Button1',
-                '__EVENTARGUMENT': '',
-                '__VIEWSTATE': form_data['__VIEWSTATE'],
-                '__VIEWSTATEGENERATOR': form_data['__VIEWSTATEGENERATOR'],
-                '__EVENTVALIDATION': form_data['__EVENTVALIDATION'],
-                'Button1': 'Validate'
-            }
-            
-            # Submit the form
-            response = session.post(ec2_url, files=files, data=data, headers=headers, timeout=120)
-            response.raise_for_status()
-            
-            # Check for Excel file indicators
-            if ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' in response.headers.get('content-type', '').lower() or
-                'application/octet-stream' in response.headers.get('content-type', '').lower() or
-                'excel' in response.headers.get('content-type', '').lower() or
-                response.headers.get('content-disposition', '').startswith('attachment')):
-                return response.content
-            
-            # Check if response is large (likely an Excel file)
-            if len(response.content) > 10000:  # Excel files are typically larger
-                # Check if it starts with Excel file signature
-                if response.content[:2] == b'PK':  # ZIP/Excel file signature
-                    return response.content
-            
-            print(f"[INFO] Response content type: {response.headers.get('content-type', '')}")
-            print(f"[INFO] Response length: {len(response.content)} bytes")
+        for attempt in range(2):
+            with self.post_file(slot, xbrl_filepath) as response:
+                chunks, page = open_excel_stream(response) if response.ok else (None, None)
+                if chunks is not None:
+                    return sink(chunks)
+                
+                if attempt or not cached:
+                    response.raise_for_status()
+                    print(f"[INFO] Response content type: {response.headers.get('content-type', '')}")
+                    print(f"[INFO] Response length: {len(page)} bytes")
+                    return None
             
+            # Stale tokens (recycled app pool, new machine key) come back as an error or the form
+            # again; a returned form carries fresh tokens, anything else needs a new GET
+            form_data = extract_viewstate_and_validation(page.decode('utf-8', errors='replace')) if page else None
+            if form_data and form_data['__VIEWSTATE']:
+                slot['form_data'] = form_data
+            else:
+                self.fetch_form(slot)
+    
+    def run(self, xbrl_filepath, sink):
+        """Upload on a free slot, reporting failures instead of raising"""
+        filename = os.path.basename(xbrl_filepath)
+        slot = self.slots.get()
+        try:
+            print(f"Converting: {filename}")
+            with metrics.timer('file_seconds', stage='convert'):
+                return self.upload(slot, xbrl_filepath, sink)
+        except requests.RequestException as e:
+            print(f"[FAIL] Upload failed for {filename}: {e}")
+            slot['form_data'] = None
             return None
-                
-    except requests.RequestException as e:
-        print(f"[FAIL] Upload failed for {filename}: {e}")
-        return None
+        except Exception as e:
+            print(f"[ERROR] Error processing {filename}: {e}")
+            return None
+        finally:
+            # Each slot pauses after its upload, so N slots never exceed N requests per delay
+            metrics.sleep(self.delay, 'politeness')
+            self.slots.put(slot)
+    
+    def convert(self, xbrl_filepath):
+        """Upload XBRL file to the converter and get converted Excel file, or None"""
+        return self.run(xbrl_filepath, b''.join)
+    
+    def convert_to_file(self, xbrl_filepath, excel_filepath, xbrl_hash=None):
+        """Stream the converted workbook into the blob store under the XBRL's hash and link it at excel_filepath"""
+        xbrl_hash = xbrl_hash or blobstore.hash_file(xbrl_filepath)
+        
+        def save(chunks):
+            """Store the workbook chunks and link them at excel_filepath; returns their hash"""
+            digest, size = blobstore.save_stream_and_link(chunks, excel_filepath, '.xlsx', digest=xbrl_hash)
+            print(f"[OK] Saved: {os.path.basename(excel_filepath)} ({size} bytes)")
+            metrics.inc('bytes_total', size, stage='convert')
+            return digest
+        
+        return self.run(xbrl_filepath, save)
+    
+    def convert_many(self, xbrl_filepaths, concurrency=1, convert=None):
+        """Yield (xbrl_filepath, result of convert) as uploads finish, with up to concurrency in flight"""
+        convert = convert or self.convert
+        if concurrency <= 1:
+            for xbrl_filepath in xbrl_filepaths:
+                yield xbrl_filepath, convert(xbrl_filepath)
+            return
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(convert, path): path for path in xbrl_filepaths}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+# One client per converter URL, so form tokens survive across symbols
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_converter_client(url, sessions=1):
+    """Shared client for a converter URL, grown to at least the given number of sessions"""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            # Be respectful to the shared EC2 server: 2 s between uploads on each session
+            client = ConverterClient(url, sessions, delay=2 if url == EC2_URL else 0)
+            _clients[url] = client
+        else:
+            # Grown in place, so threads still holding the client share the same sessions
+            client.grow(sessions)
+        return client
+
+def upload_and_convert_xbrl(xbrl_filepath, ec2_url):
+    """Upload XBRL file to the converter and get converted Excel file, reusing cached form tokens"""
+    return get_converter_client(ec2_url).convert(xbrl_filepath)
+
+def convert_xbrl_locally(xbrl_filepath):
+    """Convert an XBRL file in this process with local_converter (same workbook layout as the EC2 service)"""
+    filename = os.path.basename(xbrl_filepath)
+    try:
+        print(f"Converting: {filename}")
+        with metrics.timer('file_seconds', stage='convert_local'):
+            return local_converter.convert_file(xbrl_filepath)
     except Exception as e:
         print(f"[ERROR] Error processing {filename}: {e}")
         return None
 
-def save_excel_file(excel_data, xlsx_dir, original_filename):
-    """Save Excel data to XLSX folder"""
+def convert_and_save_locally(xbrl_filepath, xlsx_dir, xbrl_file, xbrl_hash=None):
+    """Convert one file in-process and save the workbook; True on success"""
+    excel_data = convert_xbrl_locally(xbrl_filepath)
+    return bool(excel_data) and save_excel_file(excel_data, xlsx_dir, xbrl_file, xbrl_hash)
+
+def save_excel_file(excel_data, xlsx_dir, original_filename, xbrl_hash=None):
+    """Save Excel data to XLSX folder, storing it under the source XBRL's hash when one is given"""
     # Create Excel filename from original XBRL filename
     excel_filename = original_filename.replace('.xml', '.xlsx')
     excel_filepath = os.path.join(xlsx_dir, excel_filename)
     
     try:
-        with open(excel_filepath, 'wb') as f:
-            f.write(excel_data)
+        if xbrl_hash:
+            blobstore.save_and_link(excel_data, excel_filepath, '.xlsx', digest=xbrl_hash)
+        else:
+            # Written aside and renamed, so a partial workbook never appears in DATA/
+            temp_path = blobstore.get_temp_path(excel_filepath)
+            with open(temp_path, 'wb') as f:
+                f.write(excel_data)
+            os.replace(temp_path, excel_filepath)
         
         print(f"[OK] Saved: {excel_filename} ({len(excel_data)} bytes)")
         return True
@@ -108,8 +317,24 @@ def save_excel_file(excel_data, xlsx_dir, original_filename):
         print(f"[ERROR] Failed to save {excel_filename}: {e}")
         return False
 
-def convert_symbol_xbrl_files(symbol):
-    """Convert all XBRL files for a specific symbol to Excel"""
+def get_xbrl_files_to_convert(symbol, xbrl_dir, conn=None):
+    """XBRL file names to convert: downloaded-but-unconverted filings from the manifest, else a directory listing"""
+    if conn is not None:
+        return [os.path.basename(manifest.to_absolute(row['xbrl_path']))
+                for row in manifest.filings_needing(conn, 'converted', symbol) if row['xbrl_path']]
+    return [f for f in os.listdir(xbrl_dir) if f.endswith('.xml')]
+
+def record_conversion_result(conn, symbol, xbrl_file, excel_filepath, ok):
+    """Record a finished conversion in the manifest, if one is in use"""
+    if conn is None:
+        return
+    if ok:
+        manifest.mark_stage(conn, symbol, xbrl_file, 'converted', xlsx_path=excel_filepath)
+    else:
+        manifest.mark_failed(conn, symbol, xbrl_file, 'convert', 'conversion failed')
+
+def convert_symbol_xbrl_files(symbol, conn=None, converter_url=EC2_URL, local=False, concurrency=1, select=None):
+    """Convert all XBRL files for a specific symbol to Excel, in-process when local is set"""
     base_dir = os.path.dirname(__file__)
     xbrl_dir = os.path.join(base_dir, 'DATA', symbol.lower(), 'XBRL')
     
@@ -122,11 +347,11 @@ def convert_symbol_xbrl_files(symbol):
     xlsx_dir = create_xlsx_folder(symbol)
     print(f"Excel files will be saved to: {xlsx_dir}")
     
-    # EC2 converter URL
-    ec2_url = "http://ec2-3-221-41-38.compute-1.amazonaws.com/"
-    
-    # Get all XBRL files
-    xbrl_files = [f for f in os.listdir(xbrl_dir) if f.endswith('.xml')]
+    # Get all XBRL files, minus filings outside --select (which are never uploaded)
+    xbrl_files = get_xbrl_files_to_convert(symbol, xbrl_dir, conn)
+    xbrl_files, filtered_count = selection.filter_files(xbrl_files, selection.load_selected_names(symbol, select), 'convert')
+    if filtered_count:
+        print(f"[SKIP] Filtered out by --select: {filtered_count} files")
     
     if not xbrl_files:
         print(f"[SKIP] No XBRL files found for {symbol} in {xbrl_dir}")
@@ -136,45 +361,106 @@ def convert_symbol_xbrl_files(symbol):
     
     # Convert each file
     converted_count = 0
+    linked_count = 0
     failed_count = 0
     skipped_count = 0
+    pending = {}
+    queued_hashes = set()
+    repeated = []
     
     for xbrl_file in xbrl_files:
         xbrl_filepath = os.path.join(xbrl_dir, xbrl_file)
         excel_filename = xbrl_file.replace('.xml', '.xlsx')
         excel_filepath = os.path.join(xlsx_dir, excel_filename)
         
-        # Skip if Excel file already exists
-        if os.path.exists(excel_filepath):
+        # Skip if Excel file already exists (the manifest only lists unconverted files)
+        if conn is None and os.path.exists(excel_filepath):
             print(f"[SKIP] {excel_filename} (already exists)")
             skipped_count += 1
             continue
         
-        # Upload and convert
-        excel_data = upload_and_convert_xbrl(xbrl_filepath, ec2_url)
+        # Identical XBRL content (e.g. a re-filed duplicate) reuses the workbook already converted
+        xbrl_hash = blobstore.hash_file(xbrl_filepath) if os.path.exists(xbrl_filepath) else None
+        if xbrl_hash and blobstore.link_existing(xbrl_hash, '.xlsx', excel_filepath):
+            print(f"[SKIP] {excel_filename} (identical XBRL already converted, linked)")
+            record_conversion_result(conn, symbol, xbrl_file, excel_filepath, True)
+            linked_count += 1
+            continue
         
-        if excel_data:
-            if save_excel_file(excel_data, xlsx_dir, xbrl_file):
-                converted_count += 1
-            else:
-                failed_count += 1
+        # Repeats of content already queued in this run are linked once it is converted
+        if xbrl_hash in queued_hashes:
+            repeated.append((xbrl_file, xbrl_hash))
+            continue
+        if xbrl_hash:
+            queued_hashes.add(xbrl_hash)
+        pending[xbrl_filepath] = (xbrl_file, xbrl_hash)
+    
+    def get_excel_filepath(xbrl_filepath):
+        """DATA/{symbol}/XLSX path of a pending file's workbook"""
+        return os.path.join(xlsx_dir, pending[xbrl_filepath][0].replace('.xml', '.xlsx'))
+    
+    # Convert in-process, or stream uploads' workbooks to disk with up to `concurrency` in flight
+    if local:
+        results = (
+            (xbrl_filepath, convert_and_save_locally(xbrl_filepath, xlsx_dir, *pending[xbrl_filepath]))
+            for xbrl_filepath in pending
+        )
+    else:
+        client = get_converter_client(converter_url, concurrency)
+        results = client.convert_many(list(pending), concurrency, lambda xbrl_filepath: client.convert_to_file(
+            xbrl_filepath, get_excel_filepath(xbrl_filepath), pending[xbrl_filepath][1]
+        ))
+    
+    # Results are recorded on this thread, so the manifest connection is never shared
+    failed_paths = []
+    for xbrl_filepath, result in results:
+        xbrl_file = pending[xbrl_filepath][0]
+        excel_filepath = get_excel_filepath(xbrl_filepath)
+        ok = bool(result)
+        record_conversion_result(conn, symbol, xbrl_file, excel_filepath, ok)
+        if ok:
+            converted_count += 1
         else:
-            failed_count += 1
+            failed_paths.append(xbrl_filepath)
+    
+    # Uploads that failed (e.g. while the converter was throttled or down) get another chance;
+    # local failures are parse errors, which a retry would only repeat
+    if failed_paths and not local:
+        def retry(xbrl_filepath):
+            """Upload one failed file again and record the outcome"""
+            excel_filepath = get_excel_filepath(xbrl_filepath)
+            ok = bool(client.convert_to_file(xbrl_filepath, excel_filepath, pending[xbrl_filepath][1]))
+            record_conversion_result(conn, symbol, pending[xbrl_filepath][0], excel_filepath, ok)
+            return ok
         
-        # Add delay to be respectful to the server
-        time.sleep(2)
+        failed_paths = retry_failed(failed_paths, retry, 'conversions')
+        converted_count = len(pending) - len(failed_paths)
+    failed_count += len(failed_paths)
+    
+    for xbrl_file, xbrl_hash in repeated:
+        excel_filepath = os.path.join(xlsx_dir, xbrl_file.replace('.xml', '.xlsx'))
+        ok = blobstore.link_existing(xbrl_hash, '.xlsx', excel_filepath)
+        record_conversion_result(conn, symbol, xbrl_file, excel_filepath, ok)
+        if ok:
+            linked_count += 1
+        else:
+            failed_count += 1
     
     # Print summary for this symbol
     print(f"\nConversion Summary for {symbol}:")
     print(f"[OK] Successfully converted: {converted_count} files")
     print(f"[SKIP] Already existed: {skipped_count} files")
+    print(f"[SKIP] Linked to an identical conversion: {linked_count} files")
     print(f"[FAIL] Failed conversions: {failed_count} files")
     print(f"[INFO] Excel files saved to: {xlsx_dir}")
     
-    return converted_count > 0
+    return converted_count + linked_count > 0
 
-def get_available_symbols_with_xbrl():
-    """Get list of symbols that have XBRL directories"""
+def get_available_symbols_with_xbrl(conn=None):
+    """Get list of symbols that have XBRL directories, or unconverted filings in the manifest"""
+    if conn is not None:
+        return manifest.symbols_needing(conn, 'converted')
+    
     base_dir = os.path.dirname(__file__)
     data_dir = os.path.join(base_dir, 'DATA')
     
@@ -193,13 +479,13 @@ def get_available_symbols_with_xbrl():
     
     return sorted(symbols)
 
-def convert_all_symbols():
+def convert_all_symbols(conn=None, converter_url=EC2_URL, local=False, concurrency=1, select=None):
     """Convert XBRL files to Excel for all available symbols"""
     print("Starting bulk XBRL to Excel conversion for all symbols...")
     print("=" * 70)
     
     # Get available symbols with XBRL directories
-    symbols = get_available_symbols_with_xbrl()
+    symbols = get_available_symbols_with_xbrl(conn)
     if not symbols:
         print("No symbols with XBRL directories found. Run downloader.py first.")
         return
@@ -214,7 +500,7 @@ def convert_all_symbols():
         print(f"\n[{i}/{len(symbols)}] Processing {symbol}...")
         print("-" * 50)
         
-        if convert_symbol_xbrl_files(symbol):
+        if convert_symbol_xbrl_files(symbol, conn, converter_url, local, concurrency, select):
             total_successful += 1
         else:
             total_failed += 1
@@ -228,7 +514,27 @@ def convert_all_symbols():
 
 def main():
     """Main function to convert XBRL files to Excel for all symbols"""
-    convert_all_symbols()
+    parser = argparse.ArgumentParser(description="Convert downloaded XBRL files to Excel")
+    parser.add_argument('--local', action='store_true',
+                        help="Convert in this process with local_converter.py instead of uploading")
+    parser.add_argument('--url', default=EC2_URL,
+                        help="Converter service URL, e.g. a local_converter.py --serve instance (default: EC2)")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Uploads in flight at once, each on its own session (default: 1)")
+    selection.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    
+    # Use the manifest for work discovery when it exists (python manifest.py --sync)
+    conn = manifest.open_if_exists()
+    if conn is not None:
+        print("[INFO] Using manifest: STATE/manifest.db")
+    
+    with metrics.collect('convert', args.metrics, args.profile):
+        convert_all_symbols(conn, args.url, args.local, args.concurrency, args.select)
+    
+    if conn is not None:
+        conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
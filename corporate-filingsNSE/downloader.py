@@ -1,33 +1,76 @@
 import requests
+import itertools
 import json
 import os
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 from pathlib import Path
+from ratelimit import TokenBucket
+import http_cache
+import http_client
+from http_client import get_session
+from resilience import call_with_retry, retry_failed, DEFAULT_TIMEOUT
+from state import load_state, save_state
+import manifest
+import metrics
+import blobstore
+import selection
+import storage
 
-def download_xbrl_file(url, filepath):
-    """Download XBRL file from URL and save to filepath"""
+# Downloads are written as they arrive, so memory per worker is one chunk whatever the file size
+CHUNK_SIZE = 64 * 1024
+
+def looks_like_xml(first_chunk):
+    """Sniff the start of a body: XBRL is XML, while error and bot-check pages come back as HTML"""
+    head = first_chunk.lstrip(b'\xef\xbb\xbf \t\r\n')[:64].lower()
+    return head.startswith(b'<') and not head.startswith((b'<!doctype html', b'<html'))
+
+def download_xbrl_file(url, filepath, session=None):
+    """Download XBRL file from URL into the blob store and link it at filepath; returns its content hash"""
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Accept": "application/xml, text/xml, */*",
-        "Accept-Language": "en-US,en;q=0.9",
         "Referer": "https://www.nseindia.com/"
     }
     
+    # A file already on disk is only here to be revalidated (--http-cache); a 304 keeps it as it is
+    revalidate = http_cache.is_enabled() and os.path.exists(filepath)
+    if revalidate:
+        headers.update(http_cache.get_conditional_headers(url, filepath))
+    
+    started = time.perf_counter()
     try:
-        print(f"Downloading: {os.path.basename(filepath)}")
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        print(f"{'Revalidating' if revalidate else 'Downloading'}: {os.path.basename(filepath)}")
+        session = session or get_session(url)
+        # Timeouts, backoff on 429/403/5xx and the host's circuit breaker apply before any byte is saved
+        send = lambda: session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT, stream=True)
+        with call_with_retry(send, url) as response:
+            if revalidate and response.status_code == 304:
+                http_cache.touch(url)
+                metrics.inc('not_modified_total', stage='download')
+                print(f"[SKIP] Not modified: {os.path.basename(filepath)}")
+                return (http_cache.get_entry(url) or {}).get('content_hash') or blobstore.hash_file(filepath)
+            response.raise_for_status()
+            
+            chunks = (chunk for chunk in response.iter_content(CHUNK_SIZE) if chunk)
+            first_chunk = next(chunks, b'')
+            if not looks_like_xml(first_chunk):
+                print(f"[FAIL] Not an XBRL document: {os.path.basename(filepath)} "
+                      f"({response.headers.get('content-type', 'no content type')})")
+                return False
+            
+            # Hash while streaming into the blob store, then link the DATA/ file to the finished blob
+            content_hash, size = blobstore.save_stream_and_link(
+                itertools.chain([first_chunk], chunks), filepath, '.xml', codec=storage.get_compression()
+            )
+            http_cache.record(http_cache.get_validators(url, response), content_hash=content_hash)
         
-        # Save the file
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
-        print(f"[OK] Downloaded: {os.path.basename(filepath)} ({len(response.content)} bytes)")
-        return True
+        print(f"[OK] Downloaded: {os.path.basename(filepath)} ({size} bytes)")
+        metrics.inc('bytes_total', size, stage='download')
+        metrics.observe('file_seconds', time.perf_counter() - started, stage='download')
+        return content_hash
         
     except requests.RequestException as e:
         print(f"[FAIL] Failed to download {os.path.basename(filepath)}: {e}")
@@ -72,81 +115,210 @@ def create_symbol_directories(symbol):
     os.makedirs(xbrl_dir, exist_ok=True)
     return xbrl_dir
 
-def read_json_and_download(symbol):
-    """Read JSON file and download all XBRL files for a symbol"""
+def build_xbrl_filename(record):
+    """Build the local DATA/{symbol}/XBRL filename for a filing record, or None if it has no XBRL"""
+    xbrl_url = (record.get('xbrl') or '').strip()
+    filing_date = (record.get('filingDate') or '').strip()
+    
+    # Skip records with invalid XBRL links
+    if not is_valid_xbrl_link(xbrl_url):
+        return None
+    
+    # Generate filename
+    filename = get_filename_from_url(xbrl_url)
+    
+    # Add filing date prefix for better organization
+    if filing_date:
+        # Clean filing date for filename (remove special characters)
+        clean_date = filing_date.replace(':', '').replace(' ', '_').replace('-', '')
+        filename = f"{clean_date}_{filename}"
+    
+    return filename
+
+def load_symbol_records(symbol):
+    """Read the stored NSE filing records for a symbol, or None if unavailable"""
     base_dir = os.path.dirname(__file__)
     json_path = os.path.join(base_dir, 'JSON', f'{symbol.lower()}.json')
     
     # Check if JSON file exists
     if not os.path.exists(json_path):
         print(f"[ERROR] JSON file not found: {json_path}")
-        return False
-    
-    # Create XBRL directory for this symbol
-    xbrl_dir = create_symbol_directories(symbol)
-    print(f"XBRL files will be saved to: {xbrl_dir}")
+        return None
     
     # Read JSON file
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
+        with storage.open_text(json_path) as f:
             data = json.load(f)
     except Exception as e:
         print(f"[ERROR] Failed to read JSON file for {symbol}: {e}")
-        return False
+        return None
     
     if not data:
         print(f"[ERROR] No data found in JSON file for {symbol}")
-        return False
+        return None
     
-    # Download files
-    downloaded_count = 0
-    failed_count = 0
+    return data
+
+def collect_download_jobs(symbol, data, xbrl_dir, verbose=True):
+    """List (url, filepath) pairs still to download for a symbol and count files already present"""
+    jobs = []
     skipped_count = 0
     
     for record in data:
-        xbrl_url = record.get('xbrl', '').strip()
-        filing_date = record.get('filingDate', '').strip()
-        
-        # Skip records with invalid XBRL links
-        if not is_valid_xbrl_link(xbrl_url):
+        filename = build_xbrl_filename(record)
+        if filename is None:
             continue
         
-        # Generate filename
-        filename = get_filename_from_url(xbrl_url)
-        
-        # Add filing date prefix for better organization
-        if filing_date:
-            # Clean filing date for filename (remove special characters)
-            clean_date = filing_date.replace(':', '').replace(' ', '_').replace('-', '')
-            filename = f"{clean_date}_{filename}"
-        
         filepath = os.path.join(xbrl_dir, filename)
         
-        # Skip if file already exists
-        if os.path.exists(filepath):
-            print(f"[SKIP] {filename} (already exists)")
+        # Skip if file already exists, unless the HTTP cache says it is due for revalidation
+        if os.path.exists(filepath) and not http_cache.needs_revalidation(record['xbrl'].strip(), 'xbrl'):
+            if verbose:
+                print(f"[SKIP] {filename} (already exists)")
             skipped_count += 1
             continue
         
+        jobs.append((record['xbrl'].strip(), filepath))
+    
+    return jobs, skipped_count
+
+def collect_manifest_jobs(conn, symbol, xbrl_dir):
+    """List (url, filepath) pairs the manifest still has in 'fetched' state, plus downloaded ones due for revalidation"""
+    jobs = [
+        (row['xbrl_url'], os.path.join(xbrl_dir, f"{row['filename']}.xml"))
+        for row in manifest.filings_needing(conn, 'downloaded', symbol)
+        if row['xbrl_url']
+    ]
+    
+    # Filings already downloaded are revalidated with the server once their XBRL TTL has passed
+    if http_cache.is_enabled():
+        for row in manifest.filings_at_least(conn, symbol, 'downloaded'):
+            if not row['xbrl_url'] or not http_cache.needs_revalidation(row['xbrl_url'], 'xbrl'):
+                continue
+            filepath = os.path.join(xbrl_dir, f"{row['filename']}.xml")
+            if row['content_hash'] is None and os.path.exists(filepath):
+                # Filings synced from disk have no hash yet; an unchanged revalidation must match it
+                manifest.set_content_hash(conn, symbol, filepath, blobstore.hash_file(filepath))
+            jobs.append((row['xbrl_url'], filepath))
+        conn.commit()
+    return jobs, 0
+
+def link_known_url(url, filepath, url_index):
+    """Link filepath to the stored download of the same URL instead of fetching it again"""
+    if os.path.exists(filepath):
+        # Already linked; it is queued to be revalidated with the server, not relinked
+        return None
+    content_hash = url_index.get(url)
+    if content_hash and blobstore.link_existing(content_hash, '.xml', filepath):
+        print(f"[SKIP] {os.path.basename(filepath)} (same URL already downloaded, linked)")
+        return content_hash
+    return None
+
+def get_download_jobs(symbol, xbrl_dir, conn=None, verbose=True, select=None):
+    """(jobs, already present, filtered out by select) for a symbol, from the manifest when available, else its JSON"""
+    if conn is not None:
+        jobs, skipped_count = collect_manifest_jobs(conn, symbol, xbrl_dir)
+    else:
+        data = load_symbol_records(symbol)
+        if data is None:
+            return None
+        jobs, skipped_count = collect_download_jobs(symbol, data, xbrl_dir, verbose)
+    
+    # Filings outside --select are never downloaded, so they never reach conversion or extraction either
+    selected_names = selection.load_selected_names(symbol, select)
+    jobs, filtered_count = selection.filter_files(jobs, selected_names, 'download', lambda job: job[1])
+    return jobs, skipped_count, filtered_count
+
+def record_download_result(conn, symbol, filepath, content_hash):
+    """Record a finished download (its content hash, or False on failure) in the manifest, if one is in use"""
+    if conn is None:
+        return
+    if content_hash:
+        row = manifest.get_filing(conn, symbol, filepath)
+        if row is not None and row['status'] != 'fetched' and row['content_hash'] == content_hash:
+            # Revalidated and unchanged: the filing keeps the stage it had reached
+            return
+        manifest.mark_stage(conn, symbol, filepath, 'downloaded', xbrl_path=filepath, content_hash=content_hash)
+    else:
+        manifest.mark_failed(conn, symbol, filepath, 'download', 'download failed')
+
+def retry_failed_downloads(failed_jobs, url_index, conn=None, download=download_xbrl_file):
+    """End-of-run retry pass over (symbol, url, filepath) downloads that failed; returns how many recovered"""
+    def retry(job):
+        """Download one failed file again and record the outcome"""
+        symbol, url, filepath = job
+        content_hash = download(url, filepath)
+        record_download_result(conn, symbol, filepath, content_hash)
+        if content_hash:
+            url_index[url] = content_hash
+        return bool(content_hash)
+    
+    remaining = retry_failed(failed_jobs, retry, 'downloads')
+    return len(failed_jobs) - len(remaining)
+
+def read_json_and_download(symbol, conn=None, url_index=None, failed_jobs=None, select=None):
+    """Read JSON file and download all XBRL files for a symbol; failures are appended to failed_jobs if given"""
+    # Create XBRL directory for this symbol
+    xbrl_dir = create_symbol_directories(symbol)
+    
+    result = get_download_jobs(symbol, xbrl_dir, conn, select=select)
+    if result is None:
+        return False
+    jobs, skipped_count, filtered_count = result
+    print(f"XBRL files will be saved to: {xbrl_dir}")
+    
+    if url_index is None:
+        url_index = blobstore.load_url_index()
+    
+    # Download files
+    downloaded_count = 0
+    linked_count = 0
+    failed_count = 0
+    
+    for xbrl_url, filepath in jobs:
+        # A URL seen before (e.g. a re-filed record) is linked, not downloaded again
+        content_hash = link_known_url(xbrl_url, filepath, url_index)
+        if content_hash:
+            record_download_result(conn, symbol, filepath, content_hash)
+            linked_count += 1
+            continue
+        
         # Download the file
-        if download_xbrl_file(xbrl_url, filepath):
+        content_hash = download_xbrl_file(xbrl_url, filepath)
+        record_download_result(conn, symbol, filepath, content_hash)
+        if content_hash:
+            url_index[xbrl_url] = content_hash
             downloaded_count += 1
         else:
             failed_count += 1
+            if failed_jobs is not None:
+                failed_jobs.append((symbol, xbrl_url, filepath))
         
         # Add small delay to be respectful to the server
-        time.sleep(1)
+        metrics.sleep(1, 'politeness')
+    
+    blobstore.save_url_index(url_index)
+    http_cache.save()
     
     print(f"\nDownload Summary for {symbol}:")
     print(f"[OK] Successfully downloaded: {downloaded_count} files")
     print(f"[SKIP] Already existed: {skipped_count} files")
+    print(f"[SKIP] Linked to an identical download: {linked_count} files")
+    if select:
+        print(f"[SKIP] Filtered out by --select: {filtered_count} files")
     print(f"[FAIL] Failed downloads: {failed_count} files")
     print(f"[INFO] Files saved to: {xbrl_dir}")
     
     return downloaded_count > 0
 
-def get_available_symbols():
-    """Get list of available symbols from JSON folder"""
+def get_available_symbols(conn=None):
+    """Get list of available symbols from JSON folder, or from the manifest when one is in use"""
+    if conn is not None:
+        symbols = set(manifest.symbols_needing(conn, 'downloaded'))
+        if http_cache.is_enabled():
+            symbols.update(manifest.symbols_at_least(conn, 'downloaded'))
+        return sorted(symbols)
+    
     base_dir = os.path.dirname(__file__)
     json_dir = os.path.join(base_dir, 'JSON')
     
@@ -162,13 +334,13 @@ def get_available_symbols():
     
     return sorted(symbols)
 
-def download_all_symbols():
+def download_all_symbols(conn=None, select=None):
     """Download XBRL files for all available symbols"""
     print("Starting bulk XBRL download for all symbols...")
     print("=" * 60)
     
     # Get available symbols
-    symbols = get_available_symbols()
+    symbols = get_available_symbols(conn)
     if not symbols:
         print("No JSON files found. Run fetcher.py first.")
         return
@@ -178,24 +350,284 @@ def download_all_symbols():
     # Process each symbol
     total_successful = 0
     total_failed = 0
+    url_index = blobstore.load_url_index()
+    failed_jobs = []
     
     for i, symbol in enumerate(symbols, 1):
         print(f"\n[{i}/{len(symbols)}] Processing {symbol}...")
         
-        if read_json_and_download(symbol):
+        if read_json_and_download(symbol, conn, url_index, failed_jobs, select):
             total_successful += 1
         else:
             total_failed += 1
     
+    # Files that failed (e.g. while NSE was throttling) get another chance at the end of the run
+    if failed_jobs:
+        recovered = retry_failed_downloads(failed_jobs, url_index, conn)
+        blobstore.save_url_index(url_index)
+        print(f"[INFO] Recovered on retry: {recovered} of {len(failed_jobs)} failed downloads")
+    
     # Print final summary
     print(f"\nFinal Summary:")
     print(f"[OK] Successfully processed: {total_successful} symbols")
     print(f"[FAIL] Failed to process: {total_failed} symbols")
     print(f"[INFO] XBRL files organized in DATA/{{symbol}}/XBRL/ folders")
 
+def download_pending(state_dir=None, conn=None, select=None):
+    """Download only the new XBRL links queued by an incremental fetch (fetcher.py --incremental)"""
+    print("Starting download of pending XBRL links...")
+    print("=" * 60)
+    
+    pending_downloads = load_state('pending_downloads', state_dir)
+    if not pending_downloads:
+        print("[INFO] No pending XBRL links. Run fetcher.py --incremental first.")
+        return
+    
+    downloaded_count = 0
+    linked_count = 0
+    failed_count = 0
+    skipped_count = 0
+    filtered_count = 0
+    url_index = blobstore.load_url_index()
+    
+    for symbol in sorted(pending_downloads):
+        # Queued filings outside --select leave the queue without being downloaded
+        records, filtered = selection.select_records(pending_downloads[symbol], select)
+        filtered_count += filtered
+        xbrl_dir = create_symbol_directories(symbol)
+        jobs, skipped = collect_download_jobs(symbol, records, xbrl_dir)
+        skipped_count += skipped
+        print(f"\n{symbol.upper()}: {len(jobs)} new files to download")
+        
+        failed_urls = set()
+        for xbrl_url, filepath in jobs:
+            content_hash = link_known_url(xbrl_url, filepath, url_index)
+            if content_hash:
+                record_download_result(conn, symbol, filepath, content_hash)
+                linked_count += 1
+                continue
+            
+            content_hash = download_xbrl_file(xbrl_url, filepath)
+            record_download_result(conn, symbol, filepath, content_hash)
+            if content_hash:
+                url_index[xbrl_url] = content_hash
+                downloaded_count += 1
+            else:
+                failed_count += 1
+                failed_urls.add(xbrl_url)
+            
+            # Add small delay to be respectful to the server
+            metrics.sleep(1, 'politeness')
+        
+        blobstore.save_url_index(url_index)
+        http_cache.save()
+        
+        # Keep only the records that still need downloading for the next run
+        remaining = [record for record in records if (record.get('xbrl') or '').strip() in failed_urls]
+        if remaining:
+            pending_downloads[symbol] = remaining
+        else:
+            del pending_downloads[symbol]
+        save_state('pending_downloads', pending_downloads, state_dir)
+    
+    print(f"\nPending Download Summary:")
+    print(f"[OK] Successfully downloaded: {downloaded_count} files")
+    print(f"[SKIP] Already existed: {skipped_count} files")
+    print(f"[SKIP] Linked to an identical download: {linked_count} files")
+    if select:
+        print(f"[SKIP] Filtered out by --select: {filtered_count} filings (dropped from the pending queue)")
+    print(f"[FAIL] Failed downloads: {failed_count} files (kept in the pending queue)")
+
+class HostLimits:
+    """Per-host concurrency caps and rate limits shared by all download workers"""
+
+    def __init__(self, concurrency, rate, burst):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """Return the (semaphore, token bucket) pair for the URL's host"""
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (threading.BoundedSemaphore(self.concurrency), TokenBucket(self.rate, self.burst))
+            return self.hosts[host]
+
+class ProgressCounter:
+    """Thread-safe live progress and throughput counter"""
+
+    def __init__(self, total, interval=5.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.lock = threading.Lock()
+
+    def update(self, ok, size=0):
+        """Record one finished download and print progress every interval seconds"""
+        with self.lock:
+            self.done += 1
+            if ok:
+                self.bytes += size
+            else:
+                self.failed += 1
+            
+            now = time.monotonic()
+            if now - self.last_report >= self.interval or self.done == self.total:
+                self.last_report = now
+                self.report(now)
+
+    def report(self, now=None):
+        """Print files done, failures and throughput so far"""
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        print(f"[PROGRESS] {self.done}/{self.total} files ({self.failed} failed) | "
+              f"{self.done / elapsed:.1f} files/s | {self.bytes / elapsed / 1024 / 1024:.2f} MB/s")
+
+def download_with_limits(url, filepath, session, host_limits):
+    """Download one file once its host has a free slot and a rate-limit token"""
+    semaphore, bucket = host_limits.get(url)
+    with semaphore:
+        bucket.acquire()
+        return download_xbrl_file(url, filepath, session)
+
+def download_all_symbols_parallel(workers=8, per_host_concurrency=4, rate=2.0, burst=4, conn=None, select=None):
+    """Download XBRL files for all symbols from one global work queue served by a worker pool"""
+    print("Starting parallel XBRL download for all symbols...")
+    print("=" * 60)
+    
+    # Get available symbols
+    symbols = get_available_symbols(conn)
+    if not symbols:
+        print("No JSON files found. Run fetcher.py first.")
+        return
+    
+    # Build one queue of (symbol, url, filepath) across every symbol
+    jobs = []
+    total_skipped = 0
+    total_filtered = 0
+    for symbol in symbols:
+        result = get_download_jobs(symbol, create_symbol_directories(symbol), conn, verbose=False, select=select)
+        if result is None:
+            continue
+        symbol_jobs, skipped_count, filtered_count = result
+        jobs.extend((symbol, url, filepath) for url, filepath in symbol_jobs)
+        total_skipped += skipped_count
+        total_filtered += filtered_count
+    
+    # Known URLs are linked straight away; repeats within this run wait for their first download
+    url_index = blobstore.load_url_index()
+    unique_jobs = []
+    repeated_jobs = []
+    queued_urls = set()
+    linked_count = 0
+    for symbol, url, filepath in jobs:
+        content_hash = link_known_url(url, filepath, url_index)
+        if content_hash:
+            record_download_result(conn, symbol, filepath, content_hash)
+            linked_count += 1
+        elif url in queued_urls:
+            repeated_jobs.append((symbol, url, filepath))
+        else:
+            queued_urls.add(url)
+            unique_jobs.append((symbol, url, filepath))
+    jobs = unique_jobs
+    
+    print(f"Found {len(symbols)} symbols, {len(jobs)} files to download ({total_skipped} already exist)")
+    if select:
+        print(f"[SKIP] Filtered out by --select ({selection.describe_selection(select)}): {total_filtered} files")
+    print(f"[INFO] Workers: {workers}, per-host concurrency: {per_host_concurrency}, rate: {rate} files/sec per host")
+    
+    if not jobs:
+        blobstore.save_url_index(url_index)
+        return
+    
+    # Size the shared per-host pools so every worker keeps its own connection alive
+    http_client.set_pool_size(workers)
+    host_limits = HostLimits(per_host_concurrency, rate, burst)
+    progress = ProgressCounter(len(jobs))
+    failed_jobs = []
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(download_with_limits, url, filepath, get_session(url), host_limits): (symbol, url, filepath)
+            for symbol, url, filepath in jobs
+        }
+        # Results are recorded on this thread, so the manifest connection is never shared
+        for future in as_completed(futures):
+            symbol, url, filepath = futures[future]
+            content_hash = future.result()
+            record_download_result(conn, symbol, filepath, content_hash)
+            if content_hash:
+                url_index[url] = content_hash
+            else:
+                failed_jobs.append((symbol, url, filepath))
+            progress.update(bool(content_hash), storage.get_size(filepath) if content_hash else 0)
+    
+    # Retry failures once the pool has drained, still within the per-host limits
+    recovered = retry_failed_downloads(
+        failed_jobs, url_index, conn,
+        lambda url, filepath: download_with_limits(url, filepath, get_session(url), host_limits)
+    )
+    
+    for symbol, url, filepath in repeated_jobs:
+        content_hash = link_known_url(url, filepath, url_index)
+        record_download_result(conn, symbol, filepath, content_hash or False)
+        if content_hash:
+            linked_count += 1
+    blobstore.save_url_index(url_index)
+    http_cache.save()
+    
+    # Print final summary
+    print(f"\nFinal Summary:")
+    print(f"[OK] Successfully downloaded: {progress.done - progress.failed + recovered} files")
+    print(f"[SKIP] Already existed: {total_skipped} files")
+    print(f"[SKIP] Linked to an identical download: {linked_count} files")
+    print(f"[FAIL] Failed downloads: {progress.failed - recovered} files")
+    print(f"[INFO] XBRL files organized in DATA/{{symbol}}/XBRL/ folders")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Download XBRL files for every symbol in JSON/")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Download workers; above 1 all symbols share one parallel work queue")
+    parser.add_argument('--per-host', type=int, default=4, help="Max concurrent downloads per host")
+    parser.add_argument('--rate', type=float, default=2.0, help="Downloads per second per host")
+    parser.add_argument('--burst', type=int, default=4, help="Downloads allowed back-to-back per host")
+    parser.add_argument('--pending', action='store_true',
+                        help="Download only new links queued by fetcher.py --incremental")
+    selection.add_arguments(parser)
+    storage.add_arguments(parser)
+    http_cache.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
 def main():
     """Main function to download XBRL files for all symbols"""
-    download_all_symbols()
+    args = parse_args()
+    storage.set_compression(args.compress)
+    http_cache.configure(args)
+    
+    # Use the manifest for work discovery when it exists (python manifest.py --sync)
+    conn = manifest.open_if_exists()
+    if conn is not None:
+        print("[INFO] Using manifest: STATE/manifest.db")
+    
+    with metrics.collect('download', args.metrics, args.profile):
+        if args.pending:
+            download_pending(conn=conn, select=args.select)
+        elif args.workers > 1:
+            download_all_symbols_parallel(args.workers, args.per_host, args.rate, args.burst, conn, args.select)
+        else:
+            download_all_symbols(conn, args.select)
+    
+    if conn is not None:
+        conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+
+from state import load_state, save_state
+from blobstore import hash_file
+from field_mappings import FIELD_MAPPINGS
+
+# Bump whenever a change to the extraction code alters its output for the same file
+EXTRACTOR_VERSION = 3
+
+def get_fingerprint():
+    """Extractor version plus field table; cached values are only valid for the same fingerprint"""
+    config = json.dumps({'version': EXTRACTOR_VERSION, 'mappings': FIELD_MAPPINGS}, sort_keys=True)
+    return hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]
+
+class ExtractionCache:
+    """Extracted fields per source file, reused while the file's content is unchanged"""
+
+    def __init__(self, state_dir=None):
+        self.state_dir = state_dir
+        self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.fingerprint = get_fingerprint()
+        data = load_state('extraction_cache', state_dir)
+        # A new extractor version or field table invalidates every entry
+        self.entries = data.get('files', {}) if data.get('fingerprint') == self.fingerprint else {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, source_path):
+        """Cache key of a file: its path relative to the pipeline directory"""
+        return os.path.relpath(os.path.abspath(source_path), self.base_dir)
+
+    def get(self, source_path):
+        """Cached (reporting_date, profit_loss, basic_eps) for an unchanged file, else None"""
+        entry = self.entries.get(self.get_key(source_path))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stat = os.stat(source_path)
+        if (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            # Touched or rewritten: only a content change invalidates the entry
+            if entry['size'] != stat.st_size or hash_file(source_path) != entry['hash']:
+                self.misses += 1
+                return None
+            entry['mtime_ns'] = stat.st_mtime_ns
+
+        self.hits += 1
+        return tuple(entry['fields'])
+
+    def put(self, source_path, fields):
+        """Remember the fields extracted from a file; a file that yielded nothing is left to be retried"""
+        if all(field is None for field in fields):
+            # extract_fields returns all None on a parse error too, so caching it would pin a transient failure
+            self.entries.pop(self.get_key(source_path), None)
+            return
+        stat = os.stat(source_path)
+        self.entries[self.get_key(source_path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': hash_file(source_path),
+            'fields': list(fields)
+        }
+
+    def evict_missing(self):
+        """Drop entries whose files no longer exist; returns how many were dropped"""
+        missing = [key for key in self.entries if not os.path.exists(os.path.join(self.base_dir, key))]
+        for key in missing:
+            del self.entries[key]
+        return len(missing)
+
+    def save(self):
+        """Persist the cache after evicting deleted files"""
+        evicted = self.evict_missing()
+        save_state('extraction_cache', {'fingerprint': self.fingerprint, 'files': self.entries}, self.state_dir)
+        print(f"[INFO] Extraction cache: {self.hits} reused, {self.misses} parsed, {evicted} evicted")
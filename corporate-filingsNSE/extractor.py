@@ -2,6 +2,17 @@ import os
 import csv
 from datetime import datetime
 import re
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xbrl_parser import iter_facts
+from xlsx_reader import iter_sheet_columns, UnsupportedCell
+from field_mappings import get_matcher
+from extraction_cache import ExtractionCache
+from period_index import PeriodIndex
+import manifest
+import metrics
+import selection
 try:
     from openpyxl import load_workbook
 except ImportError:
@@ -31,86 +42,60 @@ def extract_date_from_filename(filename):
             return date_str
     return filename.split('_')[0]  # Fallback
 
+def match_fields_in_rows(rows, filename=''):
+    """Find DateOfEndOfReportingPeriod, ProfitLoss and BasicEPS in (element name, fact value) rows"""
+    # Element names and their priorities come from the filing sector's table in field_mappings.py
+    values = get_matcher(filename).match(rows)
+    return values.get('reporting_date'), values.get('profit_loss'), values.get('basic_eps')
+
+def choose_data_sheet(sheet_names):
+    """Pick the 'Intance Data' sheet written by the converter, falling back to the first sheet"""
+    for sheet_name in sheet_names:
+        if 'intance' in sheet_name.lower() or 'instance' in sheet_name.lower() or 'data' in sheet_name.lower():
+            return sheet_name
+    return sheet_names[0]
+
+def extract_fields_with_openpyxl(excel_filepath):
+    """Read-only openpyxl scan of columns B and F, for sheets the streaming reader does not decode"""
+    workbook = load_workbook(excel_filepath, read_only=True, data_only=True)
+    try:
+        data_sheet = workbook[choose_data_sheet(workbook.sheetnames)]
+        rows = (
+            (row[0], row[4])
+            for row in data_sheet.iter_rows(min_col=2, max_col=6, values_only=True)
+        )
+        return match_fields_in_rows(rows, excel_filepath)
+    finally:
+        workbook.close()
+
 def extract_fields_from_excel(excel_filepath):
     """Extract DateOfEndOfReportingPeriod, ProfitLoss and BasicEPS fields from Excel file using XBRL format"""
     try:
-        # Load Excel file using openpyxl
-        workbook = load_workbook(excel_filepath, data_only=True)
-        
-        # Look for 'Intance Data' sheet (common in XBRL converted files)
-        data_sheet = None
-        sheet_names = workbook.sheetnames
-        
-        for sheet_name in sheet_names:
-            if 'intance' in sheet_name.lower() or 'instance' in sheet_name.lower() or 'data' in sheet_name.lower():
-                data_sheet = workbook[sheet_name]
-                break
-        
-        if not data_sheet:
-            data_sheet = workbook[sheet_names[0]]  # Use first sheet as fallback
-        
-        # Initialize values
-        reporting_period_end_date = None
-        profit_loss = None
-        basic_eps = None
-        
         # Search for the required fields in the standard XBRL format
         # Format: Sr.No. | Element Name | Period | Unit | Decimals | Fact Value
-        for row in range(1, data_sheet.max_row + 1):
-            element_name = data_sheet.cell(row=row, column=2).value  # Column B: Element Name
-            fact_value = data_sheet.cell(row=row, column=6).value    # Column F: Fact Value
-            
-            if element_name and isinstance(element_name, str) and fact_value is not None:
-                # Look for DateOfEndOfReportingPeriod
-                if reporting_period_end_date is None and 'DateOfEndOfReportingPeriod' in element_name:
-                    try:
-                        # Convert date to readable format
-                        if isinstance(fact_value, str):
-                            # Handle date string format (e.g., "2024-12-31")
-                            date_obj = datetime.strptime(fact_value, '%Y-%m-%d')
-                            reporting_period_end_date = date_obj.strftime('%d%b%Y')
-                        else:
-                            reporting_period_end_date = str(fact_value)
-                    except (ValueError, TypeError):
-                        reporting_period_end_date = str(fact_value)
-                
-                # Look for Profit/Loss fields (multiple variations using OR conditions)
-                if profit_loss is None and any(pattern in element_name for pattern in [
-                    'ProfitLossForThePeriod',           # Banking sector
-                    'ProfitLossForPeriod',              # Non-banking sector
-                    'ProfitLossFromOrdinaryActivitiesAfterTax',  # Alternative banking
-                    'ProfitOrLossAttributableToOwnersOfParent'   # Consolidated statements
-                ]):
-                    try:
-                        profit_loss = str(float(fact_value))
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Look for EPS fields (multiple variations using OR conditions)
-                if basic_eps is None and any(pattern in element_name for pattern in [
-                    'BasicEarningsPerShareAfterExtraordinaryItems',                    # Banking sector
-                    'BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations', # Non-banking sector
-                    'BasicEarningsPerShareBeforeExtraordinaryItems',                   # Alternative banking
-                    'BasicEarningsLossPerShareFromContinuingOperations',               # Continuing operations
-                    'DilutedEarningsPerShareAfterExtraordinaryItems',                  # Diluted EPS fallback
-                    'BasicEarningsPerShare'                                            # Generic EPS
-                ]):
-                    try:
-                        basic_eps = str(float(fact_value))
-                    except (ValueError, TypeError):
-                        pass
-                
-                # If all values found, break early
-                if reporting_period_end_date is not None and profit_loss is not None and basic_eps is not None:
-                    break
-        
-        workbook.close()
-        return reporting_period_end_date, profit_loss, basic_eps
+        # Only columns B (Element Name) and F (Fact Value) are read, streaming from the
+        # sheet XML, and the scan stops as soon as all three fields are found
+        try:
+            rows = iter_sheet_columns(excel_filepath, (2, 6), choose_data_sheet)
+            return match_fields_in_rows(rows, excel_filepath)
+        except UnsupportedCell:
+            return extract_fields_with_openpyxl(excel_filepath)
         
     except Exception as e:
         print(f"[ERROR] Failed to process {os.path.basename(excel_filepath)}: {e}")
         return None, None, None
 
+def extract_fields_from_xbrl(xbrl_filepath):
+    """Extract DateOfEndOfReportingPeriod, ProfitLoss and BasicEPS fields directly from an XBRL instance"""
+    try:
+        # Facts stream in the same order the converter lays out its rows
+        rows = ((fact['element'], fact['value']) for fact in iter_facts(xbrl_filepath))
+        return match_fields_in_rows(rows, xbrl_filepath)
+        
+    except Exception as e:
+        print(f"[ERROR] Failed to process {os.path.basename(xbrl_filepath)}: {e}")
+        return None, None, None
+
 def calculate_number_of_shares(profit_loss, basic_eps):
     """Calculate number of shares outstanding"""
     try:
@@ -123,69 +108,227 @@ def calculate_number_of_shares(profit_loss, basic_eps):
     except (ValueError, ZeroDivisionError):
         return 0
 
-def extract_all_excel_files(symbol):
-    """Extract data from all Excel files for a symbol"""
+# Extraction sources: DATA/{symbol}/<folder> holds files with <extension>, read by <function>
+EXTRACTION_SOURCES = {
+    'xlsx': ('XLSX', '.xlsx', extract_fields_from_excel),
+    'xbrl': ('XBRL', '.xml', extract_fields_from_xbrl)
+}
+
+# Manifest stage a filing must have reached for each source, and the column holding its path
+MANIFEST_SOURCES = {
+    'xlsx': ('converted', 'xlsx_path'),
+    'xbrl': ('downloaded', 'xbrl_path')
+}
+
+def get_source_files(source_dir, extension, symbol=None, source='xlsx', conn=None):
+    """List extractable files from the manifest when available, else from the source directory"""
+    if conn is not None:
+        stage, path_field = MANIFEST_SOURCES[source]
+        return [os.path.basename(manifest.to_absolute(row[path_field]))
+                for row in manifest.filings_at_least(conn, symbol, stage) if row[path_field]]
+    return [f for f in os.listdir(source_dir) if f.endswith(extension) and not f.startswith('~$')]
+
+def record_extraction_result(conn, symbol, source_file, ok):
+    """Record a finished extraction in the manifest, if one is in use"""
+    if conn is None:
+        return
+    if ok:
+        manifest.mark_stage(conn, symbol, source_file, 'extracted', commit=False)
+    else:
+        manifest.mark_failed(conn, symbol, source_file, 'extract', 'required fields not found')
+
+def list_symbol_files(symbol, source='xlsx', conn=None, select=None):
+    """Return (source_dir, source_files) for a symbol, or None if it has nothing to extract"""
+    folder, extension, _ = EXTRACTION_SOURCES[source]
     base_dir = os.path.dirname(__file__)
-    xlsx_dir = os.path.join(base_dir, 'DATA', symbol.lower(), 'XLSX')
+    source_dir = os.path.join(base_dir, 'DATA', symbol.lower(), folder)
     
-    if not os.path.exists(xlsx_dir):
-        print(f"[ERROR] XLSX directory not found for {symbol}: {xlsx_dir}")
-        return []
+    if not os.path.exists(source_dir):
+        print(f"[ERROR] {folder} directory not found for {symbol}: {source_dir}")
+        return None
+    
+    source_files = get_source_files(source_dir, extension, symbol, source, conn)
+    source_files, filtered_count = selection.filter_files(source_files, selection.load_selected_names(symbol, select),
+                                                          'extract')
+    if filtered_count:
+        print(f"[SKIP] Filtered out by --select: {filtered_count} {folder} files of {symbol}")
     
-    excel_files = [f for f in os.listdir(xlsx_dir) if f.endswith('.xlsx') and not f.startswith('~$')]
+    if not source_files:
+        print(f"[ERROR] No {folder} files found for {symbol}")
+        return None
     
-    if not excel_files:
-        print(f"[ERROR] No Excel files found for {symbol}")
+    return source_dir, source_files
+
+def extract_file(source, source_path):
+    """Extract the fields of one file; module level so a process pool can run it"""
+    return EXTRACTION_SOURCES[source][2](source_path)
+
+def extract_file_timed(source, source_path):
+    """extract_file plus its parse time, measured where it runs (e.g. in a pool process)"""
+    started = time.perf_counter()
+    fields = extract_file(source, source_path)
+    return fields, time.perf_counter() - started
+
+def add_extracted_fields(index, symbol, source_file, fields, conn=None):
+    """Add one file's fields to the symbol's PeriodIndex; returns 'ok' or 'failed'"""
+    reporting_date, profit_loss, basic_eps = fields
+    found = reporting_date is not None and profit_loss is not None and basic_eps is not None
+    record_extraction_result(conn, symbol, source_file, found)
+    
+    if not found:
+        print(f"[FAIL] No data found in {source_file}")
+        return 'failed'
+    
+    # Calculate number of shares
+    num_shares = calculate_number_of_shares(profit_loss, basic_eps)
+    
+    # Filings of the same period are resolved by the index, whatever order the files come in
+    index.add(source_file, {
+        'reporting_date': reporting_date,
+        'profit_loss': profit_loss,
+        'basic_eps': basic_eps,
+        'num_shares': num_shares
+    })
+    
+    print(f"[OK] Extracted: Date={reporting_date}, ProfitLoss={profit_loss}, EPS={basic_eps}, Shares={num_shares}")
+    return 'ok'
+
+def print_extraction_summary(symbol, statuses, index=None):
+    """Print per-symbol counts of extracted and failed files, and which filing each superseded file lost to"""
+    superseded = index.get_superseded() if index is not None else []
+    for source_file, chosen_file in superseded:
+        print(f"[SKIP] {source_file}: superseded by {chosen_file}")
+    print(f"\nExtraction Summary for {symbol.upper()}:")
+    print(f"[OK] Successfully processed: {statuses.count('ok')} files")
+    if superseded:
+        print(f"[SKIP] Superseded by a revision or the consolidated filing of the same period: {len(superseded)} files")
+    print(f"[FAIL] Failed to extract: {statuses.count('failed')} files")
+
+def extract_file_cached(source, source_path, cache=None):
+    """extract_file, reusing the cached fields of an unchanged file when a cache is in use"""
+    fields = cache.get(source_path) if cache is not None else None
+    if fields is None:
+        fields, elapsed = extract_file_timed(source, source_path)
+        metrics.observe('parse_seconds', elapsed, source=source)
+        if cache is not None:
+            cache.put(source_path, fields)
+    return fields
+
+def extract_all_files(symbol, source='xlsx', conn=None, cache=None, select=None):
+    """Extract data from all files of the given source type for a symbol"""
+    listing = list_symbol_files(symbol, source, conn, select)
+    if listing is None:
         return []
+    source_dir, source_files = listing
     
-    print(f"Found {len(excel_files)} Excel files to process for {symbol.upper()}")
+    print(f"Found {len(source_files)} {EXTRACTION_SOURCES[source][0]} files to process for {symbol.upper()}")
     
-    extracted_data = []
-    successful_count = 0
-    failed_count = 0
+    index = PeriodIndex(selection.load_filing_records(symbol))
+    statuses = []
     
-    for excel_file in excel_files:
-        excel_path = os.path.join(xlsx_dir, excel_file)
-        print(f"Processing: {excel_file}")
-        
-        # Extract date from filename
-        filing_date = extract_date_from_filename(excel_file)
+    for source_file in source_files:
+        print(f"Processing: {source_file}")
         
         # Extract financial fields
-        reporting_date, profit_loss, basic_eps = extract_fields_from_excel(excel_path)
+        fields = extract_file_cached(source, os.path.join(source_dir, source_file), cache)
+        statuses.append(add_extracted_fields(index, symbol, source_file, fields, conn))
+    
+    if conn is not None:
+        conn.commit()
+    
+    print_extraction_summary(symbol, statuses, index)
+    
+    return index.rows()
+
+def extract_all_symbols_parallel(symbols, source='xlsx', workers=4, conn=None, write_csv=True, cache=None, select=None):
+    """Fan per-file extraction out over a process pool, saving each symbol's CSV once its files are done"""
+    # One job per file across every symbol; results come back in completion order
+    symbol_files = {}
+    for symbol in symbols:
+        listing = list_symbol_files(symbol, source, conn, select)
+        if listing is not None:
+            symbol_files[symbol] = listing
+    
+    # Symbols without files still get a header-only CSV, as in a serial run
+    for symbol in symbols:
+        if symbol not in symbol_files and write_csv:
+            save_to_csv(symbol, [])
+    
+    results = {symbol: [None] * len(source_files) for symbol, (_, source_files) in symbol_files.items()}
+    remaining = {symbol: len(source_files) for symbol, (_, source_files) in symbol_files.items()}
+    extracted = {}
+    
+    def finish_symbol(symbol):
+        """Apply a finished symbol's results in file order, so the CSV matches a serial run"""
+        print(f"\n[{len(extracted) + 1}/{len(symbol_files)}] {symbol}")
+        print("-" * 50)
+        source_files = symbol_files[symbol][1]
+        index = PeriodIndex(selection.load_filing_records(symbol))
+        statuses = [
+            add_extracted_fields(index, symbol, source_file, fields, conn)
+            for source_file, fields in zip(source_files, results.pop(symbol))
+        ]
+        if conn is not None:
+            conn.commit()
+        print_extraction_summary(symbol, statuses, index)
+        extracted_data = index.rows()
         
-        if reporting_date is not None and profit_loss is not None and basic_eps is not None:
-            # Calculate number of shares
-            num_shares = calculate_number_of_shares(profit_loss, basic_eps)
-            
-            # Check for duplicate dates
-            existing_dates = [item['reporting_date'] for item in extracted_data]
-            if reporting_date in existing_dates:
-                print(f"[SKIP] Duplicate date found: Date={reporting_date} (keeping existing data)")
-                continue
-            
-            extracted_data.append({
-                'reporting_date': reporting_date,
-                'profit_loss': profit_loss,
-                'basic_eps': basic_eps,
-                'num_shares': num_shares
-            })
-            
-            print(f"[OK] Extracted: Date={reporting_date}, ProfitLoss={profit_loss}, EPS={basic_eps}, Shares={num_shares}")
-            successful_count += 1
-        else:
-            print(f"[FAIL] No data found in {excel_file}")
-            failed_count += 1
+        if write_csv:
+            save_to_csv(symbol, extracted_data)
+        extracted[symbol] = extracted_data
     
-    print(f"\nExtraction Summary for {symbol.upper()}:")
-    print(f"[OK] Successfully processed: {successful_count} files")
-    print(f"[FAIL] Failed to extract: {failed_count} files")
+    # Unchanged files are answered from the cache; only the rest go to the pool
+    jobs = []
+    for symbol, (source_dir, source_files) in symbol_files.items():
+        for index, source_file in enumerate(source_files):
+            source_path = os.path.join(source_dir, source_file)
+            fields = cache.get(source_path) if cache is not None else None
+            if fields is None:
+                jobs.append((symbol, index, source_path))
+            else:
+                results[symbol][index] = fields
+                remaining[symbol] -= 1
+    
+    print(f"[INFO] Extracting {len(jobs)} files for {len(symbol_files)} symbols with {workers} worker processes")
     
-    return extracted_data
+    for symbol in list(symbol_files):
+        if not remaining[symbol]:
+            finish_symbol(symbol)
+    
+    if not jobs:
+        return extracted
+    
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(extract_file_timed, source, source_path): (symbol, index, source_path)
+            for symbol, index, source_path in jobs
+        }
+        for future in as_completed(futures):
+            symbol, index, source_path = futures[future]
+            results[symbol][index], elapsed = future.result()
+            metrics.observe('parse_seconds', elapsed, source=source)
+            if cache is not None:
+                cache.put(source_path, results[symbol][index])
+            remaining[symbol] -= 1
+            if not remaining[symbol]:
+                finish_symbol(symbol)
+    
+    return extracted
 
-def save_to_csv(symbol, data):
-    """Save extracted data to CSV file"""
-    csv_dir = create_csv_folder(symbol)
+def extract_all_excel_files(symbol):
+    """Extract data from all Excel files for a symbol"""
+    return extract_all_files(symbol, 'xlsx')
+
+def extract_all_xbrl_files(symbol):
+    """Extract data from all XBRL instances for a symbol without the Excel conversion"""
+    return extract_all_files(symbol, 'xbrl')
+
+def save_to_csv(symbol, data, csv_dir=None):
+    """Save extracted data to CSV file (DATA/{symbol}/CSV unless csv_dir is given)"""
+    if csv_dir is None:
+        csv_dir = create_csv_folder(symbol)
+    else:
+        os.makedirs(csv_dir, exist_ok=True)
     csv_file = os.path.join(csv_dir, f"{symbol.lower()}.csv")
     
     # Sort data by date in reverse chronological order
@@ -212,8 +355,12 @@ def save_to_csv(symbol, data):
     
     print(f"[INFO] CSV file saved to: {csv_file}")
 
-def get_available_symbols_with_xlsx():
-    """Get list of symbols that have XLSX directories"""
+def get_available_symbols_with_source(source='xlsx', conn=None):
+    """Get list of symbols that have a non-empty directory for the given source"""
+    if conn is not None:
+        return manifest.symbols_at_least(conn, MANIFEST_SOURCES[source][0])
+    
+    folder = EXTRACTION_SOURCES[source][0]
     base_dir = os.path.dirname(__file__)
     data_dir = os.path.join(base_dir, 'DATA')
     
@@ -225,38 +372,87 @@ def get_available_symbols_with_xlsx():
     for item in os.listdir(data_dir):
         item_path = os.path.join(data_dir, item)
         if os.path.isdir(item_path):
-            xlsx_path = os.path.join(item_path, 'XLSX')
-            if os.path.exists(xlsx_path) and os.listdir(xlsx_path):
+            source_path = os.path.join(item_path, folder)
+            if os.path.exists(source_path) and os.listdir(source_path):
                 symbols.append(item.upper())
     
     return sorted(symbols)
 
+def get_available_symbols_with_xlsx():
+    """Get list of symbols that have XLSX directories"""
+    return get_available_symbols_with_source('xlsx')
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Extract financial fields from NSE filings to CSV")
+    parser.add_argument('--source', choices=sorted(EXTRACTION_SOURCES), default='xlsx',
+                        help="xlsx: converted workbooks (default); xbrl: parse XBRL instances directly, offline")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; above 1 files from all symbols are extracted in parallel")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Re-parse every file instead of reusing cached fields of unchanged files")
+    parser.add_argument('--full-facts', action='store_true',
+                        help="Store every fact of new/changed files in STATE/facts.db, then build the CSVs from it")
+    parser.add_argument('--fact-store', action='store_true',
+                        help="Also write every XBRL fact to the Parquet dataset in FACTS/ (needs pyarrow)")
+    selection.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
 def main():
     """Main function to process all symbols"""
+    args = parse_args()
+    folder = EXTRACTION_SOURCES[args.source][0]
+    
     print("NSE Corporate Filings - Financial Data Extractor")
     print("=" * 60)
     
+    # Use the manifest for work discovery when it exists (python manifest.py --sync)
+    conn = manifest.open_if_exists()
+    if conn is not None:
+        print("[INFO] Using manifest: STATE/manifest.db")
+    
     # Get available symbols
-    symbols = get_available_symbols_with_xlsx()
+    symbols = get_available_symbols_with_source(args.source, conn)
     
     if not symbols:
-        print("[ERROR] No symbols with XLSX files found")
+        print(f"[ERROR] No symbols with {folder} files found")
         return
     
-    print(f"Found {len(symbols)} symbols with XLSX files: {', '.join(symbols)}")
+    print(f"Found {len(symbols)} symbols with {folder} files: {', '.join(symbols)}")
     print()
     
-    # Process each symbol
-    for i, symbol in enumerate(symbols, 1):
-        print(f"[{i}/{len(symbols)}] Processing {symbol}...")
-        print("-" * 50)
+    with metrics.collect('extract', args.metrics, args.profile):
+        # Fields of files unchanged since the last run are reused (STATE/extraction_cache.json)
+        cache = None if args.no_cache or args.full_facts else ExtractionCache()
         
-        # Extract data from Excel files
-        extracted_data = extract_all_excel_files(symbol)
+        # Process each symbol
+        if args.full_facts:
+            # Imported here: the fact database is only used by this mode
+            import facts_db
+            facts_conn = facts_db.connect()
+            facts_db.update_all_facts(facts_conn, symbols, args.source)
+            for symbol in symbols:
+                facts_db.materialize_csv(facts_conn, symbol, conn, args.select)
+            facts_conn.close()
+            print()
+        elif args.workers > 1:
+            extract_all_symbols_parallel(symbols, args.source, args.workers, conn, cache=cache, select=args.select)
+            print()
+        else:
+            for i, symbol in enumerate(symbols, 1):
+                print(f"[{i}/{len(symbols)}] Processing {symbol}...")
+                print("-" * 50)
+                
+                # Extract data from source files
+                extracted_data = extract_all_files(symbol, args.source, conn, cache, args.select)
+                
+                # Save to CSV
+                save_to_csv(symbol, extracted_data)
+                print()
         
-        # Save to CSV
-        save_to_csv(symbol, extracted_data)
-        print()
+        if cache is not None:
+            cache.save()
     
     print("Final Extraction Summary:")
     print("=" * 70)
@@ -279,6 +475,15 @@ def main():
     print(f"[FAIL] Failed to process: {len(failed_symbols)} symbols")
     print(f"[INFO] CSV files organized in DATA/{{symbol}}/CSV/ folders")
     print(f"[INFO] Each CSV contains: DateOfEndOfReportingPeriod, ProfitLoss, BasicEPS, NumberOfSharesOutstanding")
+    
+    if args.fact_store:
+        # Imported here: pyarrow is optional and only needed for this output
+        from fact_store import build_fact_store
+        print()
+        build_fact_store(symbols)
+    
+    if conn is not None:
+        conn.close()
 
 if __name__ == "__main__":
     main()
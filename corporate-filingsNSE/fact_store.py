@@ -0,0 +1,177 @@
+import argparse
+import os
+import shutil
+from datetime import datetime
+from functools import lru_cache
+
+from xbrl_parser import iter_facts, get_xbrl_files
+import selection
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    ds = None
+
+# One row per XBRL fact. period_end is the filing's reporting period end and partitions
+# the dataset, so one quarter across every symbol is a single directory scan.
+FACT_COLUMNS = [
+    ('symbol', 'string'),
+    ('period_end', 'date32'),
+    ('consolidated', 'bool_'),
+    ('element', 'string'),
+    ('value', 'string'),
+    ('value_numeric', 'float64'),
+    ('unit', 'string'),
+    ('decimals', 'int32'),
+    ('context_ref', 'string'),
+    ('fact_period_start', 'date32'),
+    ('fact_period_end', 'date32'),
+    ('seq_number', 'int64'),
+    ('filing', 'string')
+]
+
+def get_fact_store_dir(store_dir=None):
+    """Directory of the partitioned Parquet fact dataset"""
+    if store_dir is None:
+        store_dir = os.path.join(os.path.dirname(__file__), 'FACTS')
+    return store_dir
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Parse an XBRL (2024-12-31) or NSE (31-Dec-2024) date, or None; filings repeat a handful of dates"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        parsed = selection.parse_nse_date(value)
+        return parsed.date() if parsed else None
+
+def parse_number(value):
+    """Numeric value of a fact, or None for text facts"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def parse_decimals(value):
+    """decimals attribute as an int; INF and missing become None"""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def iter_filing_facts(symbol, xbrl_filepath, record=None):
+    """Every fact of one filing as a typed row, tagged with the filing's period, consolidation and seqNumber"""
+    record = record or {}
+    facts = list(iter_facts(xbrl_filepath))
+
+    # The filing's own reporting period end, else the period NSE lists for it
+    period_end = None
+    for fact in facts:
+        if fact['element'] == 'DateOfEndOfReportingPeriod':
+            period_end = parse_date(fact['value'])
+            break
+    period_end = period_end or parse_date(record.get('toDate'))
+
+    consolidated = record.get('consolidated')
+    consolidated = None if consolidated is None else consolidated == 'Consolidated'
+    seq_number = record.get('seqNumber')
+    filename = os.path.basename(xbrl_filepath)
+
+    for fact in facts:
+        yield {
+            'symbol': symbol.upper(),
+            'period_end': period_end,
+            'consolidated': consolidated,
+            'element': fact['element'],
+            'value': fact['value'],
+            'value_numeric': parse_number(fact['value']),
+            'unit': fact['unit_ref'],
+            'decimals': parse_decimals(fact['decimals']),
+            'context_ref': fact['context_ref'],
+            'fact_period_start': parse_date(fact['period_start']),
+            'fact_period_end': parse_date(fact['period_end']),
+            'seq_number': int(seq_number) if seq_number else None,
+            'filing': filename
+        }
+
+def iter_symbol_facts(symbol, json_dir=None):
+    """Facts of every downloaded filing of a symbol"""
+    xbrl_dir = os.path.join(os.path.dirname(__file__), 'DATA', symbol.lower(), 'XBRL')
+    # The same loader as the CSV path, so a re-listed filing is tagged with the same (latest) record
+    filing_records = selection.load_filing_records(symbol, json_dir)
+
+    for filename in sorted(get_xbrl_files(xbrl_dir)):
+        try:
+            record = filing_records.get(os.path.splitext(filename)[0])
+            yield from iter_filing_facts(symbol, os.path.join(xbrl_dir, filename), record)
+        except Exception as e:
+            print(f"[ERROR] Failed to read facts from {filename}: {e}")
+
+def get_fact_schema():
+    """Arrow schema of the fact dataset"""
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in FACT_COLUMNS])
+
+def get_partitioning():
+    """Hive-style period_end=YYYY-MM-DD directories, typed as dates when read back"""
+    return ds.partitioning(pa.schema([('period_end', pa.date32())]), flavor='hive')
+
+def build_fact_store(symbols, store_dir=None, json_dir=None):
+    """Write every fact of the given symbols into one Parquet dataset partitioned by period_end"""
+    if pa is None:
+        print("[ERROR] pyarrow not installed. Run: pip install pyarrow")
+        return False
+
+    store_dir = get_fact_store_dir(store_dir)
+    schema = get_fact_schema()
+    columns = {name: [] for name, _ in FACT_COLUMNS}
+    fact_count = 0
+
+    for symbol in symbols:
+        for fact in iter_symbol_facts(symbol, json_dir):
+            for name in columns:
+                columns[name].append(fact[name])
+            fact_count += 1
+
+    if not fact_count:
+        print("[ERROR] No XBRL facts found")
+        return False
+
+    # The dataset is rebuilt as a whole so no stale partition survives
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+
+    # Sorting by element keeps each element in few row groups, so filters on it skip the rest
+    table = pa.Table.from_pydict(columns, schema=schema).sort_by([('element', 'ascending'), ('symbol', 'ascending')])
+    ds.write_dataset(
+        table, store_dir, format='parquet',
+        partitioning=get_partitioning(),
+        min_rows_per_group=8192,
+        max_rows_per_group=8192
+    )
+
+    print(f"[OK] Fact store: {fact_count} facts from {len(symbols)} symbols saved to {store_dir}")
+    return True
+
+def open_fact_store(store_dir=None):
+    """Open the fact dataset for scanning, e.g. open_fact_store().to_table(filter=...)"""
+    return ds.dataset(get_fact_store_dir(store_dir), format='parquet', partitioning=get_partitioning())
+
+def main():
+    """Build the Parquet fact store from every symbol's XBRL files"""
+    # Imported here: extractor is only needed for its symbol discovery
+    from extractor import get_available_symbols_with_source
+
+    parser = argparse.ArgumentParser(description="Build the partitioned Parquet fact store (FACTS/)")
+    parser.add_argument('--symbols', nargs='*', help="Symbols to include (default: every symbol with XBRL files)")
+    args = parser.parse_args()
+
+    symbols = [symbol.upper() for symbol in args.symbols] if args.symbols else get_available_symbols_with_source('xbrl')
+    print(f"Building fact store for {len(symbols)} symbols...")
+    build_fact_store(symbols)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+from state import get_state_dir
+from xbrl_parser import iter_facts
+from xlsx_reader import iter_sheet_columns, UnsupportedCell
+from field_mappings import FIELD_MAPPINGS, FieldMatcher, get_sector
+from period_index import PeriodIndex
+import manifest
+import selection
+
+# Every fact of every filing, extracted once. ordinal keeps document order, so a
+# projection resolves fields exactly as a scan of the original file would.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_file TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    fact_count INTEGER,
+    extracted_at TEXT,
+    UNIQUE (symbol, filename)
+);
+CREATE TABLE IF NOT EXISTS elements (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS contexts (
+    id INTEGER PRIMARY KEY,
+    context_ref TEXT,
+    period_start TEXT,
+    period_end TEXT
+);
+CREATE TABLE IF NOT EXISTS facts (
+    filing_id INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL,
+    element_id INTEGER NOT NULL,
+    context_id INTEGER NOT NULL,
+    unit TEXT,
+    decimals TEXT,
+    value TEXT,
+    PRIMARY KEY (filing_id, ordinal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_facts_element ON facts (element_id, filing_id, ordinal);
+CREATE VIEW IF NOT EXISTS fact_view AS
+    SELECT f.symbol, f.filename, facts.ordinal, e.name AS element, c.context_ref, c.period_start,
+           c.period_end, facts.unit, facts.decimals, facts.value
+    FROM facts
+    JOIN filings f ON f.id = facts.filing_id
+    JOIN elements e ON e.id = facts.element_id
+    JOIN contexts c ON c.id = facts.context_id;
+"""
+
+def get_facts_db_path(state_dir=None):
+    """Path of the fact database"""
+    return os.path.join(get_state_dir(state_dir), 'facts.db')
+
+def connect(state_dir=None):
+    """Open the fact database, creating the schema if needed"""
+    conn = sqlite3.connect(get_facts_db_path(state_dir))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def parse_workbook_period(period):
+    """Split the converter's 'dd-mm-yyyy To dd-mm-yyyy' period into ISO start/end dates"""
+    if not period:
+        return None, None
+    dates = []
+    for part in period.split(' To '):
+        try:
+            dates.append(datetime.strptime(part.strip(), '%d-%m-%Y').strftime('%Y-%m-%d'))
+        except ValueError:
+            dates.append(None)
+    return (dates[0], dates[-1]) if len(dates) == 2 else (None, dates[0])
+
+def read_xbrl_facts(xbrl_filepath):
+    """(element, context, unit, decimals, start, end, value) for each fact of an XBRL instance"""
+    for fact in iter_facts(xbrl_filepath):
+        yield (fact['element'], fact['context_ref'], fact['unit_ref'], fact['decimals'],
+               fact['period_start'], fact['period_end'], fact['value'])
+
+def read_workbook_facts(excel_filepath):
+    """The same tuples from a converted workbook (its 'Unit' column carries the contextRef)"""
+    # Imported here: extractor imports this module for its --full-facts mode
+    from extractor import choose_data_sheet, load_workbook
+
+    try:
+        rows = list(iter_sheet_columns(excel_filepath, (2, 3, 4, 5, 6), choose_data_sheet))
+    except UnsupportedCell:
+        workbook = load_workbook(excel_filepath, read_only=True, data_only=True)
+        try:
+            data_sheet = workbook[choose_data_sheet(workbook.sheetnames)]
+            rows = list(data_sheet.iter_rows(min_col=2, max_col=6, values_only=True))
+        finally:
+            workbook.close()
+
+    # Row 1 is the header: Sr.No. | Element Name | Period | Unit | Decimals | Fact Value
+    for element_name, period, context_ref, decimals, fact_value in rows[1:]:
+        if not element_name:
+            continue
+        period_start, period_end = parse_workbook_period(period)
+        yield (str(element_name), context_ref, None, None if decimals is None else str(decimals),
+               period_start, period_end, None if fact_value is None else str(fact_value))
+
+FACT_READERS = {
+    'xbrl': ('XBRL', '.xml', read_xbrl_facts),
+    'xlsx': ('XLSX', '.xlsx', read_workbook_facts)
+}
+
+def get_element_id(conn, name, cache):
+    """Id of an element name, adding it to the elements table if new"""
+    element_id = cache.get(('element', name))
+    if element_id is None:
+        conn.execute("INSERT OR IGNORE INTO elements (name) VALUES (?)", (name,))
+        element_id = conn.execute("SELECT id FROM elements WHERE name = ?", (name,)).fetchone()[0]
+        cache[('element', name)] = element_id
+    return element_id
+
+def get_context_id(conn, context, cache):
+    """Id of a (context_ref, period_start, period_end) triple; a few thousand cover the whole corpus"""
+    context_id = cache.get(('context', context))
+    if context_id is None:
+        row = conn.execute(
+            "SELECT id FROM contexts WHERE context_ref IS ? AND period_start IS ? AND period_end IS ?", context
+        ).fetchone()
+        context_id = row[0] if row else conn.execute(
+            "INSERT INTO contexts (context_ref, period_start, period_end) VALUES (?, ?, ?)", context
+        ).lastrowid
+        cache[('context', context)] = context_id
+    return context_id
+
+def is_current(conn, symbol, filename, source, stat):
+    """True if the filing was already extracted from this exact file"""
+    row = conn.execute(
+        "SELECT source, size, mtime_ns FROM filings WHERE symbol = ? AND filename = ?",
+        (symbol.lower(), filename)
+    ).fetchone()
+    return row is not None and row == (source, stat.st_size, stat.st_mtime_ns)
+
+def store_filing_facts(conn, symbol, source_path, source, cache):
+    """Replace one filing's facts in the database with those read from source_path"""
+    read_facts = FACT_READERS[source][2]
+    facts = list(read_facts(source_path))
+    stat = os.stat(source_path)
+    filename = manifest.filing_key(source_path)
+
+    conn.execute(
+        "INSERT INTO filings (symbol, filename, source, source_file, size, mtime_ns, fact_count, extracted_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (symbol, filename) DO UPDATE SET source = excluded.source, source_file = excluded.source_file, "
+        "size = excluded.size, mtime_ns = excluded.mtime_ns, fact_count = excluded.fact_count, "
+        "extracted_at = excluded.extracted_at",
+        (symbol.lower(), filename, source, os.path.basename(source_path), stat.st_size, stat.st_mtime_ns,
+         len(facts), manifest.now())
+    )
+    filing_id = conn.execute(
+        "SELECT id FROM filings WHERE symbol = ? AND filename = ?", (symbol.lower(), filename)
+    ).fetchone()[0]
+
+    conn.execute("DELETE FROM facts WHERE filing_id = ?", (filing_id,))
+    conn.executemany(
+        "INSERT INTO facts VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((filing_id, ordinal, get_element_id(conn, element_name, cache),
+          get_context_id(conn, (context_ref, period_start, period_end), cache), unit, decimals, value)
+         for ordinal, (element_name, context_ref, unit, decimals, period_start, period_end, value) in enumerate(facts))
+    )
+    return len(facts)
+
+def remove_stale_filings(conn, symbol, source, seen_filenames):
+    """Drop the facts of a symbol's filings from source whose file is gone from disk; returns how many"""
+    stale = [
+        (filing_id, filename) for filing_id, filename in conn.execute(
+            "SELECT id, filename FROM filings WHERE symbol = ? AND source = ?", (symbol.lower(), source)
+        ).fetchall()
+        if filename not in seen_filenames
+    ]
+    for filing_id, filename in stale:
+        conn.execute("DELETE FROM facts WHERE filing_id = ?", (filing_id,))
+        conn.execute("DELETE FROM filings WHERE id = ?", (filing_id,))
+        print(f"[INFO] Removed facts of {filename}: no longer in DATA/{symbol.lower()}/{FACT_READERS[source][0]}")
+    return len(stale)
+
+def update_symbol_facts(conn, symbol, source='xbrl', cache=None, data_dir=None):
+    """Extract all facts of a symbol's new or changed files; returns (extracted, unchanged, failed) counts"""
+    folder, extension, _ = FACT_READERS[source]
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'DATA')
+    source_dir = os.path.join(data_dir, symbol.lower(), folder)
+    cache = {} if cache is None else cache
+    extracted_count = unchanged_count = failed_count = 0
+    seen_filenames = set()
+
+    if not os.path.exists(source_dir):
+        print(f"[ERROR] {folder} directory not found for {symbol}: {source_dir}")
+        return 0, 0, 0
+
+    for source_file in sorted(os.listdir(source_dir)):
+        if not source_file.endswith(extension) or source_file.startswith('~$'):
+            continue
+        source_path = os.path.join(source_dir, source_file)
+        seen_filenames.add(manifest.filing_key(source_file))
+
+        if is_current(conn, symbol, manifest.filing_key(source_file), source, os.stat(source_path)):
+            unchanged_count += 1
+            continue
+
+        try:
+            store_filing_facts(conn, symbol, source_path, source, cache)
+            extracted_count += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to read facts from {source_file}: {e}")
+            failed_count += 1
+
+    # Files deleted or renamed since the last run must not keep feeding the projection
+    remove_stale_filings(conn, symbol, source, seen_filenames)
+    conn.commit()
+    return extracted_count, unchanged_count, failed_count
+
+def update_all_facts(conn, symbols, source='xbrl'):
+    """Bring the fact database up to date for every symbol"""
+    # Element and context ids shared across symbols, so each is looked up once per run
+    cache = {}
+    totals = [0, 0, 0]
+
+    for symbol in symbols:
+        counts = update_symbol_facts(conn, symbol, source, cache)
+        totals = [total + count for total, count in zip(totals, counts)]
+
+    print(f"[OK] Facts extracted: {totals[0]} files")
+    print(f"[SKIP] Unchanged since last extraction: {totals[1]} files")
+    print(f"[FAIL] Failed: {totals[2]} files")
+    return totals
+
+def project_fields(conn, symbol, mappings=FIELD_MAPPINGS):
+    """Resolve mapped fields for each filing of a symbol from stored facts, in filename order.
+
+    Only facts of mapped elements are read, through the element index, and they come back in
+    document order, so each sector's FieldMatcher sees what a scan of the file would.
+    Returns [(filename, {field: value})].
+    """
+    element_names = sorted({name for mapping in mappings.values() for names in mapping.values() for name in names})
+    placeholders = ', '.join('?' for _ in element_names)
+    rows = conn.execute(
+        f"SELECT f.filename, f.source_file, e.name, facts.value FROM filings f "
+        f"JOIN facts ON facts.filing_id = f.id JOIN elements e ON e.id = facts.element_id "
+        f"WHERE f.symbol = ? AND e.name IN ({placeholders}) ORDER BY f.filename, facts.ordinal",
+        (symbol.lower(), *element_names)
+    ).fetchall()
+
+    filings = conn.execute(
+        "SELECT filename, source_file FROM filings WHERE symbol = ? ORDER BY filename", (symbol.lower(),)
+    ).fetchall()
+    facts_by_filing = {}
+    for filename, _, element_name, value in rows:
+        facts_by_filing.setdefault(filename, []).append((element_name, value))
+
+    matchers = {sector: FieldMatcher(mapping) for sector, mapping in mappings.items()}
+    return [
+        (source_file, matchers[get_sector(source_file)].match(facts_by_filing.get(filename, [])))
+        for filename, source_file in filings
+    ]
+
+def materialize_csv(conn, symbol, manifest_conn=None, select=None):
+    """Write DATA/{symbol}/CSV/{symbol}.csv from stored facts, without reading any source file"""
+    # Imported here: extractor imports this module for its --full-facts mode
+    from extractor import add_extracted_fields, save_to_csv
+
+    # Filings outside --select keep their facts in the database but stay out of the CSV
+    projected, filtered_count = selection.filter_files(project_fields(conn, symbol),
+                                                       selection.load_selected_names(symbol, select),
+                                                       'extract', lambda item: item[0])
+    if filtered_count:
+        print(f"[SKIP] Filtered out by --select: {filtered_count} filings of {symbol}")
+
+    index = PeriodIndex(selection.load_filing_records(symbol))
+    for source_file, values in projected:
+        fields = (values.get('reporting_date'), values.get('profit_loss'), values.get('basic_eps'))
+        add_extracted_fields(index, symbol, source_file, fields, manifest_conn)
+    if manifest_conn is not None:
+        manifest_conn.commit()
+    extracted_data = index.rows()
+    save_to_csv(symbol, extracted_data)
+    return extracted_data
+
+def get_stored_symbols(conn):
+    """Symbols that have facts in the database"""
+    return [row[0].upper() for row in conn.execute("SELECT DISTINCT symbol FROM filings ORDER BY symbol")]
+
+def main():
+    """Update the fact database and/or project CSVs from it"""
+    # Imported here: extractor is only needed for its symbol discovery
+    from extractor import get_available_symbols_with_source
+
+    parser = argparse.ArgumentParser(description="All-fact database (STATE/facts.db) and CSV projection")
+    parser.add_argument('--source', choices=sorted(FACT_READERS), default='xbrl')
+    parser.add_argument('--project-only', action='store_true',
+                        help="Only write CSVs from facts already stored, without reading DATA/ files")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.project_only:
+        symbols = get_stored_symbols(conn)
+    else:
+        symbols = get_available_symbols_with_source(args.source)
+        print(f"Extracting all facts for {len(symbols)} symbols...")
+        update_all_facts(conn, symbols, args.source)
+
+    for symbol in symbols:
+        materialize_csv(conn, symbol)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
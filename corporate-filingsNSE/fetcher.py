@@ -3,7 +3,27 @@ import json
 import csv
 import os
 import time
-from datetime import datetime
+import asyncio
+import argparse
+from collections import deque
+from datetime import datetime, timedelta
+from ratelimit import TokenBucket
+from http_client import get_nse_session, reset_warm_up
+from resilience import call_with_retry, retry_failed, DEFAULT_TIMEOUT
+from state import load_state, save_state
+from downloader import build_xbrl_filename
+from selection import parse_nse_date
+import http_cache
+import manifest
+import metrics
+import storage
+
+NSE_API_URL = "https://www.nseindia.com/api/corporates-financial-results"
+
+# Bulk mode asks for every symbol's filings a window of days at a time
+BULK_WINDOW_DAYS = 7
+# A window answering with this many filings may have been truncated by the API
+BULK_PAGE_LIMIT = 1000
 
 def read_symbols_from_file():
     """Read symbols from symbols.txt file"""
@@ -31,30 +51,74 @@ def create_json_folder():
     os.makedirs(json_dir, exist_ok=True)
     return json_dir
 
-def fetch_symbol_data(symbol):
-    """Fetch financial results data for a specific symbol from NSE API"""
-    url = "https://www.nseindia.com/api/corporates-financial-results"
-    params = {
-        "index": "equities",
-        "symbol": symbol, 
-        "period": "Quarterly"
-    }
+def refresh_cookies_on_403(response, error):
+    """NSE answers 403 once its cookies expire; warm up again before the next attempt"""
+    if response is not None and response.status_code == 403:
+        reset_warm_up()
+
+def fetch_results(params, url, description, revalidate=False):
+    """GET the financial results endpoint with the given query; returns (data, validators).
     
+    data is None on failure. validators are the response's ETag/Last-Modified, for the caller
+    to pass to http_cache.record once data is saved, so a failed write never leaves a validator
+    that would answer the next run with a 304. With revalidate, the request is conditional and
+    http_cache.NOT_MODIFIED comes back for a 304 or for a response checked within the metadata TTL.
+    """
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "en-US,en;q=0.9",
         "Referer": "https://www.nseindia.com/"
     }
     
+    key = http_cache.get_cache_key(url, params)
+    if revalidate:
+        if http_cache.is_fresh(key, 'metadata'):
+            print(f"[SKIP] {description}: checked within the metadata TTL")
+            return http_cache.NOT_MODIFIED, None
+        headers.update(http_cache.get_conditional_headers(key))
+    
     try:
-        print(f"Fetching data for {symbol}...")
-        response = requests.get(url, params=params, headers=headers)
+        print(f"Fetching data for {description}...")
+        # The session is looked up per attempt so a 403 gets freshly warmed-up cookies
+        response = call_with_retry(
+            lambda: get_nse_session(url).get(url, params=params, headers=headers, timeout=DEFAULT_TIMEOUT),
+            url, on_retry=refresh_cookies_on_403
+        )
+        if revalidate and response.status_code == 304:
+            http_cache.touch(key)
+            metrics.inc('not_modified_total', stage='fetch')
+            print(f"[SKIP] {description}: not modified since the last fetch")
+            return http_cache.NOT_MODIFIED, None
         response.raise_for_status()
-        return response.json()
+        metrics.inc('bytes_total', len(response.content), stage='fetch')
+        return response.json(), http_cache.get_validators(key, response)
     except requests.RequestException as e:
-        print(f"[ERROR] Failed to fetch data for {symbol}: {e}")
-        return None
+        print(f"[ERROR] Failed to fetch data for {description}: {e}")
+        return None, None
+
+def fetch_symbol_data(symbol, url=NSE_API_URL, json_dir=None):
+    """Fetch financial results data for a specific symbol from NSE API; returns (data, validators).
+    
+    Given json_dir, a symbol whose JSON is already stored is revalidated through the HTTP
+    cache and may come back as http_cache.NOT_MODIFIED.
+    """
+    params = {
+        "index": "equities",
+        "symbol": symbol, 
+        "period": "Quarterly"
+    }
+    revalidate = json_dir is not None and os.path.exists(get_json_filepath(symbol, json_dir))
+    return fetch_results(params, url, symbol, revalidate=revalidate)
+
+def fetch_window_data(from_date, to_date, url=NSE_API_URL):
+    """Fetch every symbol's financial results filed between two dates (inclusive)"""
+    params = {
+        "index": "equities",
+        "period": "Quarterly",
+        "from_date": from_date.strftime('%d-%m-%Y'),
+        "to_date": to_date.strftime('%d-%m-%Y')
+    }
+    data, _ = fetch_results(params, url, f"filings {from_date:%d-%b-%Y} to {to_date:%d-%b-%Y}")
+    return data
 
 
 def save_json_data(symbol, data, json_dir):
@@ -63,69 +127,453 @@ def save_json_data(symbol, data, json_dir):
     filepath = os.path.join(json_dir, filename)
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Written whole and renamed into place, compressed when --compress is set
+        storage.write_bytes(filepath, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
         print(f"[OK] Saved JSON data for {symbol}: {filepath}")
         return True
     except Exception as e:
         print(f"[ERROR] Failed to save JSON for {symbol}: {e}")
         return False
 
-def fetch_all_symbols():
+def get_json_filepath(symbol, json_dir):
+    """Path of the stored JSON response for a symbol"""
+    return os.path.join(json_dir, f"{symbol.lower()}.json")
+
+def get_record_seq(record):
+    """Return a record's seqNumber as an int, or None if missing"""
+    try:
+        return int(record.get('seqNumber'))
+    except (TypeError, ValueError):
+        return None
+
+def compute_watermark(records):
+    """High-water mark of a symbol's records: max seqNumber, filingDate and broadCastDate"""
+    watermark = {}
+    
+    seqs = [seq for seq in (get_record_seq(record) for record in records) if seq is not None]
+    if seqs:
+        watermark['seqNumber'] = max(seqs)
+    
+    for field in ('filingDate', 'broadCastDate'):
+        dated = [(parse_nse_date(record.get(field)), record.get(field)) for record in records]
+        dated = [item for item in dated if item[0] is not None]
+        if dated:
+            watermark[field] = max(dated)[1]
+    
+    return watermark
+
+def is_new_record(record, watermark):
+    """True if a record is above the stored high-water mark"""
+    seq = get_record_seq(record)
+    if seq is not None and 'seqNumber' in watermark:
+        return seq > watermark['seqNumber']
+    
+    # Records without a seqNumber fall back to their timestamps
+    for field in ('broadCastDate', 'filingDate'):
+        record_date = parse_nse_date(record.get(field))
+        mark_date = parse_nse_date(watermark.get(field))
+        if record_date is not None and mark_date is not None:
+            return record_date > mark_date
+    
+    return True
+
+def load_stored_records(symbol, json_dir):
+    """Read the previously saved records for a symbol, or an empty list"""
+    json_filepath = get_json_filepath(symbol, json_dir)
+    if not os.path.exists(json_filepath):
+        return []
+    
+    try:
+        with storage.open_text(json_filepath) as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception as e:
+        print(f"[ERROR] Failed to read stored JSON for {symbol}: {e}")
+        return []
+
+def merge_incremental(symbol, data, json_dir, watermarks, pending_downloads):
+    """Merge only records above the symbol's watermark into its stored JSON and queue their XBRL links"""
+    key = symbol.lower()
+    stored = load_stored_records(symbol, json_dir)
+    
+    # Bootstrap the watermark from the stored file the first time
+    watermark = watermarks.get(key)
+    if watermark is None:
+        watermark = compute_watermark(stored)
+    
+    known_seqs = {get_record_seq(record) for record in stored} - {None}
+    new_records = [
+        record for record in data
+        if is_new_record(record, watermark) and get_record_seq(record) not in known_seqs
+    ]
+    
+    if not new_records and stored:
+        watermarks[key] = watermark
+        print(f"[SKIP] No new filings for {symbol}")
+        return True
+    
+    # NSE lists newest first, so new records go ahead of the stored history
+    merged = new_records + stored
+    if not save_json_data(symbol, merged, json_dir):
+        return False
+    
+    watermarks[key] = compute_watermark(merged)
+    new_links = [record for record in new_records if (record.get('xbrl') or '').strip()]
+    if new_links:
+        pending_downloads.setdefault(key, []).extend(new_links)
+    print(f"[OK] {symbol}: {len(new_records)} new records, {len(new_links)} new XBRL links queued")
+    return True
+
+def register_fetched_records(conn, symbol, data):
+    """Add every filing with an XBRL link to the manifest, if one is in use"""
+    if conn is None or not isinstance(data, list):
+        return
+    
+    for record in data:
+        filename = build_xbrl_filename(record)
+        if filename:
+            manifest.register_filing(conn, symbol, filename, record.get('seqNumber'), record['xbrl'].strip())
+    conn.commit()
+
+def handle_fetched_data(symbol, data, json_dir, incremental_state, conn=None, validators=None):
+    """Save a fetched response, either whole or merged above the watermark in incremental mode"""
+    if data is http_cache.NOT_MODIFIED:
+        # The stored JSON is still current: nothing to parse, merge or write
+        return True
+    
+    if incremental_state is None or not isinstance(data, list):
+        ok = save_json_data(symbol, data, json_dir)
+    else:
+        watermarks, pending_downloads, state_dir = incremental_state
+        ok = merge_incremental(symbol, data, json_dir, watermarks, pending_downloads)
+        save_state('watermarks', watermarks, state_dir)
+        save_state('pending_downloads', pending_downloads, state_dir)
+    
+    if ok:
+        # Only now that the JSON is on disk may a later run be told 304 for it
+        http_cache.record(validators)
+        register_fetched_records(conn, symbol, data)
+    return ok
+
+def load_incremental_state(incremental, state_dir):
+    """Load (watermarks, pending downloads, state dir) when running incrementally"""
+    if not incremental:
+        return None
+    print("[INFO] Incremental mode: merging records above each symbol's watermark")
+    return load_state('watermarks', state_dir), load_state('pending_downloads', state_dir), state_dir
+
+def print_fetch_summary(successful_count, failed_count, json_dir):
+    """Print the end-of-run fetch summary"""
+    print(f"\nFetching Summary:")
+    print(f"[OK] Successfully fetched: {successful_count} symbols")
+    print(f"[FAIL] Failed to fetch: {failed_count} symbols")
+    print(f"[INFO] JSON files saved to: {json_dir}")
+
+def retry_failed_symbols(failed_symbols, json_dir, url, incremental_state, conn=None):
+    """End-of-run retry pass over symbols that failed; returns how many recovered"""
+    def retry(symbol):
+        """Fetch and save one failed symbol again"""
+        data, validators = fetch_symbol_data(symbol, url, json_dir)
+        return bool(data) and handle_fetched_data(symbol, data, json_dir, incremental_state, conn, validators)
+    
+    remaining = retry_failed(failed_symbols, retry, 'symbols')
+    return len(failed_symbols) - len(remaining)
+
+def fetch_all_symbols(symbols=None, json_dir=None, url=NSE_API_URL, incremental=False, state_dir=None, conn=None):
     """Fetch data for all symbols and save as JSON files"""
     print("Starting bulk symbol data fetching...")
     print("=" * 50)
     
     # Read symbols from file
-    symbols = read_symbols_from_file()
+    if symbols is None:
+        symbols = read_symbols_from_file()
     if not symbols:
         print("No symbols found. Exiting.")
         return
     
     # Create JSON directory
-    json_dir = create_json_folder()
+    if json_dir is None:
+        json_dir = create_json_folder()
     print(f"JSON files will be saved to: {json_dir}")
+    incremental_state = load_incremental_state(incremental, state_dir)
     
     # Fetch data for each symbol
     successful_count = 0
-    failed_count = 0
+    failed_symbols = []
     
     for i, symbol in enumerate(symbols, 1):
         print(f"\n[{i}/{len(symbols)}] Processing {symbol}...")
         
         # Check if JSON file already exists
-        json_filename = f"{symbol.lower()}.json"
-        json_filepath = os.path.join(json_dir, json_filename)
+        json_filepath = get_json_filepath(symbol, json_dir)
         
-        if os.path.exists(json_filepath):
+        if not incremental and os.path.exists(json_filepath):
             print(f"[SKIP] JSON file already exists for {symbol}")
             continue
         
         # Fetch data for symbol
-        data = fetch_symbol_data(symbol)
+        data, validators = fetch_symbol_data(symbol, url, json_dir)
         
         if data:
             # Save JSON data
-            if save_json_data(symbol, data, json_dir):
+            if handle_fetched_data(symbol, data, json_dir, incremental_state, conn, validators):
                 successful_count += 1
             else:
-                failed_count += 1
+                failed_symbols.append(symbol)
         else:
-            failed_count += 1
+            failed_symbols.append(symbol)
         
         # Add delay to be respectful to the server
         if i < len(symbols):  # Don't delay after the last symbol
-            time.sleep(2)
+            metrics.sleep(2, 'politeness')
+    
+    # Give throttled or failed symbols another chance once the run is over
+    recovered = retry_failed_symbols(failed_symbols, json_dir, url, incremental_state, conn)
+    http_cache.save()
     
     # Print summary
-    print(f"\nFetching Summary:")
-    print(f"[OK] Successfully fetched: {successful_count} symbols")
-    print(f"[FAIL] Failed to fetch: {failed_count} symbols")
-    print(f"[INFO] JSON files saved to: {json_dir}")
+    print_fetch_summary(successful_count + recovered, len(failed_symbols) - recovered, json_dir)
+
+async def fetch_symbol_async(symbol, json_dir, semaphore, bucket, url, incremental_state=None, conn=None):
+    """Fetch and save one symbol once a concurrency slot and a rate-limit token are free"""
+    async with semaphore:
+        await bucket.acquire_async()
+        # requests is blocking, so each fetch runs on a worker thread
+        data, validators = await asyncio.to_thread(fetch_symbol_data, symbol, url, json_dir)
+    
+    if not data:
+        return False
+    # Saved on the event loop thread so watermark updates never race
+    return handle_fetched_data(symbol, data, json_dir, incremental_state, conn, validators)
+
+async def fetch_all_symbols_async(symbols=None, json_dir=None, concurrency=4, rate=0.5, burst=1, url=NSE_API_URL,
+                                  incremental=False, state_dir=None, conn=None):
+    """Fetch data for all symbols concurrently, bounded by a concurrency cap and a shared token bucket"""
+    print("Starting concurrent symbol data fetching...")
+    print("=" * 50)
+    
+    # Read symbols from file
+    if symbols is None:
+        symbols = read_symbols_from_file()
+    if not symbols:
+        print("No symbols found. Exiting.")
+        return
+    
+    # Create JSON directory
+    if json_dir is None:
+        json_dir = create_json_folder()
+    print(f"JSON files will be saved to: {json_dir}")
+    print(f"[INFO] Concurrency: {concurrency}, rate limit: {rate} requests/sec (burst {burst})")
+    incremental_state = load_incremental_state(incremental, state_dir)
+    
+    # Skip symbols that already have a JSON file
+    pending = []
+    for symbol in symbols:
+        if not incremental and os.path.exists(get_json_filepath(symbol, json_dir)):
+            print(f"[SKIP] JSON file already exists for {symbol}")
+        else:
+            pending.append(symbol)
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    bucket = TokenBucket(rate, burst)
+    results = await asyncio.gather(*(
+        fetch_symbol_async(symbol, json_dir, semaphore, bucket, url, incremental_state, conn) for symbol in pending
+    ))
+    
+    successful_count = sum(1 for ok in results if ok)
+    failed_symbols = [symbol for symbol, ok in zip(pending, results) if not ok]
+    
+    # Give throttled or failed symbols another chance once the concurrent pass is over; nothing else
+    # runs on the loop by now, and staying on its thread keeps the manifest connection usable
+    recovered = retry_failed_symbols(failed_symbols, json_dir, url, incremental_state, conn)
+    http_cache.save()
+    
+    # Print summary
+    print_fetch_summary(successful_count + recovered, len(failed_symbols) - recovered, json_dir)
+
+def iter_date_windows(start, end, window_days):
+    """(from, to) date windows of at most window_days days covering start..end"""
+    while start <= end:
+        window_end = min(start + timedelta(days=window_days - 1), end)
+        yield start, window_end
+        start = window_end + timedelta(days=1)
+
+def fetch_date_range(start, end, url=NSE_API_URL, window_days=BULK_WINDOW_DAYS, page_limit=None):
+    """Fetch every filing made from start to end window by window; returns (records, first failed date, requests)"""
+    page_limit = page_limit or BULK_PAGE_LIMIT
+    records = []
+    requests_made = 0
+    windows = deque(iter_date_windows(start, end, window_days))
+    
+    while windows:
+        from_date, to_date = windows.popleft()
+        data = fetch_window_data(from_date, to_date, url)
+        requests_made += 1
+        if not isinstance(data, list):
+            # Later windows wait for the next run, which resumes from this one
+            return records, from_date, requests_made
+        
+        # A full page may have been cut short, so the window is halved and both halves asked for instead
+        if len(data) >= page_limit and from_date < to_date:
+            middle = from_date + (to_date - from_date) // 2
+            windows.appendleft((middle + timedelta(days=1), to_date))
+            windows.appendleft((from_date, middle))
+            print(f"[INFO] {len(data)} filings from {from_date:%d-%b-%Y} to {to_date:%d-%b-%Y}; splitting the window")
+        else:
+            records.extend(data)
+        
+        if windows:
+            metrics.sleep(2, 'politeness')
+    
+    return records, None, requests_made
+
+def get_latest_stored_filing(json_dir):
+    """Date of the latest filing across every stored JSON file, or None"""
+    latest = None
+    for filename in os.listdir(json_dir):
+        if filename.endswith('.json'):
+            watermark = compute_watermark(load_stored_records(filename[:-5], json_dir))
+            filed = parse_nse_date(watermark.get('filingDate'))
+            if filed is not None and (latest is None or filed > latest):
+                latest = filed
+    return latest.date() if latest else None
+
+def group_records_by_symbol(records):
+    """Symbol -> its records, newest first as NSE lists them per symbol"""
+    by_symbol = {}
+    for record in records:
+        symbol = (record.get('symbol') or '').strip().upper()
+        if symbol:
+            by_symbol.setdefault(symbol, []).append(record)
+    for symbol_records in by_symbol.values():
+        symbol_records.sort(key=lambda record: get_record_seq(record) or 0, reverse=True)
+    return by_symbol
+
+def fetch_bulk(symbols=None, json_dir=None, url=NSE_API_URL, since=None, until=None, window_days=BULK_WINDOW_DAYS,
+               all_symbols=False, state_dir=None, conn=None):
+    """Fetch the filings made since the last run by date window and fan them out to each symbol's JSON"""
+    print("Starting bulk date-window fetching...")
+    print("=" * 50)
+    
+    # Read symbols from file; with all_symbols every symbol NSE returns is kept
+    if symbols is None and not all_symbols:
+        symbols = read_symbols_from_file()
+    if not symbols and not all_symbols:
+        print("No symbols found. Exiting.")
+        return
+    universe = None if all_symbols else {symbol.upper() for symbol in symbols}
+    
+    # Create JSON directory
+    if json_dir is None:
+        json_dir = create_json_folder()
+    print(f"JSON files will be saved to: {json_dir}")
+    
+    # Bulk records are always merged above each symbol's watermark; a window never replaces a history
+    incremental_state = load_incremental_state(True, state_dir)
+    bulk_state = load_state('bulk_fetch', state_dir)
+    
+    # The last fetched day is asked for again, as filings made later that day were not out yet
+    if since is None and bulk_state.get('fetched_through'):
+        since = datetime.strptime(bulk_state['fetched_through'], '%Y-%m-%d').date()
+    if since is None:
+        since = get_latest_stored_filing(json_dir)
+    if since is None:
+        print("[ERROR] Nothing fetched yet to continue from; pass --since YYYY-MM-DD")
+        return
+    until = until or datetime.now().date()
+    
+    print(f"[INFO] Filing dates {since:%d-%b-%Y} to {until:%d-%b-%Y}, {window_days}-day windows")
+    records, failed_from, window_requests = fetch_date_range(since, until, url, window_days)
+    by_symbol = group_records_by_symbol(records)
+    
+    # Symbols without a stored history are gaps a window cannot fill; they get one full per-symbol request
+    candidates = universe if universe is not None else set(by_symbol)
+    gaps = sorted(symbol for symbol in candidates if not os.path.exists(get_json_filepath(symbol, json_dir)))
+    
+    successful_count = 0
+    failed_symbols = []
+    for symbol in sorted(by_symbol):
+        if symbol in gaps or (universe is not None and symbol not in universe):
+            continue
+        if handle_fetched_data(symbol, by_symbol[symbol], json_dir, incremental_state, conn):
+            successful_count += 1
+        else:
+            failed_symbols.append(symbol)
+    
+    for i, symbol in enumerate(gaps, 1):
+        print(f"\n[{i}/{len(gaps)}] No stored history for {symbol}, fetching it whole...")
+        data, validators = fetch_symbol_data(symbol, url)
+        if data and handle_fetched_data(symbol, data, json_dir, incremental_state, conn, validators):
+            successful_count += 1
+        else:
+            failed_symbols.append(symbol)
+        if i < len(gaps):
+            metrics.sleep(2, 'politeness')
+    
+    # Resume from the first failed window next time, or from the last day fetched
+    fetched_through = failed_from - timedelta(days=1) if failed_from else until
+    if fetched_through >= since:
+        bulk_state['fetched_through'] = fetched_through.strftime('%Y-%m-%d')
+        save_state('bulk_fetch', bulk_state, state_dir)
+    
+    recovered = retry_failed_symbols(failed_symbols, json_dir, url, incremental_state, conn)
+    http_cache.save()
+    print(f"\n[INFO] {window_requests} window requests for {(until - since).days + 1} days, "
+          f"{len(records)} filings across {len(by_symbol)} symbols, {len(gaps)} per-symbol requests for gaps")
+    if failed_from:
+        print(f"[FAIL] Windows from {failed_from:%d-%b-%Y} failed; the next run resumes there")
+    print_fetch_summary(successful_count + recovered, len(failed_symbols) - recovered, json_dir)
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Fetch NSE financial results JSON for symbols.txt")
+    parser.add_argument('--engine', choices=['serial', 'async'], default='serial',
+                        help="serial: one symbol at a time with a 2s pause (default); async: concurrent with a rate limiter")
+    parser.add_argument('--concurrency', type=int, default=4, help="Max in-flight requests in async mode")
+    parser.add_argument('--rate', type=float, default=0.5, help="Requests per second across all in-flight requests")
+    parser.add_argument('--burst', type=int, default=1, help="Requests allowed back-to-back before the rate applies")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Refetch existing symbols and merge only records above the stored seqNumber/date watermark")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Query by filing-date window instead of per symbol and merge the records into each JSON")
+    parser.add_argument('--since', type=parse_date,
+                        help="First filing date for --bulk (default: where the last bulk run stopped)")
+    parser.add_argument('--window-days', type=int, default=BULK_WINDOW_DAYS,
+                        help=f"Days per --bulk request (default {BULK_WINDOW_DAYS}); full windows are split")
+    parser.add_argument('--all-symbols', action='store_true',
+                        help="With --bulk, keep every symbol NSE returns instead of only symbols.txt")
+    storage.add_arguments(parser)
+    http_cache.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
 
 def main():
     """Main function to fetch data for all symbols"""
-    fetch_all_symbols()
+    args = parse_args()
+    storage.set_compression(args.compress)
+    http_cache.configure(args)
+    
+    # Register fetched filings in the manifest when it exists (python manifest.py --sync)
+    conn = manifest.open_if_exists()
+    
+    with metrics.collect('fetch', args.metrics, args.profile):
+        if args.bulk:
+            fetch_bulk(since=args.since, window_days=max(1, args.window_days), all_symbols=args.all_symbols, conn=conn)
+        elif args.engine == 'async':
+            asyncio.run(fetch_all_symbols_async(concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+                                                incremental=args.incremental, conn=conn))
+        else:
+            fetch_all_symbols(incremental=args.incremental, conn=conn)
+    
+    if conn is not None:
+        conn.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+
+# Field -> element names in priority order, per sector. A field takes the first fact (in
+# document order) of the highest-priority element that carries a usable value, so the
+# order of the lists, not the order of rows in the filing, decides what is extracted.
+# Add a metric by adding a field here (and a converter in FIELD_CONVERTERS unless it is numeric).
+FIELD_MAPPINGS = {
+    'banking': {
+        'reporting_date': ['DateOfEndOfReportingPeriod'],
+        'profit_loss': [
+            'ProfitLossForThePeriod',
+            'ProfitLossFromOrdinaryActivitiesAfterTax',
+            'ProfitOrLossAttributableToOwnersOfParent'
+        ],
+        'basic_eps': [
+            'BasicEarningsPerShareAfterExtraordinaryItems',
+            'BasicEarningsPerShareBeforeExtraordinaryItems',
+            'DilutedEarningsPerShareAfterExtraordinaryItems',
+            'BasicEarningsPerShare'
+        ]
+    },
+    'default': {
+        'reporting_date': ['DateOfEndOfReportingPeriod'],
+        'profit_loss': [
+            'ProfitLossForPeriod',
+            'ProfitLossForThePeriod',
+            'ProfitOrLossAttributableToOwnersOfParent',
+            'ProfitLossFromOrdinaryActivitiesAfterTax'
+        ],
+        'basic_eps': [
+            'BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations',
+            'BasicEarningsLossPerShareFromContinuingOperations',
+            'BasicEarningsPerShareAfterExtraordinaryItems',
+            'BasicEarningsPerShareBeforeExtraordinaryItems',
+            'DilutedEarningsPerShareAfterExtraordinaryItems',
+            'BasicEarningsPerShare'
+        ]
+    }
+}
+
+def convert_date(fact_value):
+    """Reporting dates as ddMonYYYY (e.g. 31Dec2024), falling back to the raw value"""
+    try:
+        if isinstance(fact_value, str):
+            # Handle date string format (e.g., "2024-12-31")
+            return datetime.strptime(fact_value, '%Y-%m-%d').strftime('%d%b%Y')
+        return str(fact_value)
+    except (ValueError, TypeError):
+        return str(fact_value)
+
+def convert_number(fact_value):
+    """Numeric facts as float strings; None rejects the fact so a lower-priority one can match"""
+    try:
+        return str(float(fact_value))
+    except (ValueError, TypeError):
+        return None
+
+FIELD_CONVERTERS = {
+    'reporting_date': convert_date,
+    'profit_loss': convert_number,
+    'basic_eps': convert_number
+}
+
+def get_sector(filename):
+    """Sector whose mapping applies to a filing; NSE names banking-format filings *_BANKING_*"""
+    return 'banking' if '_BANKING_' in os.path.basename(filename).upper() else 'default'
+
+class FieldMatcher:
+    """A field mapping compiled into one element name -> (field, priority) lookup"""
+
+    def __init__(self, mapping):
+        self.fields = list(mapping)
+        self.converters = {field: FIELD_CONVERTERS.get(field, convert_number) for field in mapping}
+        self.index = {}
+        for field, element_names in mapping.items():
+            for priority, element_name in enumerate(element_names):
+                self.index.setdefault(element_name, []).append((field, priority))
+        # Element name as it appears in a row (possibly prefixed) -> its index entries
+        self.cache = {}
+
+    def lookup(self, element_name):
+        """Index entries for a row's element name, ignoring any namespace prefix"""
+        entries = self.cache.get(element_name)
+        if entries is None:
+            entries = self.index.get(element_name.rpartition(':')[2], ())
+            self.cache[element_name] = entries
+        return entries
+
+    def match(self, rows):
+        """Resolve every field from (element name, fact value) rows in one pass"""
+        values = {}
+        priorities = {}
+        settled = 0
+
+        for element_name, fact_value in rows:
+            if not element_name or not isinstance(element_name, str) or fact_value is None:
+                continue
+            for field, priority in self.lookup(element_name):
+                if priorities.get(field, priority + 1) <= priority:
+                    continue
+                value = self.converters[field](fact_value)
+                if value is None:
+                    continue
+                values[field] = value
+                priorities[field] = priority
+                if priority == 0:
+                    settled += 1
+
+            # Stop once every field has its first-choice element
+            if settled == len(self.fields):
+                break
+
+        return values
+
+MATCHERS = {sector: FieldMatcher(mapping) for sector, mapping in FIELD_MAPPINGS.items()}
+
+def get_matcher(filename):
+    """Compiled matcher for a filing's sector"""
+    return MATCHERS[get_sector(filename)]
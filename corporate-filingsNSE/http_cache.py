@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from email.utils import formatdate
+
+import requests
+
+from state import load_state, save_state
+
+# Seconds a checked response stays fresh, per resource class; within it no request is sent at all.
+# A symbol's filing list changes a few times a quarter, a filed XBRL document practically never
+DEFAULT_TTLS = {'metadata': 6 * 3600, 'xbrl': 30 * 24 * 3600}
+
+# Returned instead of a body when the server answered 304 or the entry was still fresh
+NOT_MODIFIED = object()
+
+# URL -> {'etag', 'last_modified', 'checked_at', ...}; None while the cache is off (the default)
+_entries = None
+_state_dir = None
+_ttls = dict(DEFAULT_TTLS)
+_lock = threading.Lock()
+
+def enable(state_dir=None, ttls=None):
+    """Turn the cache on, loading the validators kept in STATE/http_cache.json"""
+    global _entries, _state_dir, _ttls
+    with _lock:
+        _state_dir = state_dir
+        _entries = load_state('http_cache', state_dir)
+        _ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+
+def disable():
+    """Turn the cache off; nothing is sent conditionally or recorded"""
+    global _entries
+    with _lock:
+        _entries = None
+
+def is_enabled():
+    """True while --http-cache is on"""
+    return _entries is not None
+
+def get_cache_key(url, params=None):
+    """The full request URL, query string included, that an entry is kept under"""
+    return requests.Request('GET', url, params=params).prepare().url
+
+def get_entry(key):
+    """A copy of key's entry, or None if it has none or the cache is off"""
+    with _lock:
+        return dict(_entries[key]) if _entries is not None and key in _entries else None
+
+def is_fresh(key, resource_class):
+    """True when the entry was checked within its class's TTL, so no request is needed"""
+    entry = get_entry(key)
+    return entry is not None and time.time() - entry['checked_at'] < _ttls[resource_class]
+
+def needs_revalidation(key, resource_class):
+    """True when the cache is on and the entry is missing or stale"""
+    return is_enabled() and not is_fresh(key, resource_class)
+
+def get_conditional_headers(key, filepath=None):
+    """If-None-Match / If-Modified-Since for a cached URL; a stored file's mtime stands in for a missing entry"""
+    entry = get_entry(key) or {}
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    elif filepath and os.path.exists(filepath):
+        headers['If-Modified-Since'] = formatdate(os.path.getmtime(filepath), usegmt=True)
+    return headers
+
+def get_validators(key, response):
+    """A 200 response's ETag/Last-Modified under key, to be recorded once its body is safely stored"""
+    return {'key': key, 'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+
+def record(validators, **fields):
+    """Keep validators from get_validators (and fields such as a content hash); call only after the write succeeded"""
+    with _lock:
+        if _entries is None or validators is None:
+            return
+        _entries[validators['key']] = dict(fields, etag=validators['etag'],
+                                           last_modified=validators['last_modified'], checked_at=time.time())
+
+def touch(key):
+    """Mark an entry checked now, after a 304"""
+    with _lock:
+        if _entries is not None and key in _entries:
+            _entries[key]['checked_at'] = time.time()
+
+def save():
+    """Write the entries back to STATE/http_cache.json"""
+    with _lock:
+        if _entries is not None:
+            save_state('http_cache', _entries, _state_dir)
+
+def add_arguments(parser):
+    """The conditional-request options of the stages that talk to NSE"""
+    parser.add_argument('--http-cache', action='store_true',
+                        help="Send If-None-Match/If-Modified-Since from STATE/http_cache.json; 304s skip parse and write")
+    parser.add_argument('--metadata-ttl', type=float, default=DEFAULT_TTLS['metadata'] / 3600,
+                        help="Hours a symbol's filing list is trusted without asking NSE (default 6)")
+    parser.add_argument('--xbrl-ttl', type=float, default=DEFAULT_TTLS['xbrl'] / 86400,
+                        help="Days a downloaded XBRL file is trusted before it is revalidated (default 30)")
+
+def configure(args):
+    """Apply the parsed --http-cache options"""
+    if args.http_cache:
+        enable(ttls={'metadata': args.metadata_ttl * 3600, 'xbrl': args.xbrl_ttl * 86400})
+        print(f"[INFO] HTTP cache on: metadata TTL {args.metadata_ttl:g}h, XBRL TTL {args.xbrl_ttl:g}d")
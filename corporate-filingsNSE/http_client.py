@@ -0,0 +1,92 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode br responses)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+NSE_HOME_URL = "https://www.nseindia.com/"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+# One pooled session per scheme+host, shared by fetcher, downloader and converter
+_sessions = {}
+_warmed_up = set()
+_lock = threading.Lock()
+_pool_size = 10
+
+def set_pool_size(pool_size):
+    """Set the connection pool size used for sessions created from now on"""
+    global _pool_size
+    _pool_size = max(1, int(pool_size))
+
+def get_host_key(url):
+    """Session key for a URL: scheme and host"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def create_session(pool_size):
+    """Create a keep-alive session with a connection pool of the given size"""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(url):
+    """Return the shared pooled session for the URL's host, creating it on first use"""
+    key = get_host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = create_session(_pool_size)
+            _sessions[key] = session
+        return session
+
+def warm_up_nse(session, timeout=30):
+    """Visit the NSE home page once per process so the API sees the site's cookies"""
+    with _lock:
+        if NSE_HOME_URL in _warmed_up:
+            return
+        _warmed_up.add(NSE_HOME_URL)
+
+    try:
+        session.get(NSE_HOME_URL, timeout=timeout).raise_for_status()
+        print(f"[INFO] NSE session warmed up ({len(session.cookies)} cookies)")
+    except requests.RequestException as e:
+        print(f"[FAIL] NSE cookie warm-up failed: {e}")
+
+def reset_warm_up():
+    """Forget the NSE warm-up so the next get_nse_session() fetches fresh cookies (e.g. after a 403)"""
+    with _lock:
+        _warmed_up.discard(NSE_HOME_URL)
+
+def get_nse_session(url):
+    """Return the shared session for an NSE API URL, warming up cookies when it is on the NSE site"""
+    session = get_session(url)
+    if get_host_key(url) == get_host_key(NSE_HOME_URL):
+        warm_up_nse(session)
+    return session
+
+def close_sessions():
+    """Close every shared session and forget warm-up state"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _warmed_up.clear()
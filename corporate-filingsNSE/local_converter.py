@@ -0,0 +1,298 @@
+import argparse
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from xbrl_parser import iter_facts
+
+# Same sheet the EC2 converter writes (sic: 'Intance'), so extractor.py reads both alike
+SHEET_NAME = 'Intance Data'
+HEADER = ('Sr.No.', 'Element Name', 'Period', 'Unit', 'Decimals', 'Fact Value')
+COLUMN_LETTERS = 'ABCDEF'
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Form field and postback fields of the EC2 page, as posted by converter.upload_and_convert_xbrl
+UPLOAD_FIELD = 'FileUploadControl'
+FORM_PAGE = f"""<!DOCTYPE html>
+<html><head><title>XBRL to Excel</title></head><body>
+<form method="post" action="/" enctype="multipart/form-data">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="local" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="local" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="local" />
+<input type="file" name="{UPLOAD_FIELD}" />
+<input type="submit" name="Button1" value="Validate" />
+</form></body></html>
+"""
+
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+CONTENT_TYPES_XML = XML_DECLARATION + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/tables/table.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.table+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = XML_DECLARATION + (
+    f'<Relationships xmlns="{PACKAGE_NS}">'
+    f'<Relationship Id="rId1" Type="{DOCUMENT_REL}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = XML_DECLARATION + (
+    f'<workbook xmlns="{SPREADSHEET_NS}" xmlns:r="{RELATIONSHIPS_NS}">'
+    f'<sheets><sheet name="{SHEET_NAME}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = XML_DECLARATION + (
+    f'<Relationships xmlns="{PACKAGE_NS}">'
+    f'<Relationship Id="rId1" Type="{DOCUMENT_REL}/worksheet" Target="worksheets/sheet.xml"/>'
+    f'<Relationship Id="rId2" Type="{DOCUMENT_REL}/sharedStrings" Target="sharedStrings.xml"/>'
+    f'<Relationship Id="rId3" Type="{DOCUMENT_REL}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+SHEET_RELS_XML = XML_DECLARATION + (
+    f'<Relationships xmlns="{PACKAGE_NS}">'
+    f'<Relationship Id="rId1" Type="{DOCUMENT_REL}/table" Target="../tables/table.xml"/>'
+    '</Relationships>'
+)
+
+# Style 1 is a body cell and style 2 the white-on-navy header, as in the EC2 workbooks
+STYLES_XML = XML_DECLARATION + (
+    f'<styleSheet xmlns="{SPREADSHEET_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Arial"/><family val="2"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF00008B"/><bgColor rgb="FF00008B"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="49" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="49" fontId="1" fillId="2" borderId="0" xfId="0" applyNumberFormat="1" applyFont="1" applyFill="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+COLUMN_WIDTHS = (7, 99, 24, 24, 10, 18)
+
+def format_date(value):
+    """YYYY-MM-DD as DD-MM-YYYY, the EC2 converter's period format; anything else unchanged"""
+    parts = value.split('-')
+    if len(parts) == 3 and len(parts[0]) == 4:
+        return f'{parts[2]}-{parts[1]}-{parts[0]}'
+    return value
+
+def format_period(period_start, period_end):
+    """Period column text: '01-10-2022 To 31-12-2022' for durations, '31-12-2022' for instants"""
+    if period_start and period_end:
+        return f'{format_date(period_start)} To {format_date(period_end)}'
+    if period_end:
+        return format_date(period_end)
+    return None
+
+def iter_sheet_rows(xbrl_file):
+    """(Sr.No., Element Name, Period, Unit, Decimals, Fact Value) per fact, as the EC2 converter fills them.
+
+    Its quirks are kept so workbooks are interchangeable: Period is only filled for contexts
+    declared in the instance, the Unit column holds the contextRef of facts that have a unit,
+    INF decimals and empty values are left blank, and apostrophes in values are doubled.
+    """
+    for number, fact in enumerate(iter_facts(xbrl_file), 1):
+        period = format_period(fact['period_start'], fact['period_end']) if fact['context_declared'] else None
+        unit = fact['context_ref'] if fact['unit_ref'] else None
+        decimals = fact['decimals'] if fact['decimals'] != 'INF' else None
+        value = fact['value'].replace("'", "''") if fact['value'] else None
+        yield (str(number), fact['element'], period, unit, decimals, value)
+
+def escape_text(value):
+    """Escape a cell string for XML, keeping carriage returns that a parser would otherwise fold"""
+    return escape(value, {'\r': '&#13;'})
+
+def build_workbook(rows):
+    """XLSX bytes of a single 'Intance Data' sheet: header row plus the given rows, all shared strings"""
+    shared_strings = {}
+    sheet_rows = []
+
+    for row_number, row in enumerate([HEADER, *rows], 1):
+        style = 2 if row_number == 1 else 1
+        cells = []
+        for letter, value in zip(COLUMN_LETTERS, row):
+            if value is None:
+                cells.append(f'<c r="{letter}{row_number}" s="{style}" t="s"/>')
+                continue
+            index = shared_strings.setdefault(value, len(shared_strings))
+            cells.append(f'<c r="{letter}{row_number}" s="{style}" t="s"><v>{index}</v></c>')
+        sheet_rows.append(f'<row r="{row_number}" spans="1:6">{"".join(cells)}</row>')
+
+    reference = f'A1:F{len(sheet_rows)}'
+    columns = ''.join(
+        f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>' for i, width in enumerate(COLUMN_WIDTHS, 1)
+    )
+    sheet_xml = XML_DECLARATION + (
+        f'<worksheet xmlns="{SPREADSHEET_NS}" xmlns:r="{RELATIONSHIPS_NS}">'
+        f'<dimension ref="{reference}"/><cols>{columns}</cols>'
+        f'<sheetData>{"".join(sheet_rows)}</sheetData>'
+        '<tableParts count="1"><tablePart r:id="rId1"/></tableParts>'
+        '</worksheet>'
+    )
+
+    strings = ''.join(f'<si><t xml:space="preserve">{escape_text(value)}</t></si>' for value in shared_strings)
+    shared_strings_xml = XML_DECLARATION + (
+        f'<sst xmlns="{SPREADSHEET_NS}" count="{len(shared_strings)}" uniqueCount="{len(shared_strings)}">'
+        f'{strings}</sst>'
+    )
+
+    table_columns = ''.join(f'<tableColumn id="{i}" name="{escape(name)}"/>' for i, name in enumerate(HEADER, 1))
+    table_xml = XML_DECLARATION + (
+        f'<table xmlns="{SPREADSHEET_NS}" id="1" name="Table1" displayName="Table1" ref="{reference}" totalsRowShown="0">'
+        f'<autoFilter ref="{reference}"/><tableColumns count="{len(HEADER)}">{table_columns}</tableColumns>'
+        '<tableStyleInfo name="TableStyleLight9" showFirstColumn="0" showLastColumn="0" showRowStripes="1" showColumnStripes="0"/>'
+        '</table>'
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        archive.writestr('_rels/.rels', ROOT_RELS_XML)
+        archive.writestr('xl/workbook.xml', WORKBOOK_XML)
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+        archive.writestr('xl/styles.xml', STYLES_XML)
+        archive.writestr('xl/sharedStrings.xml', shared_strings_xml)
+        archive.writestr('xl/worksheets/sheet.xml', sheet_xml)
+        archive.writestr('xl/worksheets/_rels/sheet.xml.rels', SHEET_RELS_XML)
+        archive.writestr('xl/tables/table.xml', table_xml)
+    return buffer.getvalue()
+
+def convert_file(xbrl_file):
+    """Convert an XBRL instance (path or binary file object) to XLSX bytes in the EC2 converter's layout"""
+    return build_workbook(iter_sheet_rows(xbrl_file))
+
+def read_upload(content_type, body):
+    """(filename, bytes) of the FileUploadControl part of a multipart/form-data body, or None"""
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body
+    )
+    if not message.is_multipart():
+        return None
+    for part in message.iter_parts():
+        if part.get_param('name', header='content-disposition') == UPLOAD_FIELD:
+            return part.get_filename() or 'upload.xml', part.get_payload(decode=True) or b''
+    return None
+
+class ConverterRequestHandler(BaseHTTPRequestHandler):
+    """Serve the EC2 converter's form contract: GET the form, POST FileUploadControl, receive the workbook"""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def send_body(self, status, content_type, body, headers=None):
+        """Send a complete response on the keep-alive connection"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_page(self, status, message):
+        """HTML error page; converter.py treats any non-workbook response as a failed conversion"""
+        self.send_body(status, 'text/html; charset=utf-8', f'<html><body><p>{escape(message)}</p></body></html>'.encode('utf-8'))
+
+    def do_GET(self):
+        """The upload form, with the ViewState fields converter.py reads"""
+        self.send_body(200, 'text/html; charset=utf-8', FORM_PAGE.encode('utf-8'))
+
+    def do_POST(self):
+        """Convert the uploaded XBRL file and send the workbook back as an attachment"""
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        upload = read_upload(self.headers.get('Content-Type', ''), body)
+        if upload is None:
+            self.send_error_page(400, f"No {UPLOAD_FIELD} file in the request")
+            return
+
+        filename, data = upload
+        try:
+            workbook = convert_file(io.BytesIO(data))
+        except ET.ParseError as e:
+            self.send_error_page(400, f"{filename} is not a valid XBRL instance: {e}")
+            return
+
+        excel_filename = os.path.splitext(os.path.basename(filename))[0] + '.xlsx'
+        self.send_body(200, XLSX_CONTENT_TYPE, workbook,
+                       {'Content-Disposition': f'attachment; filename="{excel_filename}"'})
+
+    def log_message(self, format, *args):
+        """Keep one access log line per upload out of the console"""
+        pass
+
+def create_server(host='127.0.0.1', port=8765):
+    """Threaded HTTP converter service; port 0 picks a free port (server.server_address has it)"""
+    return ThreadingHTTPServer((host, port), ConverterRequestHandler)
+
+def serve(host='127.0.0.1', port=8765):
+    """Run the converter service until interrupted"""
+    server = create_server(host, port)
+    host, port = server.server_address[:2]
+    print(f"[INFO] Local converter listening on http://{host}:{port}/ (python converter.py --url http://{host}:{port}/)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def convert_files(xbrl_filepaths, output_dir=None):
+    """Convert many XBRL files in this process, writing each workbook next to its source or into output_dir"""
+    converted = 0
+    for xbrl_filepath in xbrl_filepaths:
+        excel_filename = os.path.splitext(os.path.basename(xbrl_filepath))[0] + '.xlsx'
+        excel_filepath = os.path.join(output_dir or os.path.dirname(xbrl_filepath), excel_filename)
+        try:
+            workbook = convert_file(xbrl_filepath)
+            with open(excel_filepath, 'wb') as f:
+                f.write(workbook)
+            converted += 1
+        except (OSError, ET.ParseError) as e:
+            print(f"[FAIL] {os.path.basename(xbrl_filepath)}: {e}")
+    print(f"[OK] Converted {converted}/{len(xbrl_filepaths)} files")
+    return converted
+
+def main():
+    """Convert XBRL files locally, or run the HTTP converter service"""
+    parser = argparse.ArgumentParser(description="Local XBRL to Excel converter (drop-in for the EC2 service)")
+    parser.add_argument('files', nargs='*', help="XBRL files to convert")
+    parser.add_argument('--output-dir', help="Directory for the workbooks (default: next to each XBRL file)")
+    parser.add_argument('--serve', action='store_true', help="Run the HTTP service instead of converting files")
+    parser.add_argument('--host', default='127.0.0.1', help="Service address (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Service port (default: 8765)")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.host, args.port)
+    elif args.files:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        convert_files(args.files, args.output_dir)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
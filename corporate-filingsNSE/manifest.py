@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from state import get_state_dir
+import storage
+
+# Stage order of a filing; each stage works on filings whose status is the one before it
+STAGES = ['fetched', 'downloaded', 'converted', 'extracted']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    symbol TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    seq_number TEXT,
+    xbrl_url TEXT,
+    xbrl_path TEXT,
+    xlsx_path TEXT,
+    content_hash TEXT,
+    status TEXT NOT NULL DEFAULT 'fetched',
+    error_stage TEXT,
+    error TEXT,
+    fetched_at TEXT,
+    downloaded_at TEXT,
+    converted_at TEXT,
+    extracted_at TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (symbol, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_filings_status ON filings (status, symbol);
+CREATE INDEX IF NOT EXISTS idx_filings_url ON filings (xbrl_url);
+CREATE INDEX IF NOT EXISTS idx_filings_hash ON filings (content_hash);
+"""
+
+def get_base_dir():
+    """Directory that relative artifact paths in the manifest are stored against"""
+    return os.path.dirname(os.path.abspath(__file__))
+
+def get_manifest_path(state_dir=None):
+    """Path of the manifest database"""
+    return os.path.join(get_state_dir(state_dir), 'manifest.db')
+
+def manifest_exists(state_dir=None):
+    """True once the manifest has been created (python manifest.py --sync)"""
+    return os.path.exists(get_manifest_path(state_dir))
+
+def connect(state_dir=None):
+    """Open the manifest database, creating the schema if needed"""
+    conn = sqlite3.connect(get_manifest_path(state_dir))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def open_if_exists(state_dir=None):
+    """Open the manifest only if it exists, so stages fall back to directory scans otherwise"""
+    if not manifest_exists(state_dir):
+        return None
+    return connect(state_dir)
+
+def now():
+    """Timestamp stored in the manifest"""
+    return datetime.now().isoformat(timespec='seconds')
+
+def to_relative(path):
+    """Store artifact paths relative to the pipeline directory"""
+    if path is None:
+        return None
+    return os.path.relpath(os.path.abspath(path), get_base_dir())
+
+def to_absolute(path):
+    """Resolve an artifact path stored in the manifest"""
+    if path is None:
+        return None
+    return os.path.join(get_base_dir(), path)
+
+def filing_key(filename):
+    """Manifest key of a filing: its file name without the .xml/.xlsx extension"""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+def register_filing(conn, symbol, filename, seq_number=None, xbrl_url=None):
+    """Add a filing in 'fetched' state, or refresh its metadata if it is already known"""
+    timestamp = now()
+    conn.execute(
+        "INSERT INTO filings (symbol, filename, seq_number, xbrl_url, status, fetched_at, updated_at) "
+        "VALUES (?, ?, ?, ?, 'fetched', ?, ?) "
+        "ON CONFLICT (symbol, filename) DO UPDATE SET "
+        "seq_number = COALESCE(excluded.seq_number, seq_number), "
+        "xbrl_url = COALESCE(excluded.xbrl_url, xbrl_url)",
+        (symbol.lower(), filing_key(filename), seq_number, xbrl_url, timestamp, timestamp)
+    )
+
+def mark_stage(conn, symbol, filename, status, commit=True, **fields):
+    """Move a filing to a stage status, recording artifact paths/hash and clearing any error"""
+    timestamp = now()
+    updates = {
+        'status': status,
+        f'{status}_at': timestamp,
+        'updated_at': timestamp,
+        'error_stage': None,
+        'error': None
+    }
+    for name, value in fields.items():
+        updates[name] = to_relative(value) if name.endswith('_path') else value
+
+    register_filing(conn, symbol, filename)
+    assignments = ', '.join(f"{name} = ?" for name in updates)
+    conn.execute(
+        f"UPDATE filings SET {assignments} WHERE symbol = ? AND filename = ?",
+        (*updates.values(), symbol.lower(), filing_key(filename))
+    )
+    if commit:
+        conn.commit()
+
+def get_status(conn, symbol, filename):
+    """Current status of a filing, or None if unknown"""
+    row = conn.execute(
+        "SELECT status FROM filings WHERE symbol = ? AND filename = ?",
+        (symbol.lower(), filing_key(filename))
+    ).fetchone()
+    return row['status'] if row else None
+
+def get_filing(conn, symbol, filename):
+    """A filing's manifest row, or None if unknown"""
+    return conn.execute(
+        "SELECT * FROM filings WHERE symbol = ? AND filename = ?",
+        (symbol.lower(), filing_key(filename))
+    ).fetchone()
+
+def set_content_hash(conn, symbol, filename, content_hash):
+    """Record a filing's content hash without moving its stage"""
+    conn.execute(
+        "UPDATE filings SET content_hash = ? WHERE symbol = ? AND filename = ?",
+        (content_hash, symbol.lower(), filing_key(filename))
+    )
+
+def mark_failed(conn, symbol, filename, stage, error):
+    """Record a failure without losing the stage the filing had reached"""
+    conn.execute(
+        "UPDATE filings SET error_stage = ?, error = ?, updated_at = ? WHERE symbol = ? AND filename = ?",
+        (stage, str(error), now(), symbol.lower(), filing_key(filename))
+    )
+    conn.commit()
+
+def previous_stage(stage):
+    """Status a filing must have for the given stage to process it"""
+    return STAGES[STAGES.index(stage) - 1]
+
+def symbols_needing(conn, stage):
+    """Symbols with at least one filing waiting for the given stage"""
+    rows = conn.execute(
+        "SELECT DISTINCT symbol FROM filings WHERE status = ? ORDER BY symbol",
+        (previous_stage(stage),)
+    )
+    return [row['symbol'].upper() for row in rows]
+
+def filings_needing(conn, stage, symbol=None):
+    """Filings waiting for the given stage, optionally for one symbol"""
+    query = "SELECT * FROM filings WHERE status = ?"
+    params = [previous_stage(stage)]
+    if symbol is not None:
+        query += " AND symbol = ?"
+        params.append(symbol.lower())
+    return conn.execute(query + " ORDER BY symbol, filename", params).fetchall()
+
+def filings_at_least(conn, symbol, stage):
+    """Filings of a symbol that have completed the given stage (or a later one)"""
+    reached = STAGES[STAGES.index(stage):]
+    placeholders = ', '.join('?' for _ in reached)
+    return conn.execute(
+        f"SELECT * FROM filings WHERE symbol = ? AND status IN ({placeholders}) ORDER BY filename",
+        (symbol.lower(), *reached)
+    ).fetchall()
+
+def symbols_at_least(conn, stage):
+    """Symbols with at least one filing that has completed the given stage"""
+    reached = STAGES[STAGES.index(stage):]
+    placeholders = ', '.join('?' for _ in reached)
+    rows = conn.execute(
+        f"SELECT DISTINCT symbol FROM filings WHERE status IN ({placeholders}) ORDER BY symbol",
+        reached
+    )
+    return [row['symbol'].upper() for row in rows]
+
+def sync_from_filesystem(conn):
+    """Bootstrap the manifest from JSON/ and DATA/ with a single one-time walk"""
+    # Imported here: downloader imports this module for its own manifest updates
+    from downloader import build_xbrl_filename
+
+    base_dir = get_base_dir()
+    json_dir = os.path.join(base_dir, 'JSON')
+    data_dir = os.path.join(base_dir, 'DATA')
+    registered = 0
+
+    # Filings known from the NSE records
+    if os.path.exists(json_dir):
+        for json_file in sorted(os.listdir(json_dir)):
+            if not json_file.endswith('.json'):
+                continue
+            symbol = json_file[:-5]
+            try:
+                with storage.open_text(os.path.join(json_dir, json_file)) as f:
+                    records = json.load(f)
+            except Exception as e:
+                print(f"[ERROR] Failed to read {json_file}: {e}")
+                continue
+            for record in records if isinstance(records, list) else []:
+                filename = build_xbrl_filename(record)
+                if filename:
+                    register_filing(conn, symbol, filename, record.get('seqNumber'), record['xbrl'].strip())
+                    registered += 1
+
+    # Artifacts already on disk advance their filings to the matching stage
+    if os.path.exists(data_dir):
+        for symbol in sorted(os.listdir(data_dir)):
+            symbol_dir = os.path.join(data_dir, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for folder, extension, status, path_field in (('XBRL', '.xml', 'downloaded', 'xbrl_path'),
+                                                            ('XLSX', '.xlsx', 'converted', 'xlsx_path')):
+                folder_dir = os.path.join(symbol_dir, folder)
+                if not os.path.exists(folder_dir):
+                    continue
+                for filename in sorted(os.listdir(folder_dir)):
+                    if not filename.endswith(extension) or filename.startswith('~$'):
+                        continue
+                    # Never move a filing backwards on a re-sync
+                    current = get_status(conn, symbol, filename)
+                    if current is not None and STAGES.index(current) >= STAGES.index(status):
+                        continue
+                    mark_stage(conn, symbol, filename, status, commit=False,
+                               **{path_field: os.path.join(folder_dir, filename)})
+
+    conn.commit()
+    return registered
+
+def print_status(conn):
+    """Print filing counts per status"""
+    rows = conn.execute("SELECT status, COUNT(*) AS n FROM filings GROUP BY status").fetchall()
+    counts = {row['status']: row['n'] for row in rows}
+    for status in STAGES:
+        print(f"[INFO] {status}: {counts.get(status, 0)} filings")
+    failed = conn.execute("SELECT COUNT(*) FROM filings WHERE error IS NOT NULL").fetchone()[0]
+    print(f"[INFO] with errors: {failed} filings")
+
+def main():
+    """Create or inspect the pipeline manifest"""
+    parser = argparse.ArgumentParser(description="Pipeline manifest (STATE/manifest.db)")
+    parser.add_argument('--sync', action='store_true', help="Create/refresh the manifest from JSON/ and DATA/")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.sync:
+        print("Syncing manifest from JSON/ and DATA/...")
+        registered = sync_from_filesystem(conn)
+        print(f"[OK] Registered {registered} filings from JSON records")
+    print_status(conn)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import bisect
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus-style
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Counters, gauges and histograms keyed by (name, sorted label pairs); always collected, written only with --metrics
+_counters = {}
+_gauges = {}
+_histograms = {}
+_lock = threading.Lock()
+_events = None
+
+def get_key(name, labels):
+    """Metric key: the name plus its labels, sorted, without empty ones"""
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+def log_event(kind, name, value, labels):
+    """Append one observation to metrics.jsonl when an output directory is set"""
+    if _events is not None:
+        _events.write(json.dumps({'ts': round(time.time(), 3), 'type': kind, 'name': name,
+                                  'labels': labels, 'value': value}) + '\n')
+
+def inc(name, value=1, **labels):
+    """Add to a counter, e.g. inc('download_bytes_total', size, host=host)"""
+    key = get_key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        log_event('counter', name, value, labels)
+
+def set_gauge(name, value, **labels):
+    """Set a value that is reported as is, e.g. the deepest a queue got"""
+    key = get_key(name, labels)
+    with _lock:
+        _gauges[key] = value
+        log_event('gauge', name, value, labels)
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram"""
+    key = get_key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'count': 0, 'sum': 0.0}
+        histogram['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        log_event('histogram', name, round(seconds, 6), labels)
+
+@contextlib.contextmanager
+def timer(name, **labels):
+    """Observe the duration of a with-block"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def sleep(seconds, reason):
+    """time.sleep that counts the idle time by reason (rate_limit, backoff, politeness, ...)"""
+    if seconds > 0:
+        inc('sleep_seconds_total', seconds, reason=reason)
+        time.sleep(seconds)
+
+def get_quantile(histogram, quantile):
+    """Upper bound of the bucket holding the given quantile"""
+    rank = quantile * histogram['count']
+    seen = 0
+    for bound, count in zip(BUCKETS + (float('inf'),), histogram['buckets']):
+        seen += count
+        if seen >= rank:
+            return bound
+    return float('inf')
+
+def format_labels(labels, extra=()):
+    """Prometheus label set, e.g. {stage="fetch",le="0.1"}"""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+def to_prometheus():
+    """Every counter, gauge and histogram in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, dict(value, buckets=list(value['buckets']))) for key, value in _histograms.items())
+
+    typed = set()
+    for kind, values in (('counter', counters), ('gauge', gauges)):
+        for (name, labels), value in values:
+            if name not in typed:
+                lines.append(f'# TYPE {name} {kind}')
+                typed.add(name)
+            lines.append(f'{name}{format_labels(labels)} {value:g}')
+
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), histogram['buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'{name}_bucket{format_labels(labels, [("le", le)])} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]:.6f}')
+        lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+def print_summary():
+    """Where the time went: histograms with count, total and p50/p95, then counters and gauges"""
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items()) + sorted(_gauges.items())
+    if not histograms and not counters:
+        return
+
+    print(f"\nMetrics Summary:")
+    for (name, labels), histogram in histograms:
+        print(f"[METRIC] {name}{format_labels(labels)}: {histogram['count']} x, {histogram['sum']:.2f}s total, "
+              f"p50 <= {get_quantile(histogram, 0.5):g}s, p95 <= {get_quantile(histogram, 0.95):g}s")
+    for (name, labels), value in counters:
+        print(f"[METRIC] {name}{format_labels(labels)}: {value:g}")
+
+def reset():
+    """Forget everything collected so far"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def add_arguments(parser):
+    """The --metrics/--profile options shared by every stage script"""
+    parser.add_argument('--metrics', metavar='DIR',
+                        help="Write metrics.jsonl (every observation) and metrics.prom (totals) to DIR")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run under cProfile; prints the top functions and saves profile.pstats to the metrics DIR "
+                             "(worker threads are included before Python 3.12 only)")
+
+def profile_new_threads(profiles):
+    """Give every thread started from now on its own profiler (cProfile only sees the thread it runs on)"""
+    if sys.version_info >= (3, 12):
+        # cProfile runs on sys.monitoring there, which allows one active profiler per process
+        print("[INFO] Python 3.12+: --profile covers the main thread only; worker threads are not profiled")
+        return
+
+    def start_profiler(*args):
+        """Swap the thread's setprofile hook for a profiler of its own"""
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        profiles.append(profiler)
+        profiler.enable()
+    threading.setprofile(start_profiler)
+
+@contextlib.contextmanager
+def collect(stage, output_dir=None, profile=False):
+    """Time a stage's whole run, optionally under cProfile, and export what was collected on exit"""
+    global _events
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        _events = open(os.path.join(output_dir, 'metrics.jsonl'), 'a', encoding='utf-8')
+    profiler = cProfile.Profile() if profile else None
+    thread_profiles = []
+
+    started = time.perf_counter()
+    if profiler:
+        profile_new_threads(thread_profiles)
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            threading.setprofile(None)
+        observe('run_seconds', time.perf_counter() - started, stage=stage)
+        print_summary()
+
+        if profiler:
+            report = io.StringIO()
+            stats = pstats.Stats(profiler, stream=report)
+            for thread_profile in thread_profiles:
+                thread_profile.disable()
+                stats.add(thread_profile)
+            stats.sort_stats('cumulative').print_stats(25)
+            print(report.getvalue())
+            if output_dir:
+                stats.dump_stats(os.path.join(output_dir, 'profile.pstats'))
+
+        if output_dir:
+            with _lock:
+                _events.close()
+                _events = None
+            with open(os.path.join(output_dir, 'metrics.prom'), 'w', encoding='utf-8') as f:
+                f.write(to_prometheus())
+            print(f"[INFO] Metrics written to: {output_dir}")
@@ -0,0 +1,63 @@
+import os
+from datetime import datetime
+
+import selection
+
+# Rank of a statement when a period has both: consolidated first, then files without a JSON record, then standalone
+STATEMENT_RANK = {True: 2, None: 1, False: 0}
+
+def get_filed_from_filename(source_file):
+    """Filing time from the DDMonYYYY_HHMM prefix downloader.py gives every file, or datetime.min"""
+    try:
+        return datetime.strptime(source_file[:14], '%d%b%Y_%H%M')
+    except ValueError:
+        return datetime.min
+
+class PeriodIndex:
+    """A symbol's extracted rows keyed by (period end, consolidated); the latest filing of each key wins"""
+
+    def __init__(self, records=None):
+        # File name without extension -> NSE record, for the consolidated flag and the filing order
+        self.records = records or {}
+        self.entries = {}
+        self.superseded = []
+
+    def get_filing(self, source_file):
+        """(consolidated or None if unknown, revision order) of a source file"""
+        record = self.records.get(os.path.splitext(source_file)[0])
+        if record is None:
+            return None, (get_filed_from_filename(source_file), 0, source_file)
+        consolidated = (record.get('consolidated') or '').strip() == 'Consolidated'
+        # The file name breaks ties, so the winner never depends on the order files are added in
+        return consolidated, selection.get_revision_order(record) + (source_file,)
+
+    def add(self, source_file, row):
+        """Index one file's row; returns False when an already indexed filing of the same key supersedes it"""
+        consolidated, order = self.get_filing(source_file)
+        key = (row['reporting_date'], consolidated)
+        current = self.entries.get(key)
+        if current is not None and current[0] > order:
+            self.superseded.append((source_file, key))
+            return False
+        if current is not None:
+            self.superseded.append((current[1], key))
+        self.entries[key] = (order, source_file, dict(row, source_file=source_file))
+        return True
+
+    def rows(self):
+        """One row per period end, preferring the consolidated statement, in a stable order"""
+        chosen = {}
+        for (reporting_date, consolidated), (_, _, row) in self.entries.items():
+            rank = STATEMENT_RANK[consolidated]
+            if reporting_date not in chosen or rank > chosen[reporting_date][0]:
+                chosen[reporting_date] = (rank, row)
+        return [chosen[reporting_date][1] for reporting_date in sorted(chosen)]
+
+    def get_superseded(self):
+        """(file, file chosen for its period instead) for every extracted file left out of rows()"""
+        chosen = {row['reporting_date']: row['source_file'] for row in self.rows()}
+        superseded = [(source_file, chosen[key[0]]) for source_file, key in self.superseded]
+        superseded += [(source_file, chosen[reporting_date])
+                       for (reporting_date, _), (_, source_file, _) in self.entries.items()
+                       if chosen[reporting_date] != source_file]
+        return sorted(superseded)
@@ -0,0 +1,442 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import blobstore
+import converter
+import downloader
+import extractor
+import fetcher
+import http_cache
+import metrics
+import selection
+import storage
+from extraction_cache import ExtractionCache
+from http_client import get_session
+from period_index import PeriodIndex
+from ratelimit import TokenBucket
+
+# Items waiting in front of each stage: a slow stage stalls the ones before it instead of
+# letting them buffer the whole universe
+QUEUE_SIZE = 64
+
+# Inbox marker telling a worker that no more items will come
+_DONE = object()
+
+class Stage:
+    """Worker threads serving a bounded inbox; handle(item, emit) passes results on with emit"""
+
+    def __init__(self, name, handle, workers=1, queue_size=QUEUE_SIZE, on_error=None):
+        self.name = name
+        self.handle = handle
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.on_error = on_error
+        self.downstream = None
+        self.threads = []
+        self.running = 0
+        self.processed = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.lock = threading.Lock()
+
+    def emit(self, item):
+        """Queue an item for the next stage, blocking while its inbox is full"""
+        started = time.perf_counter()
+        self.downstream.put(item)
+        # Time spent waiting on a full downstream queue is backpressure, not work
+        blocked = time.perf_counter() - started
+        if blocked > 0.001:
+            metrics.inc('stage_blocked_seconds_total', blocked, stage=self.name)
+
+    def put(self, item):
+        """Queue an item for this stage, blocking while the inbox is full"""
+        self.inbox.put(item)
+
+    def start(self):
+        """Start the worker threads"""
+        self.running = self.workers
+        self.threads = [
+            threading.Thread(target=self.work, name=f"{self.name}-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def close(self):
+        """No more input: workers stop once the inbox is drained, then the next stage is closed"""
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+    def join(self):
+        """Wait for every worker to finish"""
+        for thread in self.threads:
+            thread.join()
+
+    def work(self):
+        """Worker loop: handle items until the stop marker, timing each one"""
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+
+            # How far behind this stage runs: items still waiting, plus the one just taken
+            depth = self.inbox.qsize() + 1
+            started = time.perf_counter()
+            try:
+                self.handle(item, self.emit)
+            except Exception as e:
+                print(f"[ERROR] {self.name} stage failed: {e}")
+                if self.on_error:
+                    self.on_error(item, self.emit)
+            elapsed = time.perf_counter() - started
+            metrics.observe('stage_item_seconds', elapsed, stage=self.name)
+            with self.lock:
+                self.processed += 1
+                self.busy += elapsed
+                self.max_depth = max(self.max_depth, depth)
+
+        # The last worker out closes the next stage, so shutdown flows down the chain
+        with self.lock:
+            self.running -= 1
+            last = not self.running
+        if last and self.downstream is not None:
+            self.downstream.close()
+
+class SymbolTracker:
+    """Counts each symbol's filings still in flight and hands the symbol on once all of them are through"""
+
+    def __init__(self, on_complete):
+        self.on_complete = on_complete
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def expect(self, symbol, count):
+        """Register a symbol's filings; must be called before the first of them is emitted"""
+        if not count:
+            self.on_complete(symbol)
+            return
+        with self.lock:
+            self.pending[symbol] = count
+
+    def file_done(self, symbol):
+        """Count one of a symbol's filings as through; the last one completes the symbol"""
+        with self.lock:
+            self.pending[symbol] -= 1
+            complete = not self.pending[symbol]
+            if complete:
+                del self.pending[symbol]
+        if complete:
+            self.on_complete(symbol)
+
+class Pipeline:
+    """fetch -> download -> convert -> extract -> CSV as one streaming DAG with bounded queues between stages.
+
+    A symbol's XBRL links are queued as soon as its JSON is in, each file moves on as soon
+    as it is downloaded, and the symbol's CSV is written when its last file is extracted.
+    """
+
+    def __init__(self, symbols, source='xlsx', json_dir=None, data_dir=None, refresh=False, url=fetcher.NSE_API_URL,
+                 local=False, converter_url=converter.EC2_URL, fetch_workers=1, rate=0.5, burst=1,
+                 download_workers=8, per_host=4, download_rate=2.0, download_burst=4, convert_workers=1,
+                 extract_workers=1, queue_size=QUEUE_SIZE, cache=None, select=None):
+        self.symbols = list(symbols)
+        self.source = source
+        self.json_dir = json_dir or fetcher.create_json_folder()
+        os.makedirs(self.json_dir, exist_ok=True)
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'DATA')
+        self.refresh = refresh
+        self.url = url
+        self.local = local
+        self.converter_url = converter_url
+        self.cache = cache
+        self.select = select
+        self.selected_names = {}
+        self.filtered_count = 0
+        self.cache_lock = threading.Lock()
+        self.extracted = {}
+        self.fetch_bucket = TokenBucket(rate, burst)
+        self.host_limits = downloader.HostLimits(per_host, download_rate, download_burst)
+        self.url_index = blobstore.load_url_index()
+        self.index_lock = threading.Lock()
+        self.extract_pool = ProcessPoolExecutor(extract_workers) if extract_workers > 1 else None
+        self.client = None if local or source != 'xlsx' else converter.get_converter_client(converter_url, convert_workers)
+        self.failed = {'fetch': [], 'download': [], 'convert': [], 'extract': []}
+        self.csv_written = []
+        self.csv_latencies = []
+        self.started = None
+        self.first_csv = None
+
+        self.stages = [
+            Stage('fetch', self.fetch, fetch_workers, queue_size, on_error=self.fetch_failed),
+            Stage('download', self.download, download_workers, queue_size, on_error=self.file_failed('download')),
+        ]
+        if source == 'xlsx':
+            self.stages.append(Stage('convert', self.convert, convert_workers, queue_size,
+                                     on_error=self.file_failed('convert')))
+        self.stages += [
+            Stage('extract', self.extract, extract_workers, queue_size, on_error=self.file_failed('extract')),
+            Stage('csv', self.write_csv, 1, queue_size)
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.downstream = next_stage
+
+        # Symbols leave the file stages through the tracker, straight into the CSV stage
+        self.tracker = SymbolTracker(self.stages[-1].put)
+
+    def get_dir(self, symbol, folder):
+        """DATA/{symbol}/{folder} under the data directory, created if needed"""
+        path = os.path.join(self.data_dir, symbol.lower(), folder)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def load_records(self, symbol):
+        """Stored NSE records of a symbol, fetched and saved first when missing or refresh is set"""
+        if not self.refresh and os.path.exists(fetcher.get_json_filepath(symbol, self.json_dir)):
+            return fetcher.load_stored_records(symbol, self.json_dir)
+
+        self.fetch_bucket.acquire()
+        data, validators = fetcher.fetch_symbol_data(symbol, self.url, self.json_dir)
+        if data is http_cache.NOT_MODIFIED:
+            return fetcher.load_stored_records(symbol, self.json_dir)
+        if not data or not fetcher.save_json_data(symbol, data, self.json_dir):
+            return None
+        http_cache.record(validators)
+        return data
+
+    def fetch(self, symbol, emit):
+        """Turn a symbol into one job per filing with an XBRL link"""
+        records = self.load_records(symbol)
+        if records is None:
+            self.failed['fetch'].append(symbol)
+            records = []
+
+        # Filings outside --select are dropped here, before any download, conversion or extraction
+        records, filtered = selection.select_records(records if isinstance(records, list) else [], self.select)
+        if self.select:
+            metrics.inc('filings_filtered_total', filtered, stage='fetch')
+            with self.index_lock:
+                self.filtered_count += filtered
+
+        xbrl_dir = self.get_dir(symbol, 'XBRL')
+        jobs = {}
+        for record in records:
+            filename = downloader.build_xbrl_filename(record)
+            if filename and filename not in jobs:
+                jobs[filename] = {
+                    'symbol': symbol,
+                    'url': record['xbrl'].strip(),
+                    'xbrl_path': os.path.join(xbrl_dir, filename),
+                    'ok': True
+                }
+        if self.select:
+            # The CSV stage reads files from disk; older unselected files there stay out of it
+            self.selected_names[symbol] = {os.path.splitext(filename)[0] for filename in jobs}
+
+        # Files already on disk pass through the stages too, so the CSV covers every filing
+        self.tracker.expect(symbol, len(jobs))
+        for job in jobs.values():
+            emit(job)
+
+    def fetch_failed(self, symbol, emit):
+        """Error handler for the fetch stage: the symbol completes with no filings"""
+        self.failed['fetch'].append(symbol)
+        self.tracker.expect(symbol, 0)
+
+    def file_failed(self, stage):
+        """Error handler for a file stage: the job is marked failed and still passed on"""
+        def on_error(job, emit):
+            """Mark the job failed, then hand it on (or count it done after extraction)"""
+            job['ok'] = False
+            self.failed[stage].append(job['xbrl_path'])
+            if stage == 'extract':
+                self.tracker.file_done(job['symbol'])
+            else:
+                emit(job)
+        return on_error
+
+    def download(self, job, emit):
+        """Link or download a job's XBRL file unless it is already on disk"""
+        xbrl_path, url = job['xbrl_path'], job['url']
+        if not os.path.exists(xbrl_path):
+            with self.index_lock:
+                content_hash = downloader.link_known_url(url, xbrl_path, self.url_index)
+            if not content_hash:
+                content_hash = downloader.download_with_limits(url, xbrl_path, get_session(url), self.host_limits)
+                if content_hash:
+                    with self.index_lock:
+                        self.url_index[url] = content_hash
+                else:
+                    job['ok'] = False
+                    self.failed['download'].append(xbrl_path)
+        emit(job)
+
+    def convert(self, job, emit):
+        """Convert a job's XBRL to XLSX unless the workbook exists, reusing one of identical content"""
+        xbrl_path = job['xbrl_path']
+        xbrl_file = os.path.basename(xbrl_path)
+        xlsx_dir = self.get_dir(job['symbol'], 'XLSX')
+        excel_filepath = os.path.join(xlsx_dir, xbrl_file.replace('.xml', '.xlsx'))
+
+        if job['ok'] and not os.path.exists(excel_filepath):
+            # Identical XBRL content (a re-filed duplicate) reuses the workbook already converted
+            xbrl_hash = blobstore.hash_file(xbrl_path)
+            if blobstore.link_existing(xbrl_hash, '.xlsx', excel_filepath):
+                ok = True
+            elif self.local:
+                ok = converter.convert_and_save_locally(xbrl_path, xlsx_dir, xbrl_file, xbrl_hash)
+            else:
+                ok = bool(self.client.convert_to_file(xbrl_path, excel_filepath, xbrl_hash))
+            if not ok:
+                job['ok'] = False
+                self.failed['convert'].append(xbrl_path)
+
+        job['source_path'] = excel_filepath
+        emit(job)
+
+    def extract_fields(self, source_path):
+        """Extracted fields of one file through the cache; the parse itself runs outside the lock"""
+        fields = None
+        if self.cache is not None:
+            with self.cache_lock:
+                fields = self.cache.get(source_path)
+        if fields is None:
+            if self.extract_pool is not None:
+                fields, elapsed = self.extract_pool.submit(extractor.extract_file_timed, self.source, source_path).result()
+            else:
+                fields, elapsed = extractor.extract_file_timed(self.source, source_path)
+            metrics.observe('parse_seconds', elapsed, source=self.source)
+            if self.cache is not None:
+                with self.cache_lock:
+                    self.cache.put(source_path, fields)
+        return fields
+
+    def extract(self, job, emit):
+        """Extract a job's fields for its symbol's CSV and count the file done"""
+        source_path = job.get('source_path', job['xbrl_path'])
+        if job['ok']:
+            fields = self.extract_fields(source_path)
+            with self.cache_lock:
+                self.extracted[source_path] = fields
+        self.tracker.file_done(job['symbol'])
+
+    def write_csv(self, symbol, emit):
+        """Build a finished symbol's CSV from every file on disk, like extractor.py does"""
+        folder, extension, _ = extractor.EXTRACTION_SOURCES[self.source]
+        source_dir = self.get_dir(symbol, folder)
+        source_files = extractor.get_source_files(source_dir, extension)
+        if symbol in self.selected_names:
+            source_files = [f for f in source_files if os.path.splitext(f)[0] in self.selected_names[symbol]]
+
+        index = PeriodIndex(selection.load_filing_records(symbol, self.json_dir))
+        statuses = []
+        for source_file in source_files:
+            # Files extracted on the way through are handed over; others (e.g. failed downloads
+            # that exist from an earlier run) are extracted here
+            source_path = os.path.join(source_dir, source_file)
+            with self.cache_lock:
+                fields = self.extracted.pop(source_path, None)
+            if fields is None:
+                fields = self.extract_fields(source_path)
+            statuses.append(extractor.add_extracted_fields(index, symbol, source_file, fields))
+        extractor.print_extraction_summary(symbol, statuses, index)
+        extractor.save_to_csv(symbol, index.rows(), self.get_dir(symbol, 'CSV'))
+
+        latency = time.monotonic() - self.started
+        if self.first_csv is None:
+            self.first_csv = latency
+            print(f"[INFO] First CSV ready after {self.first_csv:.1f}s")
+        self.csv_written.append(symbol)
+        self.csv_latencies.append(latency)
+
+    def run(self):
+        """Push every symbol through the DAG and wait until the last CSV is written"""
+        self.started = time.monotonic()
+        for stage in self.stages:
+            stage.start()
+
+        for symbol in self.symbols:
+            self.stages[0].put(symbol)
+        self.stages[0].close()
+
+        for stage in self.stages:
+            stage.join()
+        elapsed = time.monotonic() - self.started
+
+        if self.extract_pool is not None:
+            self.extract_pool.shutdown()
+        blobstore.save_url_index(self.url_index)
+        http_cache.save()
+        if self.cache is not None:
+            self.cache.save()
+        self.print_summary(elapsed)
+
+    def print_summary(self, elapsed):
+        """Print the end-of-run summary and record each stage's peak queue depth"""
+        print(f"\nPipeline Summary:")
+        print(f"[OK] CSV files written: {len(self.csv_written)} of {len(self.symbols)} symbols")
+        if self.select:
+            print(f"[SKIP] Filtered out by --select ({selection.describe_selection(self.select)}): "
+                  f"{self.filtered_count} filings")
+        for stage in self.stages:
+            print(f"[INFO] {stage.name:>8}: {stage.processed} items, {stage.busy:.1f}s busy across {stage.workers} workers, "
+                  f"queue depth up to {stage.max_depth}")
+            metrics.set_gauge('stage_max_queue_depth', stage.max_depth, stage=stage.name)
+        for stage, failures in self.failed.items():
+            if failures:
+                print(f"[FAIL] {stage}: {len(failures)} failed")
+        if self.first_csv is not None:
+            print(f"[INFO] First CSV after {self.first_csv:.1f}s, all done after {elapsed:.1f}s")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Fetch, download, convert and extract every symbol in one streaming run")
+    parser.add_argument('symbols', nargs='*', help="Symbols to process (default: symbols.txt)")
+    parser.add_argument('--source', choices=sorted(extractor.EXTRACTION_SOURCES), default='xlsx',
+                        help="xlsx: convert then extract (default); xbrl: extract straight from XBRL, no conversion")
+    parser.add_argument('--refresh', action='store_true', help="Fetch JSON from NSE even when JSON/{symbol}.json exists")
+    parser.add_argument('--local', action='store_true', help="Convert in-process instead of uploading")
+    parser.add_argument('--url', default=converter.EC2_URL, help="Converter URL (default: the EC2 service)")
+    parser.add_argument('--fetch-workers', type=int, default=1, help="Concurrent NSE API requests")
+    parser.add_argument('--rate', type=float, default=0.5, help="NSE API requests per second")
+    parser.add_argument('--burst', type=int, default=1, help="NSE API requests allowed back-to-back")
+    parser.add_argument('--download-workers', type=int, default=8, help="Download workers")
+    parser.add_argument('--per-host', type=int, default=4, help="Max concurrent downloads per host")
+    parser.add_argument('--download-rate', type=float, default=2.0, help="Downloads per second per host")
+    parser.add_argument('--convert-workers', type=int, default=1, help="Uploads in flight to the converter")
+    parser.add_argument('--extract-workers', type=int, default=1, help="Extraction worker processes")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="Items buffered in front of each stage")
+    parser.add_argument('--no-cache', action='store_true', help="Re-parse every file instead of reusing cached fields")
+    selection.add_arguments(parser)
+    storage.add_arguments(parser)
+    http_cache.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    """Run the streaming pipeline for the given symbols (default: symbols.txt)"""
+    args = parse_args()
+    storage.set_compression(args.compress)
+    http_cache.configure(args)
+    symbols = args.symbols or fetcher.read_symbols_from_file()
+    if not symbols:
+        print("No symbols found. Exiting.")
+        return
+
+    print("NSE Corporate Filings - Streaming Pipeline")
+    print("=" * 60)
+    pipeline = Pipeline(
+        symbols, args.source, refresh=args.refresh, local=args.local, converter_url=args.url,
+        fetch_workers=args.fetch_workers, rate=args.rate, burst=args.burst, download_workers=args.download_workers,
+        per_host=args.per_host, download_rate=args.download_rate, convert_workers=args.convert_workers,
+        extract_workers=args.extract_workers, queue_size=args.queue_size,
+        cache=None if args.no_cache else ExtractionCache(), select=args.select
+    )
+    with metrics.collect('pipeline', args.metrics, args.profile):
+        pipeline.run()
+
+if __name__ == "__main__":
+    main()
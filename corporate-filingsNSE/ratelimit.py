@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import time
+
+import metrics
+
+class TokenBucket:
+    """Token bucket rate limiter shared by every request that counts against one limit"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # Tokens may go negative: each caller reserves its own slot, so waiters are served in order
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block the current thread until a token is available"""
+        wait = self.reserve()
+        metrics.sleep(wait, 'rate_limit')
+        return wait
+
+    async def acquire_async(self):
+        """Suspend the current task until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            metrics.inc('sleep_seconds_total', wait, reason='rate_limit')
+            await asyncio.sleep(wait)
+        return wait
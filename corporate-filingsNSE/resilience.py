@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import metrics
+from http_client import get_host_key
+
+# (connect, read) timeouts in seconds: no request may hang on a dead socket
+DEFAULT_TIMEOUT = (10, 30)
+
+# Throttling (429, and 403 from NSE's bot protection) and transient server errors
+RETRY_STATUSES = frozenset({403, 429, 500, 502, 503, 504})
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the host's circuit is open"""
+
+class CircuitBreaker:
+    """Stops requests to a host after consecutive failures; after a cool-down one probe decides whether to resume"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now; while half-open only a single probe is let through"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    def retry_in(self):
+        """Seconds until a request may be allowed again"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            if self.probing:
+                return 1.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self):
+        """A request got through: close the circuit and forget past failures"""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        """Count a failed request, opening the circuit at the threshold or when a probe fails"""
+        with self.lock:
+            self.failures += 1
+            # A failed probe re-opens the circuit for another cool-down
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    print(f"[INFO] Circuit opened after {self.failures} consecutive failures; "
+                          f"pausing for {self.reset_timeout:g}s")
+                self.opened_at = self.clock()
+                self.probing = False
+
+# One breaker per scheme+host, shared by every stage and thread
+_breakers = {}
+_lock = threading.Lock()
+
+def get_breaker(url):
+    """The circuit breaker of a URL's host"""
+    key = get_host_key(url)
+    with _lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[key] = breaker
+        return breaker
+
+def reset_breakers():
+    """Forget every host's failure history"""
+    with _lock:
+        _breakers.clear()
+
+def get_retry_after(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """Exponential backoff with jitter: half the capped delay fixed, half random, so workers spread out"""
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def call_with_retry(send, url, retries=3, base_delay=1.0, max_delay=60.0, retry_statuses=RETRY_STATUSES,
+                    on_retry=None):
+    """Run send() -> response through the host's circuit breaker, backing off between failed attempts.
+
+    Connection errors, timeouts and retry_statuses are retried up to `retries` times,
+    honouring Retry-After. The last response is returned as is (callers still call
+    raise_for_status); the last exception is raised. on_retry(response, error) runs
+    before each new attempt, e.g. to refresh cookies after a 403.
+    """
+    breaker = get_breaker(url)
+    host = get_host_key(url)
+
+    for attempt in range(retries + 1):
+        response = None
+        if not breaker.allow():
+            error = CircuitOpenError(f"Circuit open for {host}")
+            delay = min(max_delay, breaker.retry_in())
+        else:
+            started = time.perf_counter()
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.observe('http_request_seconds', time.perf_counter() - started, host=host, status='error')
+                breaker.record_failure()
+                error = e
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            else:
+                # Time to the response headers; streamed bodies are timed by their callers
+                metrics.observe('http_request_seconds', time.perf_counter() - started, host=host,
+                                status=response.status_code)
+                if response.status_code not in retry_statuses:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                error = None
+                retry_after = get_retry_after(response)
+                delay = min(max_delay, retry_after) if retry_after is not None else backoff_delay(attempt, base_delay, max_delay)
+
+        if attempt == retries:
+            break
+
+        reason = f"HTTP {response.status_code}" if response is not None else str(error)
+        print(f"[RETRY] {url}: {reason}; retry {attempt + 1}/{retries} in {delay:.1f}s")
+        metrics.inc('http_retries_total', host=host,
+                    reason=response.status_code if response is not None else type(error).__name__)
+        if response is not None:
+            response.close()
+        if on_retry:
+            on_retry(response, error)
+        metrics.sleep(delay, 'backoff')
+
+    if response is not None:
+        return response
+    raise error
+
+def request_with_retry(session, method, url, timeout=DEFAULT_TIMEOUT, retries=3, retry_statuses=RETRY_STATUSES,
+                       on_retry=None, **kwargs):
+    """session.request with a timeout, retries and the host's circuit breaker"""
+    return call_with_retry(lambda: session.request(method, url, timeout=timeout, **kwargs), url,
+                           retries=retries, retry_statuses=retry_statuses, on_retry=on_retry)
+
+def wait_for_circuits(max_wait=60.0):
+    """Sleep until every open circuit allows a probe again (at most max_wait seconds)"""
+    with _lock:
+        breakers = list(_breakers.values())
+    wait = min(max_wait, max((breaker.retry_in() for breaker in breakers), default=0.0))
+    if wait > 0:
+        print(f"[INFO] Waiting {wait:.0f}s for throttled hosts before retrying")
+        metrics.sleep(wait, 'circuit_open')
+
+def retry_failed(items, retry, label, passes=2):
+    """Give items that failed during a run more passes at its end; returns the ones that still fail.
+
+    retry(item) returns True once the item succeeded. Each pass starts after open
+    circuits have cooled down, so hosts that throttled the run get a fresh chance.
+    """
+    items = list(items)
+    for number in range(1, passes + 1):
+        if not items:
+            break
+        wait_for_circuits()
+        print(f"\n[RETRY] Pass {number}/{passes}: {len(items)} failed {label}")
+        items = [item for item in items if not retry(item)]
+
+    if items:
+        print(f"[FAIL] Still failing after {passes} retry passes: {len(items)} {label}")
+    return items
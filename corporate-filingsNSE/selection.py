@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
+import downloader
+import metrics
+import storage
+
+# Filters understood by --select, given as comma-separated key=value pairs (latest takes no value):
+#   consolidated, audited, indas = only | exclude
+#   period = Quarterly | Half-Yearly | Annual | ...
+#   from = YYYY-MM-DD    period starts on or after the date (fromDate)
+#   to = YYYY-MM-DD      period ends on or before the date (toDate)
+#   latest               only the last filing of each period, standalone and consolidated apart
+FLAG_FILTERS = {
+    'consolidated': lambda record: (record.get('consolidated') or '').strip() == 'Consolidated',
+    'audited': lambda record: (record.get('audited') or '').strip() == 'Audited',
+    # Ind-AS, Ind-AS New and NBFC-IND are all Ind AS; only Non-Ind-AS filings are not
+    'indas': lambda record: not (record.get('indAs') or 'Non-').strip().startswith('Non-')
+}
+DATE_FILTERS = {'from', 'to'}
+# NSE writes dates as 31-Dec-2024 and timestamps with or without seconds
+NSE_DATE_FORMATS = ('%d-%b-%Y %H:%M:%S', '%d-%b-%Y %H:%M', '%d-%b-%Y')
+
+def parse_selection(spec):
+    """Parse a --select spec such as 'consolidated=only,from=2020-04-01,latest' into a selection dict"""
+    selection = {}
+    for part in (spec or '').split(','):
+        key, _, value = (item.strip() for item in part.partition('='))
+        key = key.lower()
+        if not key:
+            continue
+        if key in FLAG_FILTERS and value.lower() in ('only', 'exclude'):
+            selection[key] = value.lower()
+        elif key in DATE_FILTERS:
+            try:
+                selection[key] = datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"{key} needs a YYYY-MM-DD date, got '{value}'")
+        elif key == 'period' and value:
+            selection[key] = value.lower()
+        elif key == 'latest' and not value:
+            selection[key] = True
+        else:
+            raise argparse.ArgumentTypeError(f"unknown filter '{part.strip()}'")
+    return selection
+
+def describe_selection(selection):
+    """The selection back in --select syntax, for log lines"""
+    parts = []
+    for key, value in selection.items():
+        if value is True:
+            parts.append(key)
+        elif isinstance(value, datetime):
+            parts.append(f"{key}={value:%Y-%m-%d}")
+        else:
+            parts.append(f"{key}={value}")
+    return ','.join(parts)
+
+def parse_nse_date(value):
+    """Parse an NSE date or timestamp such as '31-Dec-2024' or '31-Jan-2025 18:45:17' to a datetime, or None"""
+    for date_format in NSE_DATE_FORMATS:
+        try:
+            return datetime.strptime((value or '').strip(), date_format)
+        except ValueError:
+            continue
+    return None
+
+def matches(record, selection):
+    """Whether one NSE filing record passes every filter except latest"""
+    for key, keep in selection.items():
+        if key in FLAG_FILTERS and FLAG_FILTERS[key](record) != (keep == 'only'):
+            return False
+        if key == 'period' and (record.get('period') or '').strip().lower() != keep:
+            return False
+        if key == 'from':
+            from_date = parse_nse_date(record.get('fromDate'))
+            if from_date is None or from_date < keep:
+                return False
+        if key == 'to':
+            to_date = parse_nse_date(record.get('toDate'))
+            if to_date is None or to_date > keep:
+                return False
+    return True
+
+def get_revision_order(record):
+    """Sort key putting the latest filing of a period last: filing time, then NSE sequence number"""
+    filed = parse_nse_date(record.get('filingDate')) or datetime.min
+    seq_number = str(record.get('seqNumber') or '')
+    return filed, int(seq_number) if seq_number.isdigit() else 0
+
+def select_records(records, selection):
+    """Records passing the selection, in their original order, and how many were dropped"""
+    if not selection:
+        return list(records), 0
+
+    selected = [record for record in records if matches(record, selection)]
+    if selection.get('latest'):
+        latest = {}
+        for record in selected:
+            period = (record.get('fromDate'), record.get('toDate'), record.get('consolidated'))
+            if period not in latest or get_revision_order(record) >= get_revision_order(latest[period]):
+                latest[period] = record
+        kept = {id(record) for record in latest.values()}
+        selected = [record for record in selected if id(record) in kept]
+    return selected, len(records) - len(selected)
+
+def load_records(symbol, json_dir=None):
+    """The symbol's stored NSE records, or None when it has no JSON"""
+    json_dir = json_dir or os.path.join(os.path.dirname(__file__), 'JSON')
+    json_path = os.path.join(json_dir, f'{symbol.lower()}.json')
+    if not os.path.exists(json_path):
+        return None
+
+    with storage.open_text(json_path) as f:
+        records = json.load(f)
+    return records if isinstance(records, list) else []
+
+def load_filing_records(symbol, json_dir=None):
+    """File name (without extension) -> NSE record for each of the symbol's filings with an XBRL file.
+
+    NSE can list one document more than once; the file then takes the record that is its latest
+    revision by get_revision_order, the same rule PeriodIndex applies across files.
+    """
+    records = {}
+    for record in load_records(symbol, json_dir) or []:
+        filename = downloader.build_xbrl_filename(record)
+        if not filename:
+            continue
+        name = os.path.splitext(filename)[0]
+        if name not in records or get_revision_order(record) >= get_revision_order(records[name]):
+            records[name] = record
+    return records
+
+def load_selected_names(symbol, selection, json_dir=None):
+    """File names (without extension) of the symbol's filings that pass the selection, or None for all"""
+    if not selection:
+        return None
+
+    records = load_records(symbol, json_dir)
+    if records is None:
+        print(f"[INFO] No JSON records for {symbol}; --select cannot be applied, keeping every file")
+        return None
+
+    selected, _ = select_records(records, selection)
+    return {
+        os.path.splitext(filename)[0]
+        for filename in map(downloader.build_xbrl_filename, selected) if filename
+    }
+
+def filter_files(items, selected_names, stage, get_path=lambda item: item):
+    """Keep the files whose filing was selected; returns (kept, number dropped), counted per stage"""
+    if selected_names is None:
+        return list(items), 0
+
+    kept = [item for item in items if os.path.splitext(os.path.basename(get_path(item)))[0] in selected_names]
+    dropped = len(items) - len(kept)
+    if dropped:
+        metrics.inc('filings_filtered_total', dropped, stage=stage)
+    return kept, dropped
+
+def add_arguments(parser):
+    """The --select option shared by the downloader, converter, extractor and pipeline"""
+    parser.add_argument('--select', type=parse_selection, default={}, metavar='FILTERS',
+                        help="Only process matching filings, e.g. 'consolidated=only,indas=only,from=2020-04-01,latest' "
+                             "(keys: consolidated/audited/indas=only|exclude, period=NAME, from/to=YYYY-MM-DD, latest)")
@@ -0,0 +1,32 @@
+import json
+import os
+
+def get_state_dir(state_dir=None):
+    """Return (and create) the directory holding pipeline state files"""
+    if state_dir is None:
+        state_dir = os.path.join(os.path.dirname(__file__), 'STATE')
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+def load_state(name, state_dir=None):
+    """Load a JSON state file, or an empty dict if it does not exist yet"""
+    filepath = os.path.join(get_state_dir(state_dir), f"{name}.json")
+
+    if not os.path.exists(filepath):
+        return {}
+
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[ERROR] Failed to read state file {filepath}: {e}")
+        return {}
+
+def save_state(name, data, state_dir=None):
+    """Write a JSON state file atomically so a crash never leaves it half written"""
+    filepath = os.path.join(get_state_dir(state_dir), f"{name}.json")
+    temp_filepath = f"{filepath}.tmp"
+
+    with open(temp_filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_filepath, filepath)
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import struct
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# JSON/ and XBRL files keep their names when compressed; readers tell the codec from the first bytes
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+CODECS = ('gzip', 'zstd')
+CHUNK_SIZE = 1024 * 1024
+
+# Codec for JSON and XBRL files written from now on; None writes them plain
+_compression = None
+
+def set_compression(codec):
+    """Compress JSON and XBRL files written from now on with codec ('gzip', 'zstd' or None for plain)"""
+    global _compression
+    if codec == 'zstd' and zstandard is None:
+        print("[INFO] zstandard not installed (pip install zstandard); compressing with gzip instead")
+        codec = 'gzip'
+    _compression = codec
+
+def get_compression():
+    """Codec new JSON and XBRL files are written with (None: plain)"""
+    return _compression
+
+def detect_codec(filepath):
+    """'gzip' or 'zstd' for a compressed file, None for a plain one"""
+    with open(filepath, 'rb') as f:
+        head = f.read(4)
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+def open_read(filepath):
+    """Open a file for binary reading, decompressing it on the fly if it is stored compressed"""
+    if hasattr(filepath, 'read'):
+        # Already open, e.g. an upload parsed from memory; left for the caller to close
+        return contextlib.nullcontext(filepath)
+    codec = detect_codec(filepath)
+    if codec == 'gzip':
+        return gzip.open(filepath, 'rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"{os.path.basename(filepath)} is zstd-compressed; pip install zstandard to read it")
+        return zstandard.ZstdDecompressor().stream_reader(open(filepath, 'rb'), closefd=True)
+    return open(filepath, 'rb')
+
+def open_text(filepath, encoding='utf-8'):
+    """open_read for text, e.g. JSON/{symbol}.json"""
+    return io.TextIOWrapper(open_read(filepath), encoding=encoding)
+
+def get_size(filepath):
+    """Size of a file's content once decompressed"""
+    codec = detect_codec(filepath)
+    if codec is None:
+        return os.path.getsize(filepath)
+    if codec == 'gzip':
+        # The last four bytes of a gzip file hold its size (modulo 4 GiB; filings are a few MB at most)
+        with open(filepath, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            return struct.unpack('<I', f.read(4))[0]
+    with open_read(filepath) as f:
+        return sum(len(chunk) for chunk in iter(lambda: f.read(CHUNK_SIZE), b''))
+
+def compress_chunks(chunks, codec=None):
+    """Chunks of the compressed stream (codec None passes them through)"""
+    if codec is None:
+        yield from chunks
+        return
+    if codec == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=9).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def write_bytes(filepath, data):
+    """Write a file atomically, compressed when a compression is set"""
+    temp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        for chunk in compress_chunks([data], _compression):
+            f.write(chunk)
+    os.replace(temp_path, filepath)
+
+def recode_file(filepath, target_path, codec):
+    """Write filepath's content to target_path with codec (None: plain), via a temporary file"""
+    temp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open_read(filepath) as source, open(temp_path, 'wb') as f:
+        for chunk in compress_chunks(iter(lambda: source.read(CHUNK_SIZE), b''), codec):
+            f.write(chunk)
+    os.replace(temp_path, target_path)
+
+def recode_tree(codec, base_dir=None, blob_dir=None):
+    """Compress (or, with codec None, decompress) every JSON and XBRL file in place; returns (files, before, after)"""
+    # Imported here: blobstore imports this module for its readers
+    import blobstore
+
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    json_dir = os.path.join(base_dir, 'JSON')
+    data_dir = os.path.join(base_dir, 'DATA')
+    paths = []
+    if os.path.exists(json_dir):
+        paths += [(os.path.join(json_dir, f), False) for f in sorted(os.listdir(json_dir)) if f.endswith('.json')]
+    if os.path.exists(data_dir):
+        for symbol in sorted(os.listdir(data_dir)):
+            xbrl_dir = os.path.join(data_dir, symbol, 'XBRL')
+            if os.path.isdir(xbrl_dir):
+                paths += [(os.path.join(xbrl_dir, f), True) for f in sorted(os.listdir(xbrl_dir)) if f.endswith('.xml')]
+
+    recoded = before = after = 0
+    for path, in_blob_store in paths:
+        before += os.path.getsize(path)
+        if detect_codec(path) != codec:
+            if in_blob_store:
+                # XBRL goes through the store under its plain-content hash, so duplicates keep sharing one blob
+                blob_path = blobstore.get_blob_path(blobstore.hash_file(path), '.xml', blob_dir)
+                if not os.path.exists(blob_path) or detect_codec(blob_path) != codec:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    recode_file(path, blob_path, codec)
+                blobstore.link_blob(blob_path, path)
+            else:
+                recode_file(path, path, codec)
+            recoded += 1
+        after += os.path.getsize(path)
+    return recoded, before, after
+
+def add_arguments(parser):
+    """The --compress option of the stages that write JSON or XBRL"""
+    parser.add_argument('--compress', choices=CODECS,
+                        help="Store new JSON and XBRL files compressed; every stage reads them transparently")
+
+def main():
+    """Compress or decompress JSON/ and DATA/*/XBRL in place"""
+    parser = argparse.ArgumentParser(description="Compress or decompress the JSON and XBRL files in place")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--compress', choices=CODECS, help="Codec to compress with (zstd needs zstandard)")
+    group.add_argument('--decompress', action='store_true', help="Write every file back as plain text")
+    args = parser.parse_args()
+
+    set_compression(args.compress)
+    started = time.perf_counter()
+    recoded, before, after = recode_tree(get_compression())
+    print(f"[OK] Rewrote {recoded} files in {time.perf_counter() - started:.1f}s: "
+          f"{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
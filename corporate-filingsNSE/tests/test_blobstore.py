@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+
+def test_identical_content_is_stored_once(tmp_path):
+    """Two filings with the same bytes share one blob"""
+    blob_dir = str(tmp_path / 'BLOBS')
+    first = tmp_path / 'acc' / 'XBRL' / '07Aug2018_1906_INDAS_37114_WEB.xml'
+    second = tmp_path / 'acc' / 'XBRL' / '07Aug2018_1910_INDAS_37114_WEB_2.xml'
+
+    first_hash = blobstore.save_and_link(b'<xbrl/>', str(first), '.xml', blob_dir)
+    second_hash = blobstore.save_and_link(b'<xbrl/>', str(second), '.xml', blob_dir)
+
+    assert first_hash == second_hash == blobstore.hash_bytes(b'<xbrl/>')
+    assert os.path.samefile(first, second)
+    assert os.listdir(os.path.join(blob_dir, first_hash[:2])) == [f'{first_hash}.xml']
+
+def test_adopt_file_replaces_duplicates_with_links(tmp_path):
+    """Existing DATA/ files move into the store without changing their contents"""
+    blob_dir = str(tmp_path / 'BLOBS')
+    first = tmp_path / 'first.xml'
+    second = tmp_path / 'second.xml'
+    first.write_bytes(b'<xbrl>same</xbrl>')
+    second.write_bytes(b'<xbrl>same</xbrl>')
+
+    digest = blobstore.adopt_file(str(first), '.xml', blob_dir)
+    assert blobstore.adopt_file(str(second), '.xml', blob_dir) == digest
+
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == b'<xbrl>same</xbrl>'
+    assert not blobstore.link_existing('0' * 64, '.xml', str(tmp_path / 'missing.xml'), blob_dir)
+
+def test_stream_is_hashed_and_renamed_into_place(tmp_path):
+    """Streamed chunks hash like the whole body, and a failed stream leaves no file behind"""
+    blob_dir = str(tmp_path / 'BLOBS')
+    target = tmp_path / 'acc' / 'XBRL' / 'filing.xml'
+
+    digest, size = blobstore.save_stream_and_link(iter([b'<xbrl>', b'</xbrl>']), str(target), '.xml', blob_dir)
+    assert (digest, size) == (blobstore.hash_bytes(b'<xbrl></xbrl>'), 13)
+    assert target.read_bytes() == b'<xbrl></xbrl>'
+
+    def broken_stream():
+        yield b'<xbrl>'
+        raise IOError("connection reset")
+
+    try:
+        blobstore.save_stream_and_link(broken_stream(), str(tmp_path / 'partial.xml'), '.xml', blob_dir)
+    except IOError:
+        pass
+    assert not (tmp_path / 'partial.xml').exists()
+    assert sorted(os.listdir(blob_dir)) == [digest[:2]]
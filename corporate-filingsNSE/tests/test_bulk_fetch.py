@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import fetcher
+import metrics
+import selection
+from state import load_state
+
+def make_record(symbol, seq, filing_date):
+    """Build a minimal NSE filing record"""
+    return {
+        "symbol": symbol,
+        "seqNumber": str(seq),
+        "filingDate": filing_date,
+        "xbrl": f"https://nsearchives.nseindia.com/corporate/xbrl/INDAS_{seq}.xml"
+    }
+
+class StubNSEHandler(BaseHTTPRequestHandler):
+    """Answer date-window and per-symbol queries from the published records"""
+    records = []
+    queries = []
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        StubNSEHandler.queries.append(query)
+        if 'symbol' in query:
+            matched = [record for record in StubNSEHandler.records if record['symbol'] == query['symbol']]
+        else:
+            start, end = (datetime.strptime(query[key], '%d-%m-%Y') for key in ('from_date', 'to_date'))
+            matched = [record for record in StubNSEHandler.records
+                       if start.date() <= selection.parse_nse_date(record['filingDate']).date() <= end.date()]
+        body = json.dumps(matched).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_bulk_fetch_fans_windows_out_per_symbol(tmp_path, monkeypatch):
+    """One request per window feeds every stored symbol; only symbols without history get their own request"""
+    monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: None)
+    monkeypatch.setattr(fetcher, 'BULK_PAGE_LIMIT', 4)
+    json_dir = tmp_path / "JSON"
+    state_dir = tmp_path / "STATE"
+    json_dir.mkdir()
+    state_dir.mkdir()
+    (json_dir / "acc.json").write_text(json.dumps([make_record('ACC', 1, "25-Jul-2024 16:00")]), encoding='utf-8')
+    (json_dir / "tcs.json").write_text(json.dumps([make_record('TCS', 2, "26-Jul-2024 16:00")]), encoding='utf-8')
+
+    StubNSEHandler.records = [
+        make_record('ACC', 10, "02-Jan-2025 10:00"),
+        make_record('TCS', 11, "03-Jan-2025 11:00"),
+        make_record('ACC', 12, "03-Jan-2025 12:00"),
+        make_record('OTHER', 13, "06-Jan-2025 13:00"),  # not in the universe
+        make_record('INFY', 14, "09-Jan-2025 09:00"),
+        make_record('INFY', 3, "20-Jul-2024 09:00"),    # INFY's older history, only a per-symbol query returns it
+    ]
+    StubNSEHandler.queries = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+
+    try:
+        fetcher.fetch_bulk(['ACC', 'TCS', 'INFY'], str(json_dir), url, since=date(2025, 1, 1), until=date(2025, 1, 14),
+                           state_dir=str(state_dir))
+
+        # Two 7-day windows, the first split in halves for reaching the page limit, plus INFY's gap
+        windows = [(query['from_date'], query['to_date']) for query in StubNSEHandler.queries if 'symbol' not in query]
+        assert windows == [('01-01-2025', '07-01-2025'), ('01-01-2025', '04-01-2025'),
+                           ('05-01-2025', '07-01-2025'), ('08-01-2025', '14-01-2025')]
+        assert [query['symbol'] for query in StubNSEHandler.queries if 'symbol' in query] == ['INFY']
+
+        def stored_seqs(symbol):
+            return [record['seqNumber'] for record in json.loads((json_dir / f"{symbol}.json").read_text('utf-8'))]
+
+        assert stored_seqs('acc') == ['12', '10', '1']
+        assert stored_seqs('tcs') == ['11', '2']
+        assert stored_seqs('infy') == ['14', '3']
+        assert not (json_dir / "other.json").exists()
+        assert load_state('bulk_fetch', str(state_dir)) == {'fetched_through': '2025-01-14'}
+
+        # The next run resumes from the last fetched day and finds nothing new
+        StubNSEHandler.queries = []
+        fetcher.fetch_bulk(['ACC', 'TCS', 'INFY'], str(json_dir), url, until=date(2025, 1, 14), state_dir=str(state_dir))
+        assert StubNSEHandler.queries == [{'index': 'equities', 'period': 'Quarterly',
+                                           'from_date': '14-01-2025', 'to_date': '14-01-2025'}]
+        assert stored_seqs('acc') == ['12', '10', '1']
+    finally:
+        server.shutdown()
@@ -0,0 +1,121 @@
+import io
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import converter
+import local_converter
+from extractor import choose_data_sheet
+from xlsx_reader import iter_sheet_columns
+
+XBRL_DIR = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc', 'XBRL')
+XBRL_FILES = sorted(os.path.join(XBRL_DIR, f) for f in os.listdir(XBRL_DIR) if f.endswith('.xml'))[:4]
+
+class RotatingTokenHandler(local_converter.ConverterRequestHandler):
+    """Converter page that answers 500 to a post carrying anything but the current ViewState"""
+    token = 'first'
+
+    def do_GET(self):
+        page = local_converter.FORM_PAGE.replace('id="__VIEWSTATE" value="local"', f'id="__VIEWSTATE" value="{self.token}"')
+        self.send_body(200, 'text/html; charset=utf-8', page.encode('utf-8'))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if f'name="__VIEWSTATE"\r\n\r\n{self.token}\r\n'.encode() not in body:
+            self.send_error_page(500, "Validation of viewstate MAC failed")
+            return
+        filename, data = local_converter.read_upload(self.headers.get('Content-Type', ''), body)
+        self.send_body(200, local_converter.XLSX_CONTENT_TYPE, local_converter.convert_file(os.path.join(XBRL_DIR, filename)))
+
+def start_server(handler=local_converter.ConverterRequestHandler):
+    """Converter service on a free localhost port; returns (server, url)"""
+    server = local_converter.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+def test_form_tokens_fetched_once():
+    """Uploads after the first reuse the cached ViewState instead of GETting the page again"""
+    server, url = start_server()
+    try:
+        client = converter.ConverterClient(url)
+        results = [client.convert(path) for path in XBRL_FILES]
+    finally:
+        stop_server(server)
+
+    assert all(result and result[:2] == b'PK' for result in results)
+    assert client.form_fetches == 1
+
+def test_rejected_tokens_are_refreshed():
+    """A post rejected with stale tokens is retried once with a freshly fetched page"""
+    server, url = start_server(RotatingTokenHandler)
+    try:
+        client = converter.ConverterClient(url)
+        assert client.convert(XBRL_FILES[0])
+        RotatingTokenHandler.token = 'second'
+        assert client.convert(XBRL_FILES[1])
+    finally:
+        RotatingTokenHandler.token = 'first'
+        stop_server(server)
+
+    assert client.form_fetches == 2
+
+def test_concurrent_uploads():
+    """convert_many returns every file with several sessions in flight"""
+    server, url = start_server()
+    try:
+        client = converter.ConverterClient(url, sessions=3)
+        results = dict(client.convert_many(XBRL_FILES, concurrency=3))
+    finally:
+        stop_server(server)
+
+    assert sorted(results) == XBRL_FILES
+    assert all(result for result in results.values())
+    assert client.form_fetches <= 3
+
+def test_shared_client_grows_in_place():
+    """Asking for more sessions adds slots to the cached client instead of replacing it"""
+    url = 'http://127.0.0.1:9/'
+    try:
+        client = converter.get_converter_client(url, 1)
+        slot = client.slots.get()  # an upload in flight
+        assert converter.get_converter_client(url, 3) is client
+        assert client.size == 3 and client.slots.qsize() == 2
+        client.slots.put(slot)
+        assert converter.get_converter_client(url, 2) is client and client.size == 3
+    finally:
+        converter._clients.pop(url, None)
+
+def test_workbook_streamed_into_blob_store(tmp_path, monkeypatch):
+    """convert_to_file links the workbook under the XBRL's hash without buffering it in memory"""
+    monkeypatch.setattr(converter.blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+    server, url = start_server()
+    try:
+        excel_filepath = str(tmp_path / 'XLSX' / 'filing.xlsx')
+        digest = converter.ConverterClient(url).convert_to_file(XBRL_FILES[0], excel_filepath)
+    finally:
+        stop_server(server)
+
+    assert digest == converter.blobstore.hash_file(XBRL_FILES[0])
+    # Compared by content: zip entry timestamps differ when the two conversions straddle a clock tick
+    expected = io.BytesIO(local_converter.convert_file(XBRL_FILES[0]))
+    columns = [1, 2, 3, 4, 5, 6]
+    assert list(iter_sheet_columns(excel_filepath, columns, choose_data_sheet)) == \
+        list(iter_sheet_columns(expected, columns, choose_data_sheet))
+    assert os.listdir(tmp_path / 'XLSX') == ['filing.xlsx']
+
+def test_multipart_body_streams_file():
+    """The streamed body parses back to the same form fields and file bytes"""
+    with converter.MultipartBody({'__VIEWSTATE': 'abc'}, 'FileUploadControl', XBRL_FILES[0]) as body:
+        data = b''.join(iter(lambda: body.read(1000), b''))
+        content_type = body.content_type
+        assert len(data) == len(body)
+
+    filename, upload = local_converter.read_upload(content_type, data)
+    assert filename == os.path.basename(XBRL_FILES[0])
+    assert upload == open(XBRL_FILES[0], 'rb').read()
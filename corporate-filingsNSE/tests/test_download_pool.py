@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+import downloader
+
+class StubArchiveHandler(BaseHTTPRequestHandler):
+    """Serve a small XBRL body for any path"""
+    requested = []
+
+    def do_GET(self):
+        StubArchiveHandler.requested.append(self.path)
+        if self.path.endswith('/blocked.xml'):
+            # What a bot-check or error page served with a 200 looks like
+            body, content_type = b'<!DOCTYPE html><html><body>Access Denied</body></html>', 'text/html'
+        else:
+            body, content_type = f'<?xml version="1.0"?><xbrl path="{self.path}"/>'.encode('utf-8'), 'application/xml'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_parallel_pool_keeps_layout(tmp_path, monkeypatch):
+    """All symbols share one queue and files land at DATA/{symbol}/XBRL/{date}_{name}.xml"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/corporate/xbrl"
+
+    records = {
+        'ACC': [
+            {'xbrl': f'{base_url}/INDAS_1_1.xml', 'filingDate': '31-Jan-2025 18:45'},
+            {'xbrl': f'{base_url}/INDAS_1_1.xml', 'filingDate': '31-Jan-2025 18:49'},
+            {'xbrl': f'{base_url}/-', 'filingDate': '30-Oct-2024 11:33'},
+        ],
+        'TCS': [
+            {'xbrl': f'{base_url}/INDAS_2_2.xml', 'filingDate': '10-Oct-2024 18:58'},
+        ],
+    }
+    (tmp_path / 'tcs' / 'XBRL').mkdir(parents=True)
+    (tmp_path / 'tcs' / 'XBRL' / '10Oct2024_1858_INDAS_2_2.xml').write_text('existing', encoding='utf-8')
+
+    def create_dirs(symbol):
+        xbrl_dir = tmp_path / symbol.lower() / 'XBRL'
+        xbrl_dir.mkdir(parents=True, exist_ok=True)
+        return str(xbrl_dir)
+
+    monkeypatch.setattr(downloader, 'get_available_symbols', lambda conn=None: sorted(records))
+    monkeypatch.setattr(downloader, 'load_symbol_records', lambda symbol: records[symbol])
+    monkeypatch.setattr(downloader, 'create_symbol_directories', create_dirs)
+    monkeypatch.setattr(blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+
+    try:
+        downloader.download_all_symbols_parallel(workers=4, per_host_concurrency=2, rate=0)
+    finally:
+        server.shutdown()
+
+    assert sorted(os.listdir(tmp_path / 'acc' / 'XBRL')) == ['31Jan2025_1845_INDAS_1_1.xml', '31Jan2025_1849_INDAS_1_1.xml']
+    assert 'INDAS_1_1.xml' in (tmp_path / 'acc' / 'XBRL' / '31Jan2025_1845_INDAS_1_1.xml').read_text(encoding='utf-8')
+    # The re-filed record shares the first download instead of fetching the URL again
+    assert StubArchiveHandler.requested.count('/corporate/xbrl/INDAS_1_1.xml') == 1
+    assert os.path.samefile(tmp_path / 'acc' / 'XBRL' / '31Jan2025_1845_INDAS_1_1.xml',
+                            tmp_path / 'acc' / 'XBRL' / '31Jan2025_1849_INDAS_1_1.xml')
+    assert (tmp_path / 'tcs' / 'XBRL' / '10Oct2024_1858_INDAS_2_2.xml').read_text(encoding='utf-8') == 'existing'
+
+def test_html_page_is_not_saved(tmp_path, monkeypatch):
+    """A page that is not XML is rejected on its first chunk and nothing appears in DATA/"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+
+    try:
+        filepath = tmp_path / 'acc' / 'XBRL' / 'blocked.xml'
+        assert downloader.download_xbrl_file(f"http://127.0.0.1:{server.server_port}/blocked.xml", str(filepath)) is False
+    finally:
+        server.shutdown()
+
+    assert not filepath.exists()
+    assert not (tmp_path / 'BLOBS').exists() or not os.listdir(tmp_path / 'BLOBS')
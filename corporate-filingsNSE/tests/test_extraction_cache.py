@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extraction_cache
+from extraction_cache import ExtractionCache
+
+FIELDS = ('31Dec2024', '100.0', '1.5')
+
+def test_reuse_until_content_changes(tmp_path):
+    """Touching a file keeps its entry; changing its bytes drops it"""
+    source = tmp_path / 'filing.xml'
+    source.write_text('<xbrl/>')
+    cache = ExtractionCache(str(tmp_path))
+    cache.put(str(source), FIELDS)
+    cache.save()
+
+    cache = ExtractionCache(str(tmp_path))
+    os.utime(source, ns=(0, 0))
+    assert cache.get(str(source)) == FIELDS
+
+    source.write_text('<xbrl>changed</xbrl>')
+    assert cache.get(str(source)) is None
+
+def test_deleted_files_are_evicted(tmp_path):
+    """Entries of files that no longer exist are dropped on save"""
+    source = tmp_path / 'filing.xml'
+    source.write_text('<xbrl/>')
+    cache = ExtractionCache(str(tmp_path))
+    cache.put(str(source), FIELDS)
+    source.unlink()
+
+    cache.save()
+    assert ExtractionCache(str(tmp_path)).entries == {}
+
+def test_new_fingerprint_invalidates(tmp_path, monkeypatch):
+    """A new extractor version starts from an empty cache"""
+    source = tmp_path / 'filing.xml'
+    source.write_text('<xbrl/>')
+    cache = ExtractionCache(str(tmp_path))
+    cache.put(str(source), FIELDS)
+    cache.save()
+
+    monkeypatch.setattr(extraction_cache, 'EXTRACTOR_VERSION', extraction_cache.EXTRACTOR_VERSION + 1)
+    assert ExtractionCache(str(tmp_path)).get(str(source)) is None
+
+def test_failed_extractions_are_not_cached(tmp_path):
+    """A file that yielded no field is parsed again next run instead of being served as empty"""
+    source = tmp_path / 'filing.xml'
+    source.write_text('<xbrl/>')
+    cache = ExtractionCache(str(tmp_path))
+    cache.put(str(source), FIELDS)
+    cache.put(str(source), (None, None, None))
+    cache.save()
+
+    assert ExtractionCache(str(tmp_path)).get(str(source)) is None
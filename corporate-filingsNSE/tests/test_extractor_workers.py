@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extractor
+
+def test_parallel_extraction_matches_serial():
+    """The process pool yields the same rows, in the same order, as the serial loop"""
+    symbols = ['ACC', 'BEL']
+    serial = {symbol: extractor.extract_all_files(symbol, 'xbrl') for symbol in symbols}
+
+    parallel = extractor.extract_all_symbols_parallel(symbols, 'xbrl', workers=2, write_csv=False)
+
+    assert parallel == serial
+    assert all(parallel[symbol] for symbol in symbols)
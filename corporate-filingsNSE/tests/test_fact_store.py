@@ -0,0 +1,41 @@
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import fact_store
+
+JSON_DIR = os.path.join(os.path.dirname(__file__), '..', 'JSON')
+
+def test_fact_store_is_typed_and_partitioned(tmp_path):
+    """Facts land in period_end partitions with typed columns joined to the NSE record"""
+    pa = pytest.importorskip('pyarrow')
+    ds = pytest.importorskip('pyarrow.dataset')
+    store_dir = str(tmp_path / 'FACTS')
+    assert fact_store.build_fact_store(['ACC'], store_dir)
+
+    dataset = fact_store.open_fact_store(store_dir)
+    assert dataset.schema.field('period_end').type == pa.date32()
+    assert dataset.schema.field('value_numeric').type == pa.float64()
+    assert any(name.startswith('period_end=') for name in os.listdir(store_dir))
+
+    rows = dataset.to_table(filter=(ds.field('period_end') == datetime.date(2024, 12, 31)) &
+                                   (ds.field('element') == 'ProfitLossForPeriod') &
+                                   (ds.field('context_ref') == 'OneD')).to_pylist()
+    assert {row['consolidated'] for row in rows} == {True, False}
+    assert all(row['symbol'] == 'ACC' and row['seq_number'] and row['value_numeric'] is not None for row in rows)
+
+def test_relisted_filing_takes_its_latest_record(tmp_path):
+    """Facts read from json_dir are tagged with the latest listing of a file, as the CSV path picks it"""
+    with open(os.path.join(JSON_DIR, 'acc.json'), encoding='utf-8') as f:
+        record = json.load(f)[0]
+    relisted = dict(record, seqNumber=str(int(record['seqNumber']) + 1))
+    (tmp_path / 'acc.json').write_text(json.dumps([relisted, record]), encoding='utf-8')
+
+    facts = [fact for fact in fact_store.iter_symbol_facts('ACC', str(tmp_path))
+             if fact['filing'].startswith('31Jan2025_1845_')]
+    assert facts and {fact['seq_number'] for fact in facts} == {int(relisted['seqNumber'])}
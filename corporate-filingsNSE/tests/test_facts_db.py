@@ -0,0 +1,68 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extractor
+import facts_db
+import selection
+from extractor import extract_fields_from_xbrl
+
+def test_projection_matches_direct_extraction(tmp_path):
+    """Fields projected from stored facts equal a direct scan of each XBRL file"""
+    conn = facts_db.connect(str(tmp_path))
+    assert facts_db.update_symbol_facts(conn, 'ACC', 'xbrl')[0] > 0
+
+    xbrl_dir = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc', 'XBRL')
+    for source_file, values in facts_db.project_fields(conn, 'ACC'):
+        fields = (values.get('reporting_date'), values.get('profit_loss'), values.get('basic_eps'))
+        assert fields == extract_fields_from_xbrl(os.path.join(xbrl_dir, source_file))
+
+    # Unchanged files are not read again
+    extracted, unchanged, failed = facts_db.update_symbol_facts(conn, 'ACC', 'xbrl')
+    assert (extracted, failed) == (0, 0) and unchanged > 0
+
+def test_new_metric_needs_no_reparse(tmp_path):
+    """A metric outside the default table is derived from facts already stored"""
+    conn = facts_db.connect(str(tmp_path))
+    facts_db.update_symbol_facts(conn, 'ACC', 'xbrl')
+
+    mapping = {'revenue': ['RevenueFromOperations']}
+    results = facts_db.project_fields(conn, 'ACC', {'banking': mapping, 'default': mapping})
+
+    assert results and all(float(values['revenue']) > 0 for _, values in results)
+
+def test_removed_file_leaves_the_projection(tmp_path):
+    """A filing whose file is deleted from DATA/ is dropped from the database on the next update"""
+    source_dir = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc', 'XBRL')
+    xbrl_dir = tmp_path / 'DATA' / 'acc' / 'XBRL'
+    xbrl_dir.mkdir(parents=True)
+    source_files = sorted(f for f in os.listdir(source_dir) if f.endswith('.xml'))[:3]
+    for source_file in source_files:
+        shutil.copyfile(os.path.join(source_dir, source_file), xbrl_dir / source_file)
+
+    conn = facts_db.connect(str(tmp_path))
+    facts_db.update_symbol_facts(conn, 'ACC', 'xbrl', data_dir=str(tmp_path / 'DATA'))
+    assert [source_file for source_file, _ in facts_db.project_fields(conn, 'ACC')] == source_files
+
+    (xbrl_dir / source_files[0]).unlink()
+    facts_db.update_symbol_facts(conn, 'ACC', 'xbrl', data_dir=str(tmp_path / 'DATA'))
+    assert [source_file for source_file, _ in facts_db.project_fields(conn, 'ACC')] == source_files[1:]
+    assert conn.execute("SELECT COUNT(*) FROM facts JOIN filings ON filings.id = facts.filing_id").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+
+def test_materialized_csv_honours_selection(tmp_path, monkeypatch):
+    """--full-facts --select keeps every fact stored but only selected filings in the CSV"""
+    conn = facts_db.connect(str(tmp_path))
+    facts_db.update_symbol_facts(conn, 'ACC', 'xbrl')
+    written = {}
+    monkeypatch.setattr(extractor, 'save_to_csv', lambda symbol, rows: written.setdefault(symbol, rows))
+
+    select = selection.parse_selection('consolidated=only,latest')
+    rows = facts_db.materialize_csv(conn, 'ACC', select=select)
+
+    selected_names = selection.load_selected_names('ACC', select)
+    assert rows and written['ACC'] == rows
+    assert all(os.path.splitext(row['source_file'])[0] in selected_names for row in rows)
+    assert len(facts_db.project_fields(conn, 'ACC')) > len(selected_names)
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fetcher import fetch_all_symbols_async
+from ratelimit import TokenBucket
+
+class StubNSEHandler(BaseHTTPRequestHandler):
+    """Serve a one-record filing list for whichever symbol is requested"""
+    requested = []
+
+    def do_GET(self):
+        symbol = parse_qs(urlparse(self.path).query)['symbol'][0]
+        StubNSEHandler.requested.append(symbol)
+        body = json.dumps([{"symbol": symbol, "seqNumber": "1"}]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server():
+    """Start the stub NSE API on a free local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+
+def test_async_fetch_saves_json_and_skips_existing(tmp_path):
+    """Every missing symbol is written to JSON/{symbol}.json, existing files are left alone"""
+    server, url = start_stub_server()
+    StubNSEHandler.requested = []
+    (tmp_path / "tcs.json").write_text("[]", encoding='utf-8')
+
+    try:
+        asyncio.run(fetch_all_symbols_async(['RELIANCE', 'TCS', 'INFY'], str(tmp_path),
+                                            concurrency=2, rate=0, url=url))
+    finally:
+        server.shutdown()
+
+    assert sorted(StubNSEHandler.requested) == ['INFY', 'RELIANCE']
+    assert json.loads((tmp_path / "reliance.json").read_text(encoding='utf-8'))[0]['symbol'] == 'RELIANCE'
+    assert (tmp_path / "tcs.json").read_text(encoding='utf-8') == "[]"
+
+def test_async_fetch_respects_rate_limit(tmp_path):
+    """Throughput is bounded by the token bucket, not by the concurrency cap"""
+    server, url = start_stub_server()
+    symbols = [f'SYM{i}' for i in range(6)]
+
+    try:
+        start = time.monotonic()
+        asyncio.run(fetch_all_symbols_async(symbols, str(tmp_path), concurrency=6, rate=20, burst=2, url=url))
+        elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+
+    # 2 burst tokens, then 4 more at 20/sec
+    assert elapsed >= 0.19
+    assert len(os.listdir(tmp_path)) == len(symbols)
+
+def test_token_bucket_reserves_in_order():
+    """Waits grow by 1/rate per caller once the burst is spent"""
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.09 <= waits[2] <= 0.1
+    assert 0.19 <= waits[3] <= 0.2
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from field_mappings import FieldMatcher, get_sector
+from extractor import match_fields_in_rows
+
+ROWS = [
+    ('DateOfEndOfReportingPeriod', '2024-12-31'),
+    ('ProfitLossForPeriodFromContinuingOperations', '900'),
+    ('BasicEarningsLossPerShareFromContinuingOperations', '9.0'),
+    ('ProfitLossForPeriod', '1000'),
+    ('BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations', '10.0')
+]
+
+def test_priority_not_row_order_decides():
+    """The declared element wins even when a longer name containing it comes first"""
+    assert match_fields_in_rows(ROWS, 'INDAS_1.xml') == ('31Dec2024', '1000.0', '10.0')
+
+def test_banking_filings_use_banking_table():
+    """Banking filings prefer the after-extraordinary-items figures"""
+    rows = [
+        ('in-bse-fin:DateOfEndOfReportingPeriod', '2024-12-31'),
+        ('in-bse-fin:ProfitLossFromOrdinaryActivitiesAfterTax', '800'),
+        ('in-bse-fin:BasicEarningsPerShareBeforeExtraordinaryItems', '8.0'),
+        ('in-bse-fin:ProfitLossForThePeriod', '750'),
+        ('in-bse-fin:BasicEarningsPerShareAfterExtraordinaryItems', '7.5')
+    ]
+
+    assert get_sector('09Jan2025_1700_BANKING_1_2.xml') == 'banking'
+    assert match_fields_in_rows(rows, '09Jan2025_1700_BANKING_1_2.xml') == ('31Dec2024', '750.0', '7.5')
+
+def test_unusable_value_falls_back_to_next_priority():
+    """A non-numeric fact does not block lower-priority elements"""
+    matcher = FieldMatcher({'profit_loss': ['ProfitLossForPeriod', 'ProfitOrLossAttributableToOwnersOfParent']})
+
+    assert matcher.match([('ProfitLossForPeriod', 'n/a'), ('ProfitOrLossAttributableToOwnersOfParent', '5')]) == {'profit_loss': '5.0'}
+    assert matcher.match([('ProfitLossForPeriod', '4'), ('ProfitOrLossAttributableToOwnersOfParent', '5')]) == {'profit_loss': '4.0'}
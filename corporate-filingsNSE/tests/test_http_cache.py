@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+import downloader
+import fetcher
+import http_cache
+import manifest
+import metrics
+
+RECORDS = [{"symbol": "ACC", "seqNumber": "1", "filingDate": "31-Jan-2025 18:45"}]
+XBRL_BODY = b'<?xml version="1.0"?><xbrl/>'
+
+class StubConditionalHandler(BaseHTTPRequestHandler):
+    """Serve fixed bodies with an ETag and answer 304 to a matching If-None-Match"""
+    served = []
+
+    def do_GET(self):
+        body = XBRL_BODY if self.path.endswith('.xml') else json.dumps(RECORDS).encode('utf-8')
+        etag = f'"{blobstore.hash_bytes(body)[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            StubConditionalHandler.served.append((self.path, 304))
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        StubConditionalHandler.served.append((self.path, 200))
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_unchanged_resources_are_revalidated_not_refetched(tmp_path, monkeypatch):
+    """Refresh runs send conditional requests; 304s leave files untouched and TTLs skip the request entirely"""
+    monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: None)
+    monkeypatch.setattr(blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+    state_dir = str(tmp_path / 'STATE')
+    json_dir = tmp_path / 'JSON'
+    json_dir.mkdir()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConditionalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+    xbrl_url = f"http://127.0.0.1:{server.server_port}/corporate/xbrl/INDAS_1.xml"
+    xbrl_path = str(tmp_path / 'acc' / 'XBRL' / '31Jan2025_1845_INDAS_1.xml')
+
+    try:
+        http_cache.enable(state_dir, ttls={'metadata': 0, 'xbrl': 0})
+        fetcher.fetch_all_symbols(['ACC'], str(json_dir), api_url, incremental=True, state_dir=state_dir)
+        first_hash = downloader.download_xbrl_file(xbrl_url, xbrl_path)
+        http_cache.save()
+        json_mtime = os.path.getmtime(json_dir / 'acc.json')
+
+        # A later run reloads the validators and gets 304s: no body, no write
+        http_cache.enable(state_dir, ttls={'metadata': 0, 'xbrl': 0})
+        StubConditionalHandler.served = []
+        fetcher.fetch_all_symbols(['ACC'], str(json_dir), api_url, incremental=True, state_dir=state_dir)
+        assert downloader.download_xbrl_file(xbrl_url, xbrl_path) == first_hash
+        assert [status for _, status in StubConditionalHandler.served] == [304, 304]
+        assert os.path.getmtime(json_dir / 'acc.json') == json_mtime
+        assert json.loads((json_dir / 'acc.json').read_text(encoding='utf-8')) == RECORDS
+
+        # Within the TTLs nothing is asked at all, and the XBRL file is not even queued
+        http_cache.enable(state_dir)
+        StubConditionalHandler.served = []
+        fetcher.fetch_all_symbols(['ACC'], str(json_dir), api_url, incremental=True, state_dir=state_dir)
+        record = dict(RECORDS[0], xbrl=xbrl_url)
+        assert downloader.collect_download_jobs('ACC', [record], os.path.dirname(xbrl_path)) == ([], 1)
+        assert StubConditionalHandler.served == []
+        assert http_cache.get_entry(xbrl_url)['checked_at'] > time.time() - 60
+    finally:
+        http_cache.disable()
+        server.shutdown()
+
+def test_manifest_downloads_revalidate_expired_files(tmp_path, monkeypatch):
+    """Under the manifest, downloaded filings past their XBRL TTL get a conditional request; only changes move them back"""
+    monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: None)
+    monkeypatch.setattr(blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+    xbrl_dir = tmp_path / 'acc' / 'XBRL'
+    xbrl_dir.mkdir(parents=True)
+    monkeypatch.setattr(downloader, 'create_symbol_directories', lambda symbol: str(xbrl_dir))
+    state_dir = str(tmp_path / 'STATE')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConditionalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/corporate/xbrl"
+
+    # Both filings went all the way through; the second one has since been corrected on the server
+    (xbrl_dir / '31Jan2025_1845_INDAS_1.xml').write_bytes(XBRL_BODY)
+    (xbrl_dir / '30Oct2024_1133_INDAS_2.xml').write_bytes(b'<?xml version="1.0"?><xbrl old="1"/>')
+    conn = manifest.connect(state_dir)
+    for filename, url in (('31Jan2025_1845_INDAS_1.xml', f'{base_url}/INDAS_1.xml'),
+                          ('30Oct2024_1133_INDAS_2.xml', f'{base_url}/INDAS_2.xml')):
+        manifest.register_filing(conn, 'ACC', filename, xbrl_url=url)
+        manifest.mark_stage(conn, 'ACC', filename, 'extracted', xbrl_path=str(xbrl_dir / filename))
+
+    try:
+        http_cache.enable(state_dir, ttls={'xbrl': 0})
+        etag = f'"{blobstore.hash_bytes(XBRL_BODY)[:16]}"'
+        http_cache.record(http_cache.get_validators(f'{base_url}/INDAS_1.xml', SimpleNamespace(headers={'ETag': etag})))
+        StubConditionalHandler.served = []
+        downloader.download_all_symbols(conn)
+
+        assert sorted(StubConditionalHandler.served) == [('/corporate/xbrl/INDAS_1.xml', 304),
+                                                         ('/corporate/xbrl/INDAS_2.xml', 200)]
+        assert manifest.get_status(conn, 'ACC', '31Jan2025_1845_INDAS_1.xml') == 'extracted'
+        changed = manifest.get_filing(conn, 'ACC', '30Oct2024_1133_INDAS_2.xml')
+        assert (changed['status'], changed['content_hash']) == ('downloaded', blobstore.hash_bytes(XBRL_BODY))
+        assert (xbrl_dir / '30Oct2024_1133_INDAS_2.xml').read_bytes() == XBRL_BODY
+    finally:
+        http_cache.disable()
+        conn.close()
+        server.shutdown()
+
+def test_validators_wait_for_the_json_write(tmp_path, monkeypatch):
+    """A fetch whose JSON fails to save records no validator, so the next run fetches it whole again"""
+    monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: None)
+    json_dir = tmp_path / 'JSON'
+    json_dir.mkdir()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConditionalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+    key = http_cache.get_cache_key(api_url, {"index": "equities", "symbol": "ACC", "period": "Quarterly"})
+
+    try:
+        http_cache.enable(str(tmp_path / 'STATE'))
+        monkeypatch.setattr(fetcher, 'save_json_data', lambda symbol, data, json_dir: False)
+        fetcher.fetch_all_symbols(['ACC'], str(json_dir), api_url)
+        assert http_cache.get_entry(key) is None
+
+        monkeypatch.undo()
+        monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: None)
+        fetcher.fetch_all_symbols(['ACC'], str(json_dir), api_url)
+        assert http_cache.get_entry(key)['etag'] == f'"{blobstore.hash_bytes(json.dumps(RECORDS).encode("utf-8"))[:16]}"'
+    finally:
+        http_cache.disable()
+        server.shutdown()
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fetcher import fetch_all_symbols, compute_watermark
+from state import load_state
+
+def make_record(seq, filing_date):
+    """Build a minimal NSE filing record"""
+    return {
+        "symbol": "ACC",
+        "seqNumber": str(seq),
+        "filingDate": filing_date,
+        "broadCastDate": f"{filing_date}:00",
+        "xbrl": f"https://nsearchives.nseindia.com/corporate/xbrl/INDAS_{seq}.xml"
+    }
+
+class StubNSEHandler(BaseHTTPRequestHandler):
+    """Serve whatever records the test has published"""
+    records = []
+
+    def do_GET(self):
+        body = json.dumps(StubNSEHandler.records).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_incremental_fetch_merges_only_new_records(tmp_path):
+    """Only records above the watermark are merged and queued for download"""
+    json_dir = tmp_path / "JSON"
+    state_dir = tmp_path / "STATE"
+    json_dir.mkdir()
+    old_records = [make_record(2, "30-Oct-2024 11:33"), make_record(1, "25-Jul-2024 16:00")]
+    (json_dir / "acc.json").write_text(json.dumps(old_records), encoding='utf-8')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/corporates-financial-results"
+
+    try:
+        StubNSEHandler.records = [make_record(3, "31-Jan-2025 18:45")] + old_records
+        fetch_all_symbols(['ACC'], str(json_dir), url, incremental=True, state_dir=str(state_dir))
+
+        stored = json.loads((json_dir / "acc.json").read_text(encoding='utf-8'))
+        assert [record['seqNumber'] for record in stored] == ['3', '2', '1']
+        assert load_state('watermarks', str(state_dir))['acc']['seqNumber'] == 3
+        assert [record['seqNumber'] for record in load_state('pending_downloads', str(state_dir))['acc']] == ['3']
+
+        # A second run with nothing new leaves the file and queue untouched
+        fetch_all_symbols(['ACC'], str(json_dir), url, incremental=True, state_dir=str(state_dir))
+        assert len(json.loads((json_dir / "acc.json").read_text(encoding='utf-8'))) == 3
+        assert len(load_state('pending_downloads', str(state_dir))['acc']) == 1
+    finally:
+        server.shutdown()
+
+def test_compute_watermark_uses_parsed_dates():
+    """Dates compare chronologically, not as strings"""
+    watermark = compute_watermark([make_record(5, "09-Jan-2025 10:00"), make_record(4, "30-Dec-2024 10:00")])
+
+    assert watermark == {
+        'seqNumber': 5,
+        'filingDate': "09-Jan-2025 10:00",
+        'broadCastDate': "09-Jan-2025 10:00:00"
+    }
@@ -0,0 +1,46 @@
+import io
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from openpyxl import load_workbook
+
+import converter
+import local_converter
+from extractor import choose_data_sheet
+from xlsx_reader import iter_sheet_columns
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'ambujacem')
+FILENAME = '02Aug2018_0000_INDAS_37214_29207_26072018120731_WEB'
+XBRL_PATH = os.path.join(DATA_DIR, 'XBRL', FILENAME + '.xml')
+XLSX_PATH = os.path.join(DATA_DIR, 'XLSX', FILENAME + '.xlsx')
+
+def read_rows(workbook):
+    """All six columns of the data sheet of a workbook path or file object"""
+    return list(iter_sheet_columns(workbook, [1, 2, 3, 4, 5, 6], choose_data_sheet))
+
+def test_matches_ec2_workbook():
+    """Every cell equals the workbook the EC2 converter produced for the same filing"""
+    workbook = local_converter.convert_file(XBRL_PATH)
+    assert read_rows(io.BytesIO(workbook)) == read_rows(XLSX_PATH)
+
+    # Readable by openpyxl too (extractor's fallback path)
+    sheet = load_workbook(io.BytesIO(workbook), read_only=True)['Intance Data']
+    assert next(sheet.iter_rows(values_only=True)) == local_converter.HEADER
+
+def test_http_service_form_contract():
+    """converter.upload_and_convert_xbrl works unchanged against the local service"""
+    server = local_converter.create_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        workbook = converter.upload_and_convert_xbrl(XBRL_PATH, f"http://{host}:{port}/")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert workbook[:2] == b'PK'
+    assert read_rows(io.BytesIO(workbook)) == read_rows(XLSX_PATH)
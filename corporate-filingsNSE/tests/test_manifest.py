@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import manifest
+
+def test_filings_move_through_stages(tmp_path):
+    """Each stage only sees filings that finished the previous one"""
+    conn = manifest.connect(str(tmp_path))
+    manifest.register_filing(conn, 'ACC', '31Jan2025_1845_INDAS_1.xml', '1191885', 'https://example/INDAS_1.xml')
+    manifest.register_filing(conn, 'TCS', '10Oct2024_1858_INDAS_2.xml', '1100000', 'https://example/INDAS_2.xml')
+    conn.commit()
+
+    assert manifest.symbols_needing(conn, 'downloaded') == ['ACC', 'TCS']
+    assert manifest.symbols_needing(conn, 'converted') == []
+
+    xbrl_path = os.path.join(manifest.get_base_dir(), 'DATA', 'acc', 'XBRL', '31Jan2025_1845_INDAS_1.xml')
+    manifest.mark_stage(conn, 'ACC', xbrl_path, 'downloaded', xbrl_path=xbrl_path, content_hash='abc')
+
+    assert manifest.symbols_needing(conn, 'downloaded') == ['TCS']
+    row = manifest.filings_needing(conn, 'converted', 'ACC')[0]
+    assert row['seq_number'] == '1191885'
+    assert row['xbrl_path'] == os.path.join('DATA', 'acc', 'XBRL', '31Jan2025_1845_INDAS_1.xml')
+    assert manifest.to_absolute(row['xbrl_path']) == xbrl_path
+
+def test_failures_keep_stage_and_clear_on_success(tmp_path):
+    """A failed filing stays queued for its stage until it succeeds"""
+    conn = manifest.connect(str(tmp_path))
+    manifest.register_filing(conn, 'ACC', 'INDAS_1.xml')
+    manifest.mark_failed(conn, 'ACC', 'INDAS_1.xml', 'download', 'timeout')
+
+    row = manifest.filings_needing(conn, 'downloaded', 'ACC')[0]
+    assert (row['status'], row['error_stage'], row['error']) == ('fetched', 'download', 'timeout')
+
+    manifest.mark_stage(conn, 'ACC', 'INDAS_1.xml', 'downloaded')
+    row = manifest.filings_at_least(conn, 'ACC', 'downloaded')[0]
+    assert row['error'] is None
+
+def test_open_if_exists_does_not_create(tmp_path):
+    """Stages fall back to directory scans until the manifest is created"""
+    assert manifest.open_if_exists(str(tmp_path)) is None
+    manifest.connect(str(tmp_path)).close()
+    assert manifest.open_if_exists(str(tmp_path)) is not None
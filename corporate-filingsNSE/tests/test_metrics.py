@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import metrics
+
+def use_fresh_registry(monkeypatch):
+    monkeypatch.setattr(metrics, '_counters', {})
+    monkeypatch.setattr(metrics, '_gauges', {})
+    monkeypatch.setattr(metrics, '_histograms', {})
+
+def test_prometheus_export(monkeypatch):
+    """Counters and histograms come out in the Prometheus text format with cumulative buckets"""
+    use_fresh_registry(monkeypatch)
+    for seconds in (0.003, 0.004, 0.2, 3.0):
+        metrics.observe('http_request_seconds', seconds, host='nse', status=200)
+    metrics.inc('bytes_total', 1000, stage='download')
+    metrics.inc('bytes_total', 500, stage='download')
+
+    text = metrics.to_prometheus()
+    assert 'bytes_total{stage="download"} 1500' in text
+    assert 'http_request_seconds_bucket{host="nse",status="200",le="0.005"} 2' in text
+    assert 'http_request_seconds_bucket{host="nse",status="200",le="0.25"} 3' in text
+    assert 'http_request_seconds_bucket{host="nse",status="200",le="+Inf"} 4' in text
+    assert 'http_request_seconds_count{host="nse",status="200"} 4' in text
+    assert metrics.get_quantile(metrics._histograms[metrics.get_key('http_request_seconds',
+                                                                    {'host': 'nse', 'status': 200})], 0.5) == 0.005
+
+def test_collect_writes_jsonl_and_sleep_time(tmp_path, monkeypatch):
+    """A collected run exports every observation, its sleep time by reason and its wall time"""
+    use_fresh_registry(monkeypatch)
+    monkeypatch.setattr(metrics.time, 'sleep', lambda seconds: None)
+
+    with metrics.collect('download', str(tmp_path)):
+        metrics.sleep(2, 'politeness')
+        metrics.sleep(0, 'rate_limit')
+        with metrics.timer('file_seconds', stage='download'):
+            pass
+
+    events = [json.loads(line) for line in (tmp_path / 'metrics.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert [event['name'] for event in events] == ['sleep_seconds_total', 'file_seconds', 'run_seconds']
+    assert events[0]['labels'] == {'reason': 'politeness'} and events[0]['value'] == 2
+
+    text = (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert 'sleep_seconds_total{reason="politeness"} 2' in text
+    assert 'run_seconds_count{stage="download"} 1' in text
+
+def test_thread_profiling_is_skipped_on_python_312(monkeypatch):
+    """From 3.12 cProfile allows one profiler per process, so no per-thread hook is installed"""
+    monkeypatch.setattr(metrics.sys, 'version_info', (3, 12, 0))
+    metrics.profile_new_threads([])
+    assert threading.getprofile() is None
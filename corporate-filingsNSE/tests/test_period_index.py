@@ -0,0 +1,39 @@
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from period_index import PeriodIndex
+
+RECORDS = {
+    '31Jan2025_1845_INDAS_1': {'consolidated': 'Non-Consolidated', 'filingDate': '31-Jan-2025 18:45', 'seqNumber': '1'},
+    '31Jan2025_1845_INDAS_2': {'consolidated': 'Consolidated', 'filingDate': '31-Jan-2025 18:45', 'seqNumber': '2'},
+    '14Feb2025_1000_INDAS_3': {'consolidated': 'Consolidated', 'filingDate': '14-Feb-2025 10:00', 'seqNumber': '3'},
+}
+
+def make_row(reporting_date, profit_loss):
+    return {'reporting_date': reporting_date, 'profit_loss': profit_loss, 'basic_eps': 1.0, 'num_shares': 100}
+
+FILES = [
+    ('31Jan2025_1845_INDAS_1.xml', make_row('31Dec2024', 10.0)),  # standalone
+    ('31Jan2025_1845_INDAS_2.xml', make_row('31Dec2024', 20.0)),  # consolidated
+    ('14Feb2025_1000_INDAS_3.xml', make_row('31Dec2024', 25.0)),  # consolidated, revised
+    ('01Nov2024_1200_INDAS_4.xml', make_row('30Sep2024', 5.0)),   # no JSON record
+]
+
+def test_latest_consolidated_filing_wins_in_any_order():
+    """The revised consolidated filing is chosen whatever order files arrive in, and the losers are reported"""
+    outcomes = set()
+    for order in itertools.permutations(FILES):
+        index = PeriodIndex(RECORDS)
+        for source_file, row in order:
+            index.add(source_file, row)
+        outcomes.add((tuple((row['reporting_date'], row['profit_loss'], row['source_file']) for row in index.rows()),
+                      tuple(index.get_superseded())))
+
+    assert outcomes == {(
+        (('30Sep2024', 5.0, '01Nov2024_1200_INDAS_4.xml'), ('31Dec2024', 25.0, '14Feb2025_1000_INDAS_3.xml')),
+        (('31Jan2025_1845_INDAS_1.xml', '14Feb2025_1000_INDAS_3.xml'),
+         ('31Jan2025_1845_INDAS_2.xml', '14Feb2025_1000_INDAS_3.xml'))
+    )}
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+import pipeline
+
+XBRL_DIR = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc', 'XBRL')
+XBRL_FILES = sorted(os.path.join(XBRL_DIR, f) for f in os.listdir(XBRL_DIR) if f.endswith('.xml'))[:4]
+
+class GatedArchiveHandler(BaseHTTPRequestHandler):
+    """Serve real XBRL filings; paths under /slow/ wait until the gate opens"""
+    gate = threading.Event()
+
+    def do_GET(self):
+        if '/slow/' in self.path:
+            GatedArchiveHandler.gate.wait(10)
+        index = int(self.path.rsplit('_', 1)[1].split('.')[0])
+        with open(XBRL_FILES[index], 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_symbol_csv_streams_out_before_other_downloads_finish(tmp_path, monkeypatch):
+    """FAST's CSV is written while SLOW's downloads are still in flight"""
+    monkeypatch.setattr(blobstore, 'get_blob_dir', lambda blob_dir=None: str(tmp_path / 'BLOBS'))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GatedArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    json_dir = tmp_path / 'JSON'
+    json_dir.mkdir()
+    records = {
+        'slow': [{'xbrl': f'{base_url}/slow/INDAS_{i}.xml', 'filingDate': f'0{i + 1}-Jan-2025 10:00'} for i in (0, 1)],
+        'fast': [{'xbrl': f'{base_url}/fast/INDAS_{i}.xml', 'filingDate': f'0{i + 1}-Feb-2025 10:00'} for i in (2, 3)],
+    }
+    for symbol, symbol_records in records.items():
+        (json_dir / f'{symbol}.json').write_text(json.dumps(symbol_records), encoding='utf-8')
+
+    run = pipeline.Pipeline(['SLOW', 'FAST'], source='xbrl', json_dir=str(json_dir), data_dir=str(tmp_path / 'DATA'),
+                            download_rate=0, queue_size=2)
+    runner = threading.Thread(target=run.run)
+    GatedArchiveHandler.gate.clear()
+    try:
+        runner.start()
+        fast_csv = tmp_path / 'DATA' / 'fast' / 'CSV' / 'fast.csv'
+        deadline = time.monotonic() + 10
+        while not fast_csv.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert fast_csv.exists()
+        assert not (tmp_path / 'DATA' / 'slow' / 'CSV' / 'slow.csv').exists()
+    finally:
+        GatedArchiveHandler.gate.set()
+        runner.join(20)
+        server.shutdown()
+        server.server_close()
+
+    assert run.csv_written == ['FAST', 'SLOW']
+    for symbol in ('fast', 'slow'):
+        rows = (tmp_path / 'DATA' / symbol / 'CSV' / f'{symbol}.csv').read_text(encoding='utf-8').splitlines()
+        # Each symbol's two filings are the standalone and consolidated results of one quarter
+        assert len(rows) == 2
+
+def test_bounded_queue_applies_backpressure():
+    """A producer cannot run more than the queue size ahead of a slow consumer"""
+    backlog = []
+    consumer = pipeline.Stage('consume', lambda item, emit: (time.sleep(0.01), backlog.append(consumer.inbox.qsize())),
+                              queue_size=2)
+    producer = pipeline.Stage('produce', lambda item, emit: [emit(i) for i in range(20)])
+    producer.downstream = consumer
+    consumer.start()
+    producer.start()
+    producer.put('go')
+    producer.close()
+    producer.join()
+    consumer.join()
+
+    assert len(backlog) == 20
+    assert max(backlog) <= 2
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import resilience
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answer 429 with a Retry-After for the first requests, then 200"""
+    throttled = 2
+    requests_seen = 0
+
+    def do_GET(self):
+        ThrottlingHandler.requests_seen += 1
+        if ThrottlingHandler.requests_seen <= ThrottlingHandler.throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '7')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_retry_after_is_honoured(monkeypatch):
+    """429s are retried after the server's Retry-After instead of failing the request"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api"
+    sleeps = []
+    monkeypatch.setattr(resilience.time, 'sleep', sleeps.append)
+
+    try:
+        response = resilience.request_with_retry(requests.Session(), 'GET', url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response.status_code == 200
+    assert ThrottlingHandler.requests_seen == 3
+    assert sleeps == [7.0, 7.0]
+
+def test_circuit_opens_and_probes_after_cool_down():
+    """Consecutive failures open the circuit; after the cool-down a single probe decides"""
+    now = [0.0]
+    breaker = resilience.CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30
+
+    now[0] = 31.0
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe while half-open
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 62.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+def test_connection_errors_fail_fast_once_circuit_opens(monkeypatch):
+    """A dead host is not hammered: once its circuit is open no request is sent"""
+    monkeypatch.setattr(resilience, '_breakers', {})
+    monkeypatch.setattr(resilience.time, 'sleep', lambda seconds: None)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        raise requests.ConnectionError("refused")
+
+    url = "http://converter.invalid/"
+    for _ in range(3):
+        try:
+            resilience.call_with_retry(send, url, retries=2)
+        except requests.RequestException as e:
+            error = e
+
+    assert len(attempts) == resilience.get_breaker(url).failure_threshold
+    assert isinstance(error, resilience.CircuitOpenError)
+
+def test_retry_failed_passes(monkeypatch):
+    """Items still failing at the end of a run get further passes; persistent failures are returned"""
+    monkeypatch.setattr(resilience, '_breakers', {})
+    calls = []
+
+    def retry(item):
+        calls.append(item)
+        return item == 'flaky' and calls.count(item) == 2
+
+    assert resilience.retry_failed(['flaky', 'broken'], retry, 'symbols') == ['broken']
+    assert calls == ['flaky', 'broken', 'flaky', 'broken']
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import selection
+
+def make_record(number, consolidated, filed, from_date='01-Oct-2024', to_date='31-Dec-2024', ind_as='Ind-AS New'):
+    return {
+        'xbrl': f'https://nsearchives.nseindia.com/corporate/xbrl/INDAS_{number}.xml',
+        'filingDate': filed,
+        'seqNumber': str(number),
+        'consolidated': consolidated,
+        'fromDate': from_date,
+        'toDate': to_date,
+        'indAs': ind_as,
+        'period': 'Quarterly'
+    }
+
+RECORDS = [
+    make_record(1, 'Non-Consolidated', '31-Jan-2025 18:45'),
+    make_record(2, 'Consolidated', '31-Jan-2025 18:45'),
+    make_record(3, 'Consolidated', '14-Feb-2025 10:00'),  # revision of 2
+    make_record(4, 'Consolidated', '30-Jan-2019 12:00', '01-Oct-2018', '31-Dec-2018', 'Non-Ind-AS'),
+]
+
+def test_selection_filters_and_keeps_latest_revision():
+    """Flag and date filters apply per record; latest keeps the last filing of each period"""
+    select = selection.parse_selection('consolidated=only,from=2020-04-01,latest')
+    selected, dropped = selection.select_records(RECORDS, select)
+    assert [record['seqNumber'] for record in selected] == ['3']
+    assert dropped == 3
+
+    selected, _ = selection.select_records(RECORDS, selection.parse_selection('indas=exclude'))
+    assert [record['seqNumber'] for record in selected] == ['4']
+    assert selection.select_records(RECORDS, {}) == (RECORDS, 0)
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        selection.parse_selection('consolidated=maybe')
+
+def test_selected_names_filter_files_on_disk(tmp_path):
+    """Later stages keep only the files of selected filings, whatever their extension"""
+    (tmp_path / 'acc.json').write_text(json.dumps(RECORDS), encoding='utf-8')
+    names = selection.load_selected_names('ACC', selection.parse_selection('consolidated=only,latest'), str(tmp_path))
+
+    files = ['31Jan2025_1845_INDAS_1.xlsx', '31Jan2025_1845_INDAS_2.xlsx', '14Feb2025_1000_INDAS_3.xlsx',
+             '30Jan2019_1200_INDAS_4.xlsx']
+    kept, dropped = selection.filter_files(files, names, 'extract')
+    assert kept == ['14Feb2025_1000_INDAS_3.xlsx', '30Jan2019_1200_INDAS_4.xlsx']
+    assert dropped == 2
+    assert selection.load_selected_names('ACC', {}, str(tmp_path)) is None
+
+def test_filing_records_take_the_latest_listing_of_a_file(tmp_path):
+    """A document NSE lists twice is attached to its later revision, whichever order the JSON has"""
+    relisted = dict(RECORDS[0], seqNumber='9')
+    (tmp_path / 'acc.json').write_text(json.dumps([relisted, RECORDS[0]]), encoding='utf-8')
+    records = selection.load_filing_records('ACC', str(tmp_path))
+    assert records['31Jan2025_1845_INDAS_1']['seqNumber'] == '9'
+
+    assert selection.parse_nse_date('31-Jan-2025 18:45:17').second == 17
+    assert selection.parse_nse_date('31-Dec-2024').day == 31
+    assert selection.parse_nse_date('2024-12-31') is None
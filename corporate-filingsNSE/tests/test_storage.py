@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import blobstore
+import converter
+import storage
+from xbrl_parser import iter_facts
+
+XBRL_DIR = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc', 'XBRL')
+XBRL_FILE = os.path.join(XBRL_DIR, sorted(f for f in os.listdir(XBRL_DIR) if f.endswith('.xml'))[0])
+
+def test_compressed_download_reads_like_the_original(tmp_path):
+    """A download stored gzip-compressed keeps its content hash, parses the same and uploads as plain XML"""
+    with open(XBRL_FILE, 'rb') as f:
+        original = f.read()
+    target = tmp_path / 'acc' / 'XBRL' / 'filing.xml'
+
+    digest, size = blobstore.save_stream_and_link(iter([original[:1000], original[1000:]]), str(target), '.xml',
+                                                  str(tmp_path / 'BLOBS'), codec='gzip')
+
+    assert storage.detect_codec(str(target)) == 'gzip'
+    assert os.path.getsize(target) < len(original) / 4
+    assert digest == blobstore.hash_bytes(original) == blobstore.hash_file(str(target))
+    assert size == storage.get_size(str(target)) == len(original)
+    assert list(iter_facts(str(target))) == list(iter_facts(XBRL_FILE))
+
+    with converter.MultipartBody({}, 'file', str(target)) as body:
+        sent = body.read()
+    assert len(sent) == len(body) and original in sent
+
+def test_recode_tree_round_trip(tmp_path):
+    """Compressing a tree in place keeps duplicate filings linked to one blob; decompressing restores every byte"""
+    xbrl_dir = tmp_path / 'DATA' / 'acc' / 'XBRL'
+    xbrl_dir.mkdir(parents=True)
+    json_dir = tmp_path / 'JSON'
+    json_dir.mkdir()
+    shutil.copyfile(XBRL_FILE, xbrl_dir / 'first.xml')
+    shutil.copyfile(XBRL_FILE, xbrl_dir / 'refiled.xml')
+    (json_dir / 'acc.json').write_text(json.dumps([{'symbol': 'ACC'}], indent=2), encoding='utf-8')
+    with open(XBRL_FILE, 'rb') as f:
+        original = f.read()
+    blob_dir = str(tmp_path / 'BLOBS')
+
+    recoded, before, after = storage.recode_tree('gzip', str(tmp_path), blob_dir)
+    assert recoded == 3 and after < before / 4
+    assert os.path.samefile(xbrl_dir / 'first.xml', xbrl_dir / 'refiled.xml')
+    with storage.open_text(str(json_dir / 'acc.json')) as f:
+        assert json.load(f) == [{'symbol': 'ACC'}]
+    assert storage.recode_tree('gzip', str(tmp_path), blob_dir)[0] == 0
+
+    storage.recode_tree(None, str(tmp_path), blob_dir)
+    assert (xbrl_dir / 'refiled.xml').read_bytes() == original
+    assert storage.detect_codec(str(json_dir / 'acc.json')) is None
@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xbrl_parser import iter_facts
+from extractor import extract_fields_from_xbrl, extract_fields_from_excel
+
+SAMPLE_XBRL = """<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:in-bse-fin="http://www.bseindia.com/xbrl/fin/2020-03-31/in-bse-fin">
+<xbrli:context id="OneSegment01D"><xbrli:entity><xbrli:identifier scheme="http://www.nseindia.com/NSESymbol">TEST</xbrli:identifier></xbrli:entity><xbrli:period><xbrli:startDate>2024-10-01</xbrli:startDate><xbrli:endDate>2024-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+<in-bse-fin:DateOfStartOfReportingPeriod contextRef="OneD">2024-10-01</in-bse-fin:DateOfStartOfReportingPeriod>
+<in-bse-fin:DateOfEndOfReportingPeriod contextRef="OneD">2024-12-31</in-bse-fin:DateOfEndOfReportingPeriod>
+<in-bse-fin:ProfitLossForPeriod contextRef="OneD" unitRef="INR" decimals="-7">1104500000.00</in-bse-fin:ProfitLossForPeriod>
+<in-bse-fin:BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations contextRef="OneD" unitRef="INRPerShare" decimals="INF">5.88</in-bse-fin:BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations>
+<in-bse-fin:Equity contextRef="OneI" unitRef="INR" decimals="-7">100.00</in-bse-fin:Equity>
+<in-bse-fin:SegmentRevenue contextRef="OneSegment01D" unitRef="INR" decimals="-7">5.00</in-bse-fin:SegmentRevenue>
+</xbrli:xbrl>
+"""
+
+def write_sample(tmp_path):
+    """Write the sample instance to a temporary file"""
+    xbrl_path = tmp_path / "sample.xml"
+    xbrl_path.write_text(SAMPLE_XBRL, encoding='utf-8')
+    return str(xbrl_path)
+
+def test_iter_facts_resolves_undeclared_contexts(tmp_path):
+    """OneD/OneI periods come from the filing's reporting period facts"""
+    facts = {fact['element']: fact for fact in iter_facts(write_sample(tmp_path))}
+
+    assert facts['ProfitLossForPeriod']['period_start'] == '2024-10-01'
+    assert facts['ProfitLossForPeriod']['period_end'] == '2024-12-31'
+    assert facts['ProfitLossForPeriod']['unit_ref'] == 'INR'
+    assert facts['Equity']['period_start'] is None
+    assert facts['Equity']['period_end'] == '2024-12-31'
+    assert facts['SegmentRevenue']['context_ref'] == 'OneSegment01D'
+
+def test_iter_facts_resolves_period_facts_that_come_last(tmp_path):
+    """Facts read before the reporting period facts still get their period, in document order"""
+    lines = SAMPLE_XBRL.splitlines()
+    period_lines = [line for line in lines if 'ReportingPeriod' in line]
+    other_lines = [line for line in lines if 'ReportingPeriod' not in line]
+    xbrl_path = tmp_path / "late_period.xml"
+    xbrl_path.write_text('\n'.join(other_lines[:-1] + period_lines + other_lines[-1:]), encoding='utf-8')
+
+    facts = list(iter_facts(str(xbrl_path)))
+    assert [fact['element'] for fact in facts][-2:] == ['DateOfStartOfReportingPeriod', 'DateOfEndOfReportingPeriod']
+    by_element = {fact['element']: fact for fact in facts}
+    assert by_element['ProfitLossForPeriod']['period_start'] == '2024-10-01'
+    assert by_element['ProfitLossForPeriod']['period_end'] == '2024-12-31'
+    assert by_element['Equity']['period_end'] == '2024-12-31'
+    assert by_element['SegmentRevenue']['context_declared']
+
+def test_extract_fields_from_xbrl(tmp_path):
+    """Fields match the row format produced by extractor.save_to_csv"""
+    assert extract_fields_from_xbrl(write_sample(tmp_path)) == ('31Dec2024', '1104500000.0', '5.88')
+
+def test_xbrl_matches_converted_workbook():
+    """The direct XBRL path agrees with the Excel path on a recorded filing"""
+    base_dir = os.path.join(os.path.dirname(__file__), '..', 'DATA', 'acc')
+    filename = '31Jan2025_1843_INDAS_118349_1367742_31012025064331'
+    xbrl_path = os.path.join(base_dir, 'XBRL', f'{filename}.xml')
+    excel_path = os.path.join(base_dir, 'XLSX', f'{filename}.xlsx')
+
+    if not (os.path.exists(xbrl_path) and os.path.exists(excel_path)):
+        return
+
+    assert extract_fields_from_xbrl(xbrl_path) == extract_fields_from_excel(excel_path)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extractor
+from xlsx_reader import iter_sheet_columns, UnsupportedCell
+
+def write_instance_workbook(path, fact_rows):
+    """Write a workbook in the converter's 'Intance Data' layout"""
+    workbook = Workbook()
+    workbook.active.title = 'Summary'
+    sheet = workbook.create_sheet('Intance Data')
+    sheet.append(['Sr.No.', 'Element Name', 'Period', 'Unit', 'Decimals', 'Fact Value'])
+    for number, (element_name, fact_value) in enumerate(fact_rows, 1):
+        sheet.append([str(number), element_name, None, None, None, fact_value])
+    workbook.save(path)
+
+def test_stream_reads_columns_b_and_f(tmp_path):
+    """Only the requested columns come back, from the instance sheet rather than the first one"""
+    path = str(tmp_path / 'filing.xlsx')
+    write_instance_workbook(path, [
+        ('in-bse-fin:DateOfEndOfReportingPeriod', '2024-12-31'),
+        ('in-bse-fin:ProfitLossForPeriod', '1234500000'),
+        ('in-bse-fin:BasicEarningsLossPerShareFromContinuingAndDiscontinuedOperations', '65.7')
+    ])
+
+    rows = list(iter_sheet_columns(path, (2, 6), extractor.choose_data_sheet))
+
+    assert rows[0] == ('Element Name', 'Fact Value')
+    assert rows[2] == ('in-bse-fin:ProfitLossForPeriod', '1234500000')
+    assert extractor.extract_fields_from_excel(path) == ('31Dec2024', '1234500000.0', '65.7')
+
+def test_numeric_cells_fall_back_to_openpyxl(tmp_path):
+    """Non-string cells are left to openpyxl, with the same result"""
+    path = str(tmp_path / 'numeric.xlsx')
+    write_instance_workbook(path, [
+        ('in-bse-fin:DateOfEndOfReportingPeriod', '2024-12-31'),
+        ('in-bse-fin:ProfitLossForPeriod', 1234500000),
+        ('in-bse-fin:BasicEarningsPerShare', 65.7)
+    ])
+
+    with pytest.raises(UnsupportedCell):
+        list(iter_sheet_columns(path, (2, 6), extractor.choose_data_sheet))
+
+    assert extractor.extract_fields_from_excel(path) == extractor.extract_fields_with_openpyxl(path)
+    assert extractor.extract_fields_from_excel(path) == ('31Dec2024', '1234500000.0', '65.7')
@@ -0,0 +1,121 @@
+import os
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import storage
+
+XBRLI_NS = '{http://www.xbrl.org/2003/instance}'
+
+# Filing-level facts that carry the reporting period for contexts such as
+# OneD/FourD, which many NSE instances reference without ever declaring
+REPORTING_PERIOD_ELEMENTS = {
+    'DateOfStartOfReportingPeriod': 'period_start',
+    'DateOfEndOfReportingPeriod': 'period_end'
+}
+
+def local_name(tag):
+    """Strip the namespace from an ElementTree tag"""
+    return tag.rsplit('}', 1)[-1]
+
+def parse_context_period(context_element):
+    """Read the period of an xbrli:context element"""
+    period = context_element.find(f'{XBRLI_NS}period')
+    if period is None:
+        return None, None
+
+    instant = period.findtext(f'{XBRLI_NS}instant')
+    if instant:
+        return None, instant.strip()
+
+    start_date = period.findtext(f'{XBRLI_NS}startDate')
+    end_date = period.findtext(f'{XBRLI_NS}endDate')
+    return (start_date.strip() if start_date else None,
+            end_date.strip() if end_date else None)
+
+def resolve_context_period(context_ref, contexts, implicit_periods):
+    """Resolve a contextRef to (start, end), falling back to the filing's own reporting period facts"""
+    if context_ref in contexts:
+        return contexts[context_ref]
+
+    period = implicit_periods.get(context_ref)
+    if period:
+        return period.get('period_start'), period.get('period_end')
+
+    # Undeclared instant contexts (OneI, FourI) close on their duration sibling (OneD, FourD)
+    if context_ref.endswith('I'):
+        period = implicit_periods.get(context_ref[:-1] + 'D')
+        if period:
+            return None, period.get('period_end')
+
+    return None, None
+
+def resolve_fact_period(fact, contexts, implicit_periods):
+    """Fill in a fact's period from what has been read so far; True once it can no longer change"""
+    context_ref = fact['context_ref']
+    fact['period_start'], fact['period_end'] = resolve_context_period(context_ref, contexts, implicit_periods)
+    fact['context_declared'] = context_ref in contexts
+    if fact['context_declared']:
+        return True
+    return fact['period_end'] is not None and (fact['period_start'] is not None or context_ref.endswith('I'))
+
+def iter_facts(xbrl_filepath):
+    """Stream facts from an XBRL instance in document order without building the full tree"""
+    contexts = {}
+    implicit_periods = {}
+    # Facts on an undeclared context wait here until the reporting period facts (or a late
+    # context) complete their period; later facts queue behind them to keep document order
+    pending = deque()
+    depth = 0
+    root = None
+
+    # Compressed files (storage.py) are decompressed as they are parsed
+    with storage.open_read(xbrl_filepath) as f:
+        for event, element in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            # Only direct children of xbrli:xbrl are contexts, units and facts
+            if element.tag == f'{XBRLI_NS}context':
+                contexts[element.get('id')] = parse_context_period(element)
+            elif element.get('contextRef'):
+                element_name = local_name(element.tag)
+                context_ref = element.get('contextRef')
+                value = element.text.strip() if element.text is not None else None
+
+                if element_name in REPORTING_PERIOD_ELEMENTS and context_ref not in contexts and value:
+                    implicit_periods.setdefault(context_ref, {})[REPORTING_PERIOD_ELEMENTS[element_name]] = value
+
+                pending.append({
+                    'element': element_name,
+                    'context_ref': context_ref,
+                    'unit_ref': element.get('unitRef'),
+                    'decimals': element.get('decimals'),
+                    'period_start': None,
+                    'period_end': None,
+                    'context_declared': False,
+                    'value': value
+                })
+
+            while pending and resolve_fact_period(pending[0], contexts, implicit_periods):
+                yield pending.popleft()
+
+            # Drop processed children so memory stays flat regardless of file size
+            root.clear()
+
+    # Whatever the whole document could not resolve keeps the periods it has
+    for fact in pending:
+        resolve_fact_period(fact, contexts, implicit_periods)
+        yield fact
+
+def get_xbrl_files(xbrl_dir):
+    """List XBRL instance files in a directory"""
+    if not os.path.exists(xbrl_dir):
+        return []
+    return [f for f in os.listdir(xbrl_dir) if f.endswith('.xml')]
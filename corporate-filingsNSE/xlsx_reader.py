@@ -0,0 +1,107 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Cell types read without a style lookup; anything else (numbers that may be
+# date-formatted, booleans, errors) is left to openpyxl
+STRING_CELL_TYPES = ('s', 'str', 'inlineStr')
+
+class UnsupportedCell(Exception):
+    """Raised when a sheet holds a cell type this reader does not decode"""
+
+def column_index(cell_reference):
+    """1-based column number of a cell reference such as 'F12'"""
+    index = 0
+    for char in re.match(r'[A-Z]+', cell_reference).group(0):
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index
+
+def read_text(element):
+    """Text of a shared/inline string item, joining rich-text runs and skipping phonetic hints"""
+    texts = []
+    for child in element:
+        if child.tag == f'{SHEET_NS}t':
+            texts.append(child.text or '')
+        elif child.tag == f'{SHEET_NS}r':
+            texts.extend(t.text or '' for t in child.iter(f'{SHEET_NS}t'))
+    return ''.join(texts)
+
+def read_shared_strings(archive):
+    """All shared strings of the workbook, in index order"""
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == f'{SHEET_NS}si':
+                strings.append(read_text(element))
+                element.clear()
+    return strings
+
+def list_sheets(archive):
+    """(sheet name, path inside the archive) for every sheet, in workbook order"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    relationships = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in relationships.iter(f'{PACKAGE_RELATIONSHIP_NS}Relationship')}
+
+    sheets = []
+    for sheet in workbook.iter(f'{SHEET_NS}sheet'):
+        target = targets[sheet.get(f'{RELATIONSHIP_NS}id')]
+        # Targets are either absolute ('/xl/worksheets/sheet.xml') or relative to xl/
+        path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+        sheets.append((sheet.get('name'), path))
+    return sheets
+
+def iter_sheet_columns(xlsx_filepath, columns, choose_sheet):
+    """Stream the given 1-based columns of a sheet as tuples, one per row, straight from the sheet XML.
+
+    choose_sheet(names) returns the name of the sheet to read. Only string cells are
+    decoded; any other cell type raises UnsupportedCell.
+    """
+    with zipfile.ZipFile(xlsx_filepath) as archive:
+        sheets = dict(list_sheets(archive))
+        sheet_path = sheets[choose_sheet(list(sheets))]
+        shared_strings = read_shared_strings(archive)
+        wanted = {column: position for position, column in enumerate(columns)}
+
+        with archive.open(sheet_path) as f:
+            sheet_data = None
+            row = None
+            next_column = 1
+            for event, element in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == f'{SHEET_NS}row':
+                        row = [None] * len(columns)
+                        next_column = 1
+                    elif element.tag == f'{SHEET_NS}sheetData':
+                        sheet_data = element
+                    continue
+
+                if element.tag == f'{SHEET_NS}c':
+                    reference = element.get('r')
+                    column = column_index(reference) if reference else next_column
+                    next_column = column + 1
+
+                    if column in wanted:
+                        cell_type = element.get('t', 'n')
+                        value = element.findtext(f'{SHEET_NS}v')
+                        if cell_type == 'inlineStr':
+                            inline = element.find(f'{SHEET_NS}is')
+                            row[wanted[column]] = read_text(inline) if inline is not None else None
+                        elif cell_type not in STRING_CELL_TYPES:
+                            if value is not None:
+                                raise UnsupportedCell(f"{reference or column}: cell type '{cell_type}'")
+                        elif value is not None:
+                            row[wanted[column]] = shared_strings[int(value)] if cell_type == 's' else value
+                    element.clear()
+
+                elif element.tag == f'{SHEET_NS}row':
+                    yield tuple(row)
+                    # Drop finished rows so memory stays flat however long the sheet is
+                    sheet_data.clear()